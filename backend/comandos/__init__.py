@@ -0,0 +1 @@
+# Comandos de linha de comando (python -m backend.comandos.<nome>)
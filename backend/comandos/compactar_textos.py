@@ -0,0 +1,275 @@
+"""
+Regrava o texto dos documentos já existentes no codec informado
+
+Percorre a tabela em lotes pelo id, com um commit por lote, e só pega as
+linhas que ainda não estão no codec pedido: se for interrompido, basta rodar
+de novo. Também serve para voltar ao texto puro (--codec nenhum). Textos
+guardados fora do banco (chave_texto) não são tocados, nem os que mudarem
+(edição ou reextração pela API) entre a leitura e a gravação.
+
+Páginas gravadas antes de a tabela de páginas guardar só a posição de cada
+página no texto do documento perdem a cópia do texto na mesma execução.
+
+Uso:
+    python -m backend.comandos.compactar_textos --codec zlib
+    python -m backend.comandos.compactar_textos --codec nenhum --lote 200
+    python -m backend.comandos.compactar_textos --codec zstd --vacuum
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import time
+from sqlalchemy import func, or_, select, text, update
+from sqlalchemy.orm import Session
+from backend.database import atualizar_esquema, base, engine, sessaolocal
+from backend.models import DocumentoTexto, PaginaDocumento
+from backend.services.armazenamento import armazenamento
+from backend.services.compressao_texto import (
+    CODECS_TEXTO,
+    COMPRESSAO_TEXTO,
+    CODEC_ZSTD,
+    SEM_COMPRESSAO,
+    colunas_texto,
+    zstandard,
+    texto_das_colunas,
+)
+from backend.services.servico_busca import ServicoBusca
+from backend.services.servico_documento import limites_paginas
+
+
+def _tamanho_gravado(colunas: dict) -> int:
+    if colunas["codec_texto"] is None:
+        return len(colunas["texto_extraido"].encode("utf-8"))
+    return len(colunas["texto_compactado"])
+
+
+def regravar_textos(db: Session, codec: str, lote: int) -> dict:
+    """
+    Regrava no codec informado todos os documentos que estão em outro codec
+
+    Args:
+        db: Sessão do banco de dados
+        codec: nenhum, zlib ou zstd
+        lote: Documentos lidos e gravados por transação
+
+    Returns:
+        dict: Documentos regravados, documentos que mudaram durante a
+            execução (mantidos como estão) e bytes ocupados pelo texto antes e
+            depois
+    """
+    if codec == SEM_COMPRESSAO:
+        fora_do_codec = DocumentoTexto.codec_texto.is_not(None)
+    else:
+        fora_do_codec = or_(
+            DocumentoTexto.codec_texto.is_(None), DocumentoTexto.codec_texto != codec
+        )
+
+    totais = {"documentos": 0, "alterados": 0, "bytes_antes": 0, "bytes_depois": 0}
+    ultimo_id = 0
+    while True:
+        linhas = db.execute(
+            select(
+                DocumentoTexto.id,
+                DocumentoTexto.texto_extraido,
+                DocumentoTexto.codec_texto,
+                DocumentoTexto.texto_compactado,
+                func.coalesce(DocumentoTexto.versao, 1),
+            )
+            .where(
+                DocumentoTexto.id > ultimo_id,
+                DocumentoTexto.chave_texto.is_(None),
+                fora_do_codec,
+            )
+            .order_by(DocumentoTexto.id)
+            .limit(lote)
+        ).all()
+        if not linhas:
+            return totais
+
+        regravados = 0
+        for (
+            id_documento,
+            texto_extraido,
+            codec_texto,
+            texto_compactado,
+            versao,
+        ) in linhas:
+            antes = {
+                "texto_extraido": texto_extraido,
+                "codec_texto": codec_texto,
+                "texto_compactado": texto_compactado,
+            }
+            depois = colunas_texto(
+                texto_das_colunas(texto_extraido, codec_texto, texto_compactado),
+                codec,
+            )
+
+            # Toda alteração do texto pela API sobe a versão: se ela mudou
+            # desde a leitura, o texto lido já é velho e o documento fica
+            # para a próxima execução
+            resultado = db.execute(
+                update(DocumentoTexto)
+                .where(
+                    DocumentoTexto.id == id_documento,
+                    func.coalesce(DocumentoTexto.versao, 1) == versao,
+                )
+                .values(**depois)
+            )
+            if resultado.rowcount == 0:
+                totais["alterados"] += 1
+                print(f"Documento {id_documento} mantido: alterado durante a execução")
+                continue
+            totais["bytes_antes"] += _tamanho_gravado(antes)
+            totais["bytes_depois"] += _tamanho_gravado(depois)
+            regravados += 1
+        db.commit()
+
+        totais["documentos"] += regravados
+        ultimo_id = linhas[-1][0]
+        print(f"{totais['documentos']} documentos regravados (até o id {ultimo_id})")
+
+
+def posicionar_paginas(db: Session, lote: int) -> int:
+    """
+    Troca o texto das páginas gravadas no formato antigo pela posição delas
+    no texto do documento
+
+    Args:
+        db: Sessão do banco de dados
+        lote: Documentos lidos e gravados por transação
+
+    Returns:
+        int: Documentos com as páginas convertidas
+    """
+    convertidos = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            db.scalars(
+                select(PaginaDocumento.documento_id)
+                .where(
+                    PaginaDocumento.documento_id > ultimo_id,
+                    PaginaDocumento.inicio.is_(None),
+                )
+                .group_by(PaginaDocumento.documento_id)
+                .order_by(PaginaDocumento.documento_id)
+                .limit(lote)
+            )
+        )
+        if not ids:
+            return convertidos
+        ultimo_id = ids[-1]
+
+        textos = {}
+        for linha in db.execute(
+            select(
+                DocumentoTexto.id,
+                DocumentoTexto.texto_extraido,
+                DocumentoTexto.codec_texto,
+                DocumentoTexto.texto_compactado,
+                DocumentoTexto.chave_texto,
+            ).where(DocumentoTexto.id.in_(ids))
+        ):
+            dados = linha.texto_compactado
+            if linha.chave_texto is not None:
+                if armazenamento is None:
+                    continue
+                try:
+                    dados = armazenamento.ler_bytes(linha.chave_texto)
+                except FileNotFoundError:
+                    print(f"Documento {linha.id} mantido: texto fora do armazenamento")
+                    continue
+            textos[linha.id] = texto_das_colunas(
+                linha.texto_extraido, linha.codec_texto, dados
+            )
+
+        paginas = {}
+        for documento_id, pagina_id, texto in db.execute(
+            select(
+                PaginaDocumento.documento_id, PaginaDocumento.id, PaginaDocumento.texto
+            )
+            .where(PaginaDocumento.documento_id.in_(ids))
+            .order_by(PaginaDocumento.documento_id, PaginaDocumento.numero_pagina)
+        ):
+            paginas.setdefault(documento_id, []).append((pagina_id, texto))
+
+        # Páginas que não formam o texto do documento ficam como estão
+        atualizacoes = []
+        for documento_id, linhas in paginas.items():
+            if documento_id not in textos:
+                continue
+            limites = limites_paginas(
+                [texto for _, texto in linhas], textos[documento_id]
+            )
+            if limites is None:
+                continue
+            atualizacoes += [
+                {"id": pagina_id, "texto": "", "inicio": inicio, "fim": fim}
+                for (pagina_id, _), (inicio, fim) in zip(linhas, limites)
+            ]
+            convertidos += 1
+
+        if atualizacoes:
+            db.execute(update(PaginaDocumento), atualizacoes)
+        db.commit()
+        print(
+            f"{convertidos} documentos com as páginas convertidas (até o id {ultimo_id})"
+        )
+
+
+def liberar_espaco() -> None:
+    """Devolve ao sistema (SQLite) ou ao próprio banco (Postgres) o espaço liberado"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+        if engine.dialect.name == "sqlite":
+            conexao.execute(text("VACUUM"))
+        elif engine.dialect.name == "postgresql":
+            conexao.execute(text("VACUUM ANALYZE documentos_texto"))
+            conexao.execute(text("VACUUM ANALYZE paginas_documento"))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--codec",
+        choices=CODECS_TEXTO,
+        default=COMPRESSAO_TEXTO,
+        help="Codec de destino (padrão: COMPRESSAO_TEXTO)",
+    )
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Roda VACUUM no final para liberar o espaço economizado",
+    )
+    argumentos = parser.parse_args()
+    if argumentos.codec == CODEC_ZSTD and zstandard is None:
+        parser.error("o codec zstd requer o pacote zstandard (pip install zstandard)")
+
+    # Garante as colunas novas mesmo antes da primeira subida da API
+    base.metadata.create_all(bind=engine)
+    atualizar_esquema(engine)
+    ServicoBusca.criar_indice(engine)
+
+    inicio = time.perf_counter()
+    with sessaolocal() as db:
+        totais = regravar_textos(db, argumentos.codec, max(1, argumentos.lote))
+        paginas_convertidas = posicionar_paginas(db, max(1, argumentos.lote))
+
+    if argumentos.vacuum:
+        liberar_espaco()
+
+    print(
+        f"{totais['documentos']} documentos em {time.perf_counter() - inicio:.1f}s, "
+        f"texto de {totais['bytes_antes']} para {totais['bytes_depois']} bytes; "
+        f"{totais['alterados']} alterados durante a execução mantidos; "
+        f"páginas de {paginas_convertidas} documentos convertidas"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Apaga do armazenamento os blobs que nenhum documento referencia mais
+
+Os blobs são endereçados pelo conteúdo e compartilhados entre documentos
+(o mesmo PDF enviado duas vezes é guardado uma vez só), então a exclusão de
+um documento não apaga nada na hora. Este comando junta as chaves ainda
+referenciadas (chave_arquivo e chave_texto, dos documentos e das versões
+anteriores do texto) e apaga as demais que já passaram da idade mínima, o
+que protege os blobs de uploads ainda em andamento. Logo antes de apagar
+cada blob, a referência e a data da última gravação são conferidas de novo:
+um upload do mesmo conteúdo durante a limpeza renova a data do blob antes de
+gravar o documento. Pode ser interrompido e rodado de novo a qualquer momento.
+
+Uso:
+    python -m backend.comandos.limpar_armazenamento
+    python -m backend.comandos.limpar_armazenamento --idade-minima-horas 1
+    python -m backend.comandos.limpar_armazenamento --simular
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import time
+from sqlalchemy import exists, or_, select, union
+from sqlalchemy.orm import Session
+from backend.database import atualizar_esquema, base, engine, sessaolocal
+from backend.models import DocumentoTexto, VersaoTextoDocumento
+from backend.services.armazenamento import armazenamento
+
+
+def chaves_referenciadas(db: Session) -> set:
+    """Chaves de PDFs e textos que algum documento (ou versão do texto) ainda usa"""
+    consulta = union(
+        select(DocumentoTexto.chave_arquivo).where(
+            DocumentoTexto.chave_arquivo.is_not(None)
+        ),
+        select(DocumentoTexto.chave_texto).where(
+            DocumentoTexto.chave_texto.is_not(None)
+        ),
+        select(VersaoTextoDocumento.chave_texto).where(
+            VersaoTextoDocumento.chave_texto.is_not(None)
+        ),
+    )
+    return set(db.scalars(consulta))
+
+
+def chave_referenciada(db: Session, chave: str) -> bool:
+    """Se algum documento (ou versão do texto) usa a chave, lido na hora"""
+    # Encerra a transação de leitura anterior, para ver o que foi gravado depois
+    db.commit()
+    usada = select(
+        or_(
+            exists().where(
+                or_(
+                    DocumentoTexto.chave_arquivo == chave,
+                    DocumentoTexto.chave_texto == chave,
+                )
+            ),
+            exists().where(VersaoTextoDocumento.chave_texto == chave),
+        )
+    )
+    return bool(db.scalar(usada))
+
+
+def limpar(db: Session, idade_minima_segundos: float, simular: bool) -> dict:
+    """
+    Apaga os blobs sem referência mais antigos que a idade mínima
+
+    Args:
+        db: Sessão do banco de dados
+        idade_minima_segundos: Blobs gravados há menos tempo são mantidos
+        simular: Só conta, sem apagar
+
+    Returns:
+        dict: Blobs encontrados e apagados
+    """
+    # As referências são lidas antes de listar: um blob gravado depois disso
+    # é mais novo que a idade mínima e fica de fora
+    referenciadas = chaves_referenciadas(db)
+    limite = time.time() - idade_minima_segundos
+
+    totais = {"blobs": 0, "apagados": 0}
+    for chave, modificado in armazenamento.listar():
+        totais["blobs"] += 1
+        if chave in referenciadas or modificado.timestamp() >= limite:
+            continue
+        if not simular:
+            # A listagem pode ter ficado velha: um upload do mesmo conteúdo
+            # renova a data do blob e só então grava o documento
+            modificado = armazenamento.modificado_em(chave)
+            if modificado is None or modificado.timestamp() >= limite:
+                continue
+            if chave_referenciada(db, chave):
+                continue
+            armazenamento.remover(chave)
+        totais["apagados"] += 1
+    return totais
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--idade-minima-horas",
+        type=float,
+        default=24,
+        help="Só apaga blobs gravados há mais tempo que isso (padrão: 24)",
+    )
+    parser.add_argument(
+        "--simular", action="store_true", help="Mostra o que seria apagado"
+    )
+    argumentos = parser.parse_args()
+    if armazenamento is None:
+        parser.error("o armazenamento está desligado (ARMAZENAMENTO_ARQUIVOS=nenhum)")
+
+    # Garante as colunas novas mesmo antes da primeira subida da API
+    base.metadata.create_all(bind=engine)
+    atualizar_esquema(engine)
+
+    inicio = time.perf_counter()
+    with sessaolocal() as db:
+        totais = limpar(db, argumentos.idade_minima_horas * 3600, argumentos.simular)
+
+    acao = "seriam apagados" if argumentos.simular else "apagados"
+    print(
+        f"{totais['apagados']} de {totais['blobs']} blobs {acao} "
+        f"em {time.perf_counter() - inicio:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Prepara o banco para a versão atual da API, sem subir a API
+
+Cria as tabelas, colunas e índices novos e devolve à fila as tarefas que
+ficaram em processamento. É o mesmo passo que a API faz ao subir; rodado à
+parte (ex.: na etapa de release do deploy), permite subir os workers com
+PREPARAR_BANCO=false.
+
+Uso:
+    python -m backend.comandos.preparar_banco
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+from backend.database import engine
+from backend.inicializacao import preparar_banco
+
+
+def main():
+    argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    ).parse_args()
+
+    segundos = preparar_banco(engine)
+    engine.dispose()
+    print(f"Banco preparado em {segundos:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
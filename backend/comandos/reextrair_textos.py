@@ -0,0 +1,288 @@
+"""
+Refaz a extração do texto dos documentos a partir do PDF original guardado
+
+Para quando a extração muda (VERSAO_EXTRATOR em servico_documento). Percorre
+em lotes pelo id os documentos que têm o PDF no armazenamento e texto de uma
+versão anterior da extração, extrai de novo no pool de processos (cada PDF
+uma vez por lote, mesmo que seja de vários documentos) e só regrava os que
+mudaram, guardando o texto anterior no histórico de versões; os que não
+mudaram só são marcados com a versão atual. Textos editados manualmente,
+antes ou durante a extração, não são tocados. Cada lote é um commit: se for interrompido, basta rodar de novo,
+e os documentos já refeitos ficam de fora. Os que falharem (PDF ausente,
+erro na extração) continuam pendentes para a próxima execução.
+
+Uso:
+    python -m backend.comandos.reextrair_textos
+    python -m backend.comandos.reextrair_textos --lote 50 --processos 2 --pausa-segundos 1
+    python -m backend.comandos.reextrair_textos --simular
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.database import (
+    atualizar_esquema,
+    base,
+    engine,
+    engine_assincrona,
+    escrita_serializada,
+    sessaolocal_assincrona,
+)
+from backend.models import DocumentoTexto
+from backend.services.armazenamento import armazenamento
+from backend.services.cache_respostas import cache_respostas, chave_documento
+from backend.services.motor_extracao import motor_extracao
+from backend.services.servico_busca import ServicoBusca
+from backend.services.servico_documento import (
+    PASTA_TEMPORARIA_UPLOADS,
+    VERSAO_EXTRATOR,
+    ServicoDocumento,
+    limites_paginas,
+)
+from backend.services.servico_ocr import OCR_ATIVO, motor_ocr
+
+
+async def extrair_pdf_guardado(
+    chave_arquivo: str, pasta: str, limite: asyncio.Semaphore
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Baixa o PDF do armazenamento para a pasta e extrai o texto de cada página
+
+    Returns:
+        Tuple: (páginas, None) ou (None, motivo da falha)
+    """
+    caminho = os.path.join(pasta, f"{chave_arquivo}.pdf")
+    async with limite:
+        try:
+            await run_in_threadpool(
+                armazenamento.baixar_arquivo, chave_arquivo, caminho
+            )
+            return await ServicoDocumento.processar_arquivo_pdf(caminho), None
+        except FileNotFoundError:
+            return None, "PDF original não está no armazenamento"
+        except HTTPException as erro:
+            return None, erro.detail
+        finally:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+
+async def paginas_atuais(db: AsyncSession, ids: List[int]) -> Dict[int, List[str]]:
+    """Texto gravado de cada página dos documentos informados"""
+    return {
+        documento_id: await ServicoDocumento.ler_paginas(db, documento_id)
+        for documento_id in ids
+    }
+
+
+def como_gravadas(paginas: List[str]) -> List[str]:
+    """
+    Páginas como ficam depois de gravadas: recortadas do texto do documento,
+    sem os espaços das bordas que juntar_paginas tira
+    """
+    texto = ServicoDocumento.juntar_paginas(paginas)
+    return [texto[inicio:fim] for inicio, fim in limites_paginas(paginas, texto)]
+
+
+async def reextrair_textos(
+    db: AsyncSession, lote: int, processos: int, pausa_segundos: float, simular: bool
+) -> dict:
+    """
+    Refaz a extração dos documentos de versões anteriores do extrator
+
+    Args:
+        db: Sessão do banco de dados
+        lote: Documentos lidos e gravados por transação
+        processos: PDFs extraídos ao mesmo tempo
+        pausa_segundos: Espera entre um lote e outro, para aliviar o banco
+        simular: Só compara, sem gravar nada
+
+    Returns:
+        dict: Documentos conferidos, regravados, iguais e com falha
+    """
+    pendentes = or_(
+        DocumentoTexto.versao_extrator.is_(None),
+        DocumentoTexto.versao_extrator != VERSAO_EXTRATOR,
+    )
+    limite = asyncio.Semaphore(processos)
+
+    totais = {"documentos": 0, "regravados": 0, "iguais": 0, "falhas": 0}
+    ultimo_id = 0
+    while True:
+        linhas = (
+            await db.execute(
+                select(
+                    DocumentoTexto.id,
+                    DocumentoTexto.usuario_id,
+                    DocumentoTexto.nome_arquivo,
+                    DocumentoTexto.chave_arquivo,
+                    func.coalesce(DocumentoTexto.versao, 1).label("versao"),
+                )
+                .where(
+                    DocumentoTexto.id > ultimo_id,
+                    DocumentoTexto.hash_conteudo.is_not(None),
+                    DocumentoTexto.chave_arquivo.is_not(None),
+                    pendentes,
+                )
+                .order_by(DocumentoTexto.id)
+                .limit(lote)
+            )
+        ).all()
+        if not linhas:
+            return totais
+        ultimo_id = linhas[-1].id
+
+        chaves = sorted({linha.chave_arquivo for linha in linhas})
+        with tempfile.TemporaryDirectory(dir=PASTA_TEMPORARIA_UPLOADS) as pasta:
+            resultados = await asyncio.gather(
+                *(extrair_pdf_guardado(chave, pasta, limite) for chave in chaves)
+            )
+        extracoes = dict(zip(chaves, resultados))
+        gravadas = await paginas_atuais(db, [linha.id for linha in linhas])
+
+        iguais, alterados = [], []
+        for linha in linhas:
+            paginas, erro = extracoes[linha.chave_arquivo]
+            if paginas is None:
+                totais["falhas"] += 1
+                print(f"Documento {linha.id} mantido: {erro}")
+            elif como_gravadas(paginas) == gravadas.get(linha.id):
+                iguais.append(linha)
+            else:
+                alterados.append((linha, paginas))
+
+        # Na simulação conta o que seria gravado
+        marcados = len(iguais)
+        regravados = [linha for linha, _ in alterados]
+        if not simular and (iguais or alterados):
+            regravados = []
+            async with escrita_serializada():
+                if iguais:
+                    # Só marca a versão; data_atualizacao fica como estava. Os
+                    # documentos editados depois da leitura ficam de fora
+                    resultado = await db.execute(
+                        update(DocumentoTexto)
+                        .where(
+                            tuple_(
+                                DocumentoTexto.id,
+                                func.coalesce(DocumentoTexto.versao, 1),
+                            ).in_([(linha.id, linha.versao) for linha in iguais]),
+                            DocumentoTexto.hash_conteudo.is_not(None),
+                        )
+                        .values(
+                            versao_extrator=VERSAO_EXTRATOR,
+                            data_atualizacao=DocumentoTexto.data_atualizacao,
+                        ),
+                        execution_options={"synchronize_session": False},
+                    )
+                    marcados = resultado.rowcount
+                for linha, paginas in alterados:
+                    if await ServicoDocumento.regravar_texto_extraido(
+                        db,
+                        linha.id,
+                        linha.usuario_id,
+                        linha.nome_arquivo,
+                        paginas,
+                        linha.versao,
+                    ):
+                        regravados.append(linha)
+                    else:
+                        print(
+                            f"Documento {linha.id} mantido: alterado durante a extração"
+                        )
+                await db.commit()
+            # A versão nova já invalida o cache; a remoção só libera o espaço
+            await cache_respostas.remover(
+                *(chave_documento(linha.usuario_id, linha.id) for linha in regravados)
+            )
+
+        totais["documentos"] += len(linhas)
+        totais["iguais"] += marcados
+        totais["regravados"] += len(regravados)
+        print(
+            f"{totais['documentos']} documentos conferidos, "
+            f"{totais['regravados']} regravados (até o id {ultimo_id})"
+        )
+        if pausa_segundos:
+            await asyncio.sleep(pausa_segundos)
+
+
+async def executar(argumentos: argparse.Namespace) -> dict:
+    # O pool do motor recebe o número de processos pedido
+    motor_extracao.processos = argumentos.processos
+    motor_extracao.maximo_pendentes = max(
+        motor_extracao.maximo_pendentes, argumentos.processos
+    )
+    motor_extracao.iniciar()
+    if OCR_ATIVO:
+        motor_ocr.iniciar()
+    try:
+        async with sessaolocal_assincrona() as db:
+            return await reextrair_textos(
+                db,
+                argumentos.lote,
+                argumentos.processos,
+                argumentos.pausa_segundos,
+                argumentos.simular,
+            )
+    finally:
+        motor_extracao.encerrar()
+        motor_ocr.encerrar()
+        await cache_respostas.fechar()
+        await engine_assincrona.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--lote", type=int, default=100)
+    parser.add_argument(
+        "--processos",
+        type=int,
+        default=motor_extracao.processos,
+        help="PDFs extraídos ao mesmo tempo (padrão: PROCESSOS_EXTRACAO)",
+    )
+    parser.add_argument(
+        "--pausa-segundos",
+        type=float,
+        default=0,
+        help="Espera entre os lotes, para não competir com a API",
+    )
+    parser.add_argument("--simular", action="store_true", help="Só conta o que mudaria")
+    argumentos = parser.parse_args()
+    if armazenamento is None:
+        parser.error("o armazenamento está desligado (ARMAZENAMENTO_ARQUIVOS=nenhum)")
+    argumentos.lote = max(1, argumentos.lote)
+    argumentos.processos = max(1, argumentos.processos)
+
+    # Garante as colunas novas mesmo antes da primeira subida da API
+    base.metadata.create_all(bind=engine)
+    atualizar_esquema(engine)
+    ServicoBusca.criar_indice(engine)
+    engine.dispose()
+
+    inicio = time.perf_counter()
+    totais = asyncio.run(executar(argumentos))
+
+    acao = "seriam regravados" if argumentos.simular else "regravados"
+    print(
+        f"{totais['documentos']} documentos em {time.perf_counter() - inicio:.1f}s: "
+        f"{totais['regravados']} {acao}, {totais['iguais']} iguais, "
+        f"{totais['falhas']} com falha"
+    )
+
+
+if __name__ == "__main__":
+    main()
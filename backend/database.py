@@ -1,14 +1,111 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+import asyncio
+import contextlib
 import os
 
 URL_DATABASE = os.getenv("DATABASE_URL", "sqlite:///./desafio_api.db")
 
-engine = create_engine(URL_DATABASE)
+# Configurações do pool de conexões (não se aplicam ao SQLite)
+TAMANHO_POOL_DB = int(os.getenv("TAMANHO_POOL_DB", "5"))
+MAXIMO_OVERFLOW_DB = int(os.getenv("MAXIMO_OVERFLOW_DB", "10"))
+TIMEOUT_POOL_DB_SEGUNDOS = float(os.getenv("TIMEOUT_POOL_DB_SEGUNDOS", "30"))
+RECICLAR_CONEXOES_DB_SEGUNDOS = int(os.getenv("RECICLAR_CONEXOES_DB_SEGUNDOS", "1800"))
+PRE_PING_DB = os.getenv("PRE_PING_DB", "true").lower() in ("1", "true", "sim")
+
+# Ajustes do SQLite aplicados em cada conexão aberta
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KIB = int(os.getenv("SQLITE_CACHE_KIB", "65536"))
+if SQLITE_SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError("SQLITE_SYNCHRONOUS deve ser OFF, NORMAL, FULL ou EXTRA")
+
+# Driver assíncrono usado para cada banco quando a URL traz o driver síncrono
+DRIVERS_ASSINCRONOS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _url_assincrona(url: str) -> str:
+    url_db = make_url(url)
+    driver = DRIVERS_ASSINCRONOS.get(url_db.get_backend_name())
+    if driver is None:
+        return url
+    return url_db.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _opcoes_pool(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": TAMANHO_POOL_DB,
+        "max_overflow": MAXIMO_OVERFLOW_DB,
+        "pool_timeout": TIMEOUT_POOL_DB_SEGUNDOS,
+        "pool_recycle": RECICLAR_CONEXOES_DB_SEGUNDOS,
+        "pool_pre_ping": PRE_PING_DB,
+    }
+
+
+def _configurar_sqlite(conexao_dbapi, registro_conexao) -> None:
+    """
+    Liga o WAL e os pragmas de desempenho em cada conexão nova do SQLite
+
+    Com WAL as leituras não esperam pela escrita em andamento; o
+    busy_timeout faz uma escrita esperar a outra em vez de falhar na hora
+    com "database is locked".
+    """
+    cursor = conexao_dbapi.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    # Valor negativo: tamanho do cache em KiB, e não em páginas
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+    cursor.close()
+
+
+URL_DATABASE_ASSINCRONA = os.getenv(
+    "DATABASE_URL_ASSINCRONA", _url_assincrona(URL_DATABASE)
+)
+
+# Engine síncrona: criação do esquema na subida da API e scripts de linha de comando
+engine = create_engine(URL_DATABASE, **_opcoes_pool(URL_DATABASE))
 sessaolocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine assíncrona: rotas e fila de extração, sem bloquear o event loop
+engine_assincrona = create_async_engine(
+    URL_DATABASE_ASSINCRONA, **_opcoes_pool(URL_DATABASE_ASSINCRONA)
+)
+sessaolocal_assincrona = async_sessionmaker(
+    engine_assincrona, autoflush=False, expire_on_commit=False
+)
 base = declarative_base()
 
+for _engine in (engine, engine_assincrona.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _configurar_sqlite)
+
+# O SQLite aceita um escritor por vez: as transações de escrita deste processo
+# entram em fila (o Lock do asyncio atende na ordem de chegada)
+trava_escrita_sqlite = asyncio.Lock()
+
+
+def escrita_serializada():
+    """
+    Contexto assíncrono para envolver uma transação de escrita, do primeiro
+    comando de escrita até o commit
+
+    No SQLite as escritas passam uma de cada vez e as leituras continuam em
+    paralelo; nos demais bancos não faz nada.
+
+    Uso: async with escrita_serializada(): ...
+    """
+    if engine_assincrona.dialect.name == "sqlite":
+        return trava_escrita_sqlite
+    return contextlib.nullcontext()
+
 
 def conexao_db():
     db = sessaolocal()
@@ -16,3 +113,37 @@ def conexao_db():
         yield db
     finally:
         db.close()
+
+
+async def conexao_db_assincrona():
+    async with sessaolocal_assincrona() as db:
+        yield db
+
+
+def atualizar_esquema(engine: Engine) -> None:
+    """
+    Adiciona nas tabelas já existentes as colunas e índices novos dos modelos
+
+    O create_all só cria tabelas que não existem; colunas novas precisam ser
+    nullable para poderem ser adicionadas em tabelas com dados.
+    """
+    inspetor = inspect(engine)
+    with engine.begin() as conexao:
+        for tabela in base.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name):
+                continue
+
+            colunas_existentes = {
+                coluna["name"] for coluna in inspetor.get_columns(tabela.name)
+            }
+            for coluna in tabela.columns:
+                if coluna.name not in colunas_existentes:
+                    tipo = coluna.type.compile(dialect=engine.dialect)
+                    conexao.execute(
+                        text(
+                            f"ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo}"
+                        )
+                    )
+
+            for indice in tabela.indexes:
+                indice.create(conexao, checkfirst=True)
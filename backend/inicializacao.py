@@ -0,0 +1,34 @@
+import logging
+import time
+from sqlalchemy.engine import Engine
+from backend.database import atualizar_esquema, base
+from backend.services.servico_busca import ServicoBusca
+from backend.services.servico_tarefas import recuperar_tarefas_interrompidas
+
+logger = logging.getLogger(__name__)
+
+
+def preparar_banco(engine: Engine) -> float:
+    """
+    Cria tabelas, colunas e índices novos e recupera as tarefas interrompidas
+
+    Deve rodar uma vez por subida da API, antes de qualquer processo
+    atender: no import do main.py quando a API roda em um processo só, ou no
+    processo mestre do gunicorn (gunicorn.conf.py), que desliga a etapa nos
+    workers com PREPARAR_BANCO=false. Também pode rodar sozinho, como passo
+    do deploy: python -m backend.comandos.preparar_banco
+
+    Args:
+        engine: Engine síncrona do banco
+
+    Returns:
+        float: Segundos gastos
+    """
+    inicio = time.perf_counter()
+    base.metadata.create_all(bind=engine)
+    atualizar_esquema(engine)
+    ServicoBusca.criar_indice(engine)
+    recuperadas = recuperar_tarefas_interrompidas(engine)
+    if recuperadas:
+        logger.info("%d tarefas interrompidas voltaram para a fila", recuperadas)
+    return time.perf_counter() - inicio
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+import uuid
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
+from sqlalchemy import LargeBinary
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from backend.database import base
 
@@ -21,11 +24,129 @@ class DocumentoTexto(base):
     """Modelo para documentos PDF e textos extraídos"""
 
     __tablename__ = "documentos_texto"
+    __table_args__ = (
+        # Índices da paginação por cursor da listagem
+        Index("ix_documentos_texto_usuario_id_id", "usuario_id", "id"),
+        Index(
+            "ix_documentos_texto_usuario_id_nome_arquivo",
+            "usuario_id",
+            "nome_arquivo",
+            "id",
+        ),
+        # Sem AUTOINCREMENT o SQLite reaproveita o maior id depois de uma
+        # exclusão, e um documento novo herdaria o id (e os caches) do apagado
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome_arquivo = Column(String(255), nullable=False)
-    texto_extraido = Column(Text, nullable=False)
+    # Adiado: só é lido do banco quando acessado ou pedido com undefer()
+    texto_extraido = deferred(Column(Text, nullable=False))
+    # Com codec_texto preenchido o texto fica aqui compactado e texto_extraido
+    # fica vazio; nulo quando o texto está gravado puro
+    texto_compactado = deferred(Column(LargeBinary, nullable=True))
+    codec_texto = Column(String(10), nullable=True)
+    # Texto grande demais para o banco: fica no armazenamento com esta chave
+    # (codec_texto diz como foi gravado) e as duas colunas acima ficam vazias
+    chave_texto = Column(String(64), nullable=True)
     tamanho_arquivo = Column(Integer, nullable=False)  # em bytes
     usuario_id = Column(Integer, nullable=False, index=True)
+    # SHA-256 do PDF original; None quando o texto foi editado manualmente
+    hash_conteudo = Column(String(64), nullable=True, index=True)
+    # Chave do PDF original no armazenamento (o SHA-256 do PDF); continua
+    # preenchida depois que o texto é editado. None se o PDF não foi guardado
+    chave_arquivo = Column(String(64), nullable=True)
+    # Incrementada a cada atualização; compõe o ETag do documento
+    versao = Column(Integer, nullable=True, default=1)
+    # VERSAO_EXTRATOR que gerou o texto; None para texto editado manualmente
+    # ou gravado antes da coluna existir (reextrair_textos refaz esses)
+    versao_extrator = Column(Integer, nullable=True)
+    data_criacao = Column(DateTime(timezone=True), server_default=func.now())
+    data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class VersaoDocumentos(base):
+    """Modelo para o contador de alterações nos documentos de cada usuario"""
+
+    __tablename__ = "versoes_documentos"
+
+    # Um registro por usuario, criado na primeira alteração
+    usuario_id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    # Quantidade de documentos do usuario, mantida por registrar_alteracao
+    total = Column(Integer, nullable=True)
+    data_alteracao = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class VersaoTextoDocumento(base):
+    """Modelo para os textos substituídos de um documento (edição ou re-extração)"""
+
+    __tablename__ = "versoes_texto_documento"
+    __table_args__ = (
+        Index(
+            "ix_versoes_texto_documento_documento_versao",
+            "documento_id",
+            "versao",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    documento_id = Column(Integer, nullable=False)
+    # Versão do documento em que este era o texto atual
+    versao = Column(Integer, nullable=False)
+    # O que substituiu o texto: "edicao" ou "reextracao"
+    motivo = Column(String(20), nullable=False)
+    # Mesmas colunas de texto do documento; o texto é sempre guardado
+    # compactado, e um texto que já estava no armazenamento só tem a chave copiada
+    texto_extraido = deferred(Column(Text, nullable=False))
+    texto_compactado = deferred(Column(LargeBinary, nullable=True))
+    codec_texto = Column(String(10), nullable=True)
+    chave_texto = Column(String(64), nullable=True)
+    hash_conteudo = Column(String(64), nullable=True)
+    versao_extrator = Column(Integer, nullable=True)
+    data_substituicao = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PaginaDocumento(base):
+    """Modelo para o texto de cada página de um documento"""
+
+    __tablename__ = "paginas_documento"
+    __table_args__ = (
+        Index(
+            "ix_paginas_documento_documento_pagina",
+            "documento_id",
+            "numero_pagina",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    documento_id = Column(Integer, nullable=False)
+    numero_pagina = Column(Integer, nullable=False)  # começando em 1
+    # Posição da página no texto do documento, [inicio, fim) em caracteres: o
+    # texto só fica gravado uma vez, no documento (compactado ou não). Páginas
+    # gravadas antes dessas colunas guardam o próprio texto
+    texto = Column(Text, nullable=False)
+    inicio = Column(Integer, nullable=True)
+    fim = Column(Integer, nullable=True)
+
+
+class TarefaExtracao(base):
+    """Modelo para tarefas de extração assíncrona de PDFs enviados"""
+
+    __tablename__ = "tarefas_extracao"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    nome_arquivo = Column(String(255), nullable=False)
+    caminho_arquivo = Column(String(500), nullable=False)  # PDF aguardando extração
+    tamanho_arquivo = Column(Integer, nullable=False)  # em bytes
+    hash_conteudo = Column(String(64), nullable=True)
+    usuario_id = Column(Integer, nullable=False, index=True)
+    estado = Column(String(20), nullable=False, default="pendente", index=True)
+    documento_id = Column(Integer, nullable=True)
+    erro = Column(Text, nullable=True)
+    # Renovada pelo worker enquanto processa; vencida, a tarefa volta à fila
+    reservada_em = Column(DateTime(timezone=True), nullable=True)
     data_criacao = Column(DateTime(timezone=True), server_default=func.now())
     data_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
-from backend.database import conexao_db
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import conexao_db_assincrona
 from backend.models import Usuario
 from backend.schemas.usuario import UsuarioCriar, UsuarioResposta, UsuarioLogin, Token
+from backend.services.limite_taxa import (
+    registrar_falha_login,
+    verificar_tentativa_login,
+)
 from backend.services.servico_usuario import ServicoUsuario
 from backend.services.servico_autenticacao import ServicoAutenticacao
 
@@ -12,7 +16,9 @@ router = APIRouter()
 @router.post(
     "/registrar", response_model=UsuarioResposta, status_code=status.HTTP_201_CREATED
 )
-async def registrar_usuario(usuario: UsuarioCriar, db: Session = Depends(conexao_db)):
+async def registrar_usuario(
+    usuario: UsuarioCriar, db: AsyncSession = Depends(conexao_db_assincrona)
+):
     """
     Registra um novo usuário no sistema
 
@@ -20,21 +26,39 @@ async def registrar_usuario(usuario: UsuarioCriar, db: Session = Depends(conexao
     - **email**: Email único do usuário
     - **senha**: Senha do usuário (será criptografada)
     """
-    return ServicoUsuario.criar_usuario(db, usuario)
+    return await ServicoUsuario.criar_usuario(db, usuario)
 
 
 @router.post("/login", response_model=Token)
-async def login_usuario(credenciais: UsuarioLogin, db: Session = Depends(conexao_db)):
+async def login_usuario(
+    credenciais: UsuarioLogin,
+    request: Request,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+):
     """
     Realiza login do usuário e retorna token de acesso
 
     - **nome_usuario**: Nome de usuário
     - **senha**: Senha do usuário
+
+    Tentativas erradas demais para o usuário (do mesmo IP) ou tentativas
+    demais do IP recebem 429 com Retry-After
     """
+    # Limite de tentativas antes do bcrypt. Atrás de um proxy, o IP é o do
+    # cliente só se o servidor confiar nos headers encaminhados pelo proxy
+    # (FORWARDED_ALLOW_IPS)
+    ip = request.client.host if request.client else None
+    await verificar_tentativa_login(ip, credenciais.nome_usuario)
+
     # Validar credenciais
-    usuario = ServicoUsuario.validar_credenciais(
-        db, credenciais.nome_usuario, credenciais.senha
-    )
+    try:
+        usuario = await ServicoUsuario.validar_credenciais(
+            db, credenciais.nome_usuario, credenciais.senha
+        )
+    except HTTPException as erro:
+        if erro.status_code == status.HTTP_401_UNAUTHORIZED:
+            await registrar_falha_login(ip, credenciais.nome_usuario)
+        raise
 
     # Gerar token
     token_acesso = ServicoAutenticacao.gerar_token_para_usuario(usuario.nome_usuario)
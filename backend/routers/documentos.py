@@ -1,19 +1,101 @@
+import json
+import os
+from itertools import chain
+from urllib.parse import quote
+from pydantic import TypeAdapter
 from backend.schemas.documento import (
     DocumentoResposta,
+    DocumentoMetadados,
     DocumentoLista,
     DocumentoAtualizar,
+    DocumentoPaginas,
+    DocumentoTrecho,
+    HistoricoTexto,
+    VersaoTextoResposta,
+    ResultadoBusca,
+    ResultadoLote,
 )
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from backend.schemas.tarefa import TarefaResposta
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from backend.services.servico_autenticacao import ServicoAutenticacao
-from backend.services.servico_documento import ServicoDocumento
-from backend.models import DocumentoTexto, Usuario
-from backend.database import conexao_db
-from sqlalchemy.orm import Session
-from typing import List
+from backend.services.cache_http import (
+    cabecalhos_cache,
+    etag_arquivo,
+    etag_documento,
+    etag_listagem,
+    nao_modificado,
+    resposta_nao_modificada,
+)
+from backend.services.cache_respostas import (
+    CACHE_RESPOSTAS,
+    TAMANHO_MAXIMO_RESPOSTA_CACHE,
+    cache_respostas,
+    chave_documento,
+    chave_listagem,
+    desempacotar,
+    empacotar,
+    rotulo_documento,
+)
+from backend.services.servico_documento import MAXIMO_LIMITE_LISTAGEM, ServicoDocumento
+from backend.services.servico_lote import ServicoLote
+from backend.services.servico_tarefas import ServicoTarefas
+from backend.models import Usuario
+from backend.database import conexao_db_assincrona
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterator, List, Optional, Tuple
 
 
 router = APIRouter()
 
+# Serializa a página da listagem direto para bytes, como o response_model faria
+adaptador_listagem = TypeAdapter(List[DocumentoLista])
+
+
+def _json_documento(documento, blocos: Iterator[str]) -> Iterator[str]:
+    """
+    Gera o JSON do DocumentoResposta em partes, com o texto escapado bloco a bloco
+
+    Mesmo formato e ordem de campos do JSON que o FastAPI montaria com o
+    response_model, sem passar o texto inteiro por um modelo Pydantic.
+    """
+    metadados = DocumentoMetadados.model_validate(documento).model_dump(mode="json")
+    nome_arquivo = json.dumps(metadados.pop("nome_arquivo"), ensure_ascii=False)
+    yield f'{{"nome_arquivo":{nome_arquivo},"texto_extraido":"'
+    for bloco in blocos:
+        yield json.dumps(bloco, ensure_ascii=False)[1:-1]
+    yield '",' + json.dumps(metadados, ensure_ascii=False, separators=(",", ":"))[1:]
+
+
+def _juntar_ate(partes: Iterator[str], limite: int) -> Tuple[List[str], bool]:
+    """Consome as partes até passar de limite caracteres; diz se chegou ao fim"""
+    consumidas, tamanho = [], 0
+    for parte in partes:
+        consumidas.append(parte)
+        tamanho += len(parte)
+        if tamanho > limite:
+            return consumidas, False
+    return consumidas, True
+
+
+def _cabecalho_download(nome_arquivo: str, extensao: str = ".txt") -> str:
+    nome = os.path.splitext(nome_arquivo)[0] + extensao
+    nome_codificado = quote(nome)
+    if nome_codificado != nome:
+        return f"attachment; filename*=utf-8''{nome_codificado}"
+    return f'attachment; filename="{nome}"'
+
 
 @router.post(
     "/upload", 
@@ -22,7 +104,7 @@ router = APIRouter()
 )
 async def upload_documento(
     arquivo: UploadFile = File(...),
-    db: Session = Depends(conexao_db),
+    db: AsyncSession = Depends(conexao_db_assincrona),
     usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
 ):
     """
@@ -36,80 +118,388 @@ async def upload_documento(
     - **Retorna**: Dados do documento criado com texto extraído
     """
     # Processar PDF usando service
-    texto_extraido, tamanho_arquivo = ServicoDocumento.processar_upload_pdf(arquivo)
+    paginas, tamanho_arquivo, hash_conteudo = (
+        await ServicoDocumento.processar_upload_pdf(db, arquivo)
+    )
 
     # Criar documento no banco
-    documento = DocumentoTexto(
-        nome_arquivo=arquivo.filename,
-        texto_extraido=texto_extraido,
-        tamanho_arquivo=tamanho_arquivo,
-        usuario_id=usuario_atual.id,
+    return await ServicoDocumento.criar_documento(
+        db,
+        arquivo.filename,
+        paginas,
+        tamanho_arquivo,
+        usuario_atual.id,
+        hash_conteudo,
     )
 
-    db.add(documento)
-    db.commit()
-    db.refresh(documento)
 
-    return documento
+@router.post(
+    "/upload/assincrono",
+    response_model=TarefaResposta,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_documento_assincrono(
+    arquivo: UploadFile = File(...),
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Recebe o PDF e devolve na hora uma tarefa de extração, sem esperar o texto
+    ser extraído. O andamento é consultado em /documentos/jobs/{id_tarefa}.
+
+    - **arquivo**: Arquivo PDF para upload
+    - **Retorna**: Tarefa criada no estado pendente
+    """
+    return await ServicoTarefas.criar_tarefa_upload(db, arquivo, usuario_atual.id)
+
+
+@router.post("/upload/lote", response_model=ResultadoLote)
+async def upload_documentos_lote(
+    arquivos: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Recebe vários PDFs (e/ou arquivos ZIP com PDFs) em uma única requisição.
+    Os textos são extraídos em paralelo e todos os documentos são gravados
+    em uma única transação.
+
+    - **arquivos**: PDFs ou ZIPs (repita o campo para enviar vários)
+    - **Retorna**: Resultado de cada arquivo; falhas não interrompem o lote
+    """
+    return await ServicoLote.processar_lote(db, arquivos, usuario_atual.id)
+
+
+@router.get("/jobs/{id_tarefa}", response_model=TarefaResposta)
+async def obter_tarefa(
+    id_tarefa: str,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Consulta o estado de uma tarefa de extração assíncrona
+
+    - **id_tarefa**: ID da tarefa devolvido pelo upload assíncrono
+    - **estado**: pendente, processando, concluida ou falhou
+    - **documento_id**: Preenchido quando a tarefa for concluida
+    """
+    return await ServicoTarefas.obter_tarefa(db, id_tarefa, usuario_atual.id)
 
 
 @router.get("/", response_model=List[DocumentoLista])
 async def listar_documentos(
+    request: Request,
     pular: int = 0,
     limite: int = 100,
-    db: Session = Depends(conexao_db),
+    cursor: Optional[str] = None,
+    ordem: str = "antigos",
+    incluir_total: bool = False,
+    db: AsyncSession = Depends(conexao_db_assincrona),
     usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
 ):
     """
     Lista os documentos que o usuário logado subiu.
 
-    - **pular**: Número de registros para pular (paginação)
-    - **limite**: Número máximo de registros por página
+    - **limite**: Número máximo de registros por página (até 1000)
+    - **cursor**: Valor do header X-Proximo-Cursor da página anterior
+    - **ordem**: antigos (padrão), recentes ou nome
+    - **incluir_total**: Se verdadeiro, devolve o total no header X-Total-Count
+    - **pular**: Paginação antiga por deslocamento (ignorado quando há cursor);
+    prefira o cursor, que não fica mais lento em páginas profundas
+
+    Devolve ETag e Last-Modified; com If-None-Match (ou If-Modified-Since)
+    ainda válido a resposta é 304, sem consultar a listagem. As páginas ficam
+    no cache de respostas até o próximo upload, atualização ou exclusão.
     """
-    documentos = (
-        db.query(DocumentoTexto)
-        .filter(DocumentoTexto.usuario_id == usuario_atual.id)
-        .offset(pular)
-        .limit(limite)
-        .all()
+    usuario_id = usuario_atual.id
+    versao, data_alteracao = await ServicoDocumento.obter_versao_documentos(
+        db, usuario_id
     )
+    etag = etag_listagem(usuario_id, versao)
+    if nao_modificado(request, etag, data_alteracao):
+        return resposta_nao_modificada(etag, data_alteracao)
+    cabecalhos = cabecalhos_cache(etag, data_alteracao)
+
+    chave = chave_listagem(usuario_id, versao, limite, ordem, cursor, pular)
+    valor = await cache_respostas.obter(chave)
+    if valor is not None:
+        proximo_cursor, corpo = desempacotar(valor)
+    else:
+        documentos, proximo_cursor = await ServicoDocumento.listar_documentos(
+            db, usuario_id, limite, ordem, cursor, pular
+        )
+        corpo = adaptador_listagem.dump_json(
+            adaptador_listagem.validate_python(documentos, from_attributes=True)
+        )
+        await cache_respostas.guardar(chave, empacotar(proximo_cursor or "", corpo))
+
+    if proximo_cursor:
+        cabecalhos["X-Proximo-Cursor"] = proximo_cursor
+
+    if incluir_total:
+        chave_total = chave_listagem(usuario_id, versao, "total")
+        total = await cache_respostas.obter(chave_total)
+        if total is None:
+            total = str(await ServicoDocumento.contar_documentos(db, usuario_id))
+            total = total.encode()
+            await cache_respostas.guardar(chave_total, total)
+        cabecalhos["X-Total-Count"] = total.decode()
+
+    return Response(corpo, media_type="application/json", headers=cabecalhos)
+
+
+@router.delete("/")
+async def deletar_documentos(
+    ids: List[int] = Query(...),
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Deleta vários documentos de uma vez, sem carregar o conteúdo deles
+
+    - **ids**: IDs dos documentos (repita o parâmetro: ?ids=1&ids=2)
+    - **Retorna**: IDs efetivamente apagados; IDs de outros usuários são ignorados
+    """
+    if len(ids) > MAXIMO_LIMITE_LISTAGEM:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No máximo {MAXIMO_LIMITE_LISTAGEM} documentos por vez",
+        )
+
+    excluidos = await ServicoDocumento.excluir_documentos(db, usuario_atual.id, ids)
+
+    return {"excluidos": excluidos}
 
-    return documentos
+
+@router.get("/busca", response_model=List[ResultadoBusca])
+async def buscar_documentos(
+    q: str,
+    limite: int = 20,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Busca textual nos documentos do usuário logado, do mais relevante para o menos
+
+    - **q**: Termos da busca
+    - **limite**: Número máximo de resultados (até 100)
+    """
+    return await ServicoDocumento.buscar_documentos(db, usuario_atual.id, q, limite)
 
 
 @router.get("/{id_documento}", response_model=DocumentoResposta)
 async def obter_documento(
     id_documento: int,
-    db: Session = Depends(conexao_db),
+    request: Request,
+    db: AsyncSession = Depends(conexao_db_assincrona),
     usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
 ):
     """
     Consulta um documento específico pelo ID
 
     - **id_documento**: ID do documento
+
+    Com If-None-Match (ou If-Modified-Since) ainda válido a resposta é 304 e
+    o texto nem é lido do banco. Respostas de até TAMANHO_MAXIMO_RESPOSTA_CACHE
+    ficam no cache de respostas; as maiores são enviadas em partes (chunked),
+    sem montar o JSON inteiro na memória.
     """
-    documento = (
-        db.query(DocumentoTexto)
-        .filter(
-            DocumentoTexto.id == id_documento,
-            DocumentoTexto.usuario_id == usuario_atual.id,
-        )
-        .first()
+    documento = await ServicoDocumento.obter_documento(
+        db, id_documento, usuario_atual.id
     )
+    etag = etag_documento(documento)
+    ultima_modificacao = documento.data_atualizacao or documento.data_criacao
+    if nao_modificado(request, etag, ultima_modificacao):
+        return resposta_nao_modificada(etag, ultima_modificacao)
+    cabecalhos = cabecalhos_cache(etag, ultima_modificacao)
 
-    if not documento:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
+    # A versão guardada junto com a resposta descarta cópias de antes de uma
+    # atualização feita por outro processo, e a data de criação as de um
+    # documento apagado que tinha o mesmo id
+    chave = chave_documento(documento.usuario_id, documento.id)
+    versao = rotulo_documento(documento)
+    if CACHE_RESPOSTAS != "nenhum":
+        valor = await cache_respostas.obter(chave)
+        if valor is not None:
+            versao_guardada, corpo = desempacotar(valor)
+            if versao_guardada == versao:
+                return Response(
+                    corpo, media_type="application/json", headers=cabecalhos
+                )
+
+    blocos = await ServicoDocumento.obter_texto_em_blocos(db, documento)
+    partes = _json_documento(documento, blocos)
+    if CACHE_RESPOSTAS != "nenhum":
+        inicio, completo = await run_in_threadpool(
+            _juntar_ate, partes, TAMANHO_MAXIMO_RESPOSTA_CACHE
         )
+        if completo:
+            corpo = "".join(inicio).encode("utf-8")
+            await cache_respostas.guardar(chave, empacotar(versao, corpo))
+            return Response(corpo, media_type="application/json", headers=cabecalhos)
+        partes = chain(inicio, partes)
+
+    return StreamingResponse(partes, media_type="application/json", headers=cabecalhos)
+
+
+@router.get(
+    "/{id_documento}/texto",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/plain": {}}}},
+)
+async def baixar_texto_documento(
+    id_documento: int,
+    request: Request,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Baixa o texto extraído do documento como arquivo .txt
+
+    - **id_documento**: ID do documento
+
+    O texto é enviado em partes, na medida em que é lido (e descompactado).
+    Aceita If-None-Match / If-Modified-Since como GET /documentos/{id}.
+    """
+    documento = await ServicoDocumento.obter_documento(
+        db, id_documento, usuario_atual.id
+    )
+    etag = etag_documento(documento)
+    ultima_modificacao = documento.data_atualizacao or documento.data_criacao
+    if nao_modificado(request, etag, ultima_modificacao):
+        return resposta_nao_modificada(etag, ultima_modificacao)
+
+    blocos = await ServicoDocumento.obter_texto_em_blocos(db, documento)
+    return StreamingResponse(
+        blocos,
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": _cabecalho_download(documento.nome_arquivo),
+            **cabecalhos_cache(etag, ultima_modificacao),
+        },
+    )
 
-    return documento
+
+@router.get(
+    "/{id_documento}/arquivo",
+    response_class=Response,
+    responses={200: {"content": {"application/pdf": {}}}, 307: {}},
+)
+async def baixar_arquivo_documento(
+    id_documento: int,
+    request: Request,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Baixa o PDF original do documento
+
+    - **id_documento**: ID do documento
+
+    Com o armazenamento local o arquivo sai com sendfile, sem passar pelo
+    Python (servidor com http.response.pathsend ou nginx com
+    X-Accel-Redirect), e aceita Range; com o S3 a resposta é um 307 para uma
+    URL assinada. Documentos enviados antes do armazenamento, ou com
+    ARMAZENAMENTO_ARQUIVOS=nenhum, retornam 404.
+    """
+    documento = await ServicoDocumento.obter_documento(
+        db, id_documento, usuario_atual.id
+    )
+    if documento.chave_arquivo is not None:
+        etag = etag_arquivo(documento.chave_arquivo)
+        if nao_modificado(request, etag, documento.data_criacao):
+            return resposta_nao_modificada(etag, documento.data_criacao)
+        cabecalhos = cabecalhos_cache(etag, documento.data_criacao)
+    else:
+        cabecalhos = {}
+
+    cabecalhos["Content-Disposition"] = _cabecalho_download(
+        documento.nome_arquivo, ".pdf"
+    )
+    return await ServicoDocumento.resposta_arquivo(documento, cabecalhos)
+
+
+@router.get("/{id_documento}/paginas", response_model=DocumentoPaginas)
+async def obter_paginas_documento(
+    id_documento: int,
+    inicio: int = 1,
+    fim: int = 1,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Consulta o texto de um intervalo de páginas, sem trazer o documento inteiro
+
+    - **id_documento**: ID do documento
+    - **inicio**: Primeira página (começando em 1)
+    - **fim**: Última página, inclusive (no máximo 100 páginas por consulta)
+    """
+    return await ServicoDocumento.obter_paginas(
+        db, id_documento, usuario_atual.id, inicio, fim
+    )
+
+
+@router.get("/{id_documento}/trecho", response_model=DocumentoTrecho)
+async def obter_trecho_documento(
+    id_documento: int,
+    inicio: int = 0,
+    tamanho: int = 10000,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Consulta um trecho do texto do documento, recortado direto no banco
+
+    - **id_documento**: ID do documento
+    - **inicio**: Posição do primeiro caractere (começando em 0)
+    - **tamanho**: Quantidade de caracteres
+    """
+    return await ServicoDocumento.obter_trecho(
+        db, id_documento, usuario_atual.id, inicio, tamanho
+    )
+
+
+@router.get("/{id_documento}/versoes", response_model=HistoricoTexto)
+async def listar_versoes_documento(
+    id_documento: int,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Lista as versões anteriores do texto do documento, da mais recente para a mais antiga
+
+    - **id_documento**: ID do documento
+    - **Retorna**: Versão atual e, de cada versão anterior, o motivo da troca
+    (edicao ou reextracao) e quando ela foi substituída
+    """
+    return await ServicoDocumento.obter_historico_texto(
+        db, id_documento, usuario_atual.id
+    )
+
+
+@router.get("/{id_documento}/versoes/{versao}", response_model=VersaoTextoResposta)
+async def obter_versao_documento(
+    id_documento: int,
+    versao: int,
+    db: AsyncSession = Depends(conexao_db_assincrona),
+    usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
+):
+    """
+    Consulta o texto de uma versão anterior do documento
+
+    - **id_documento**: ID do documento
+    - **versao**: Versão listada em /documentos/{id_documento}/versoes
+    """
+    return await ServicoDocumento.obter_versao_texto(
+        db, id_documento, usuario_atual.id, versao
+    )
 
 
 @router.put("/{id_documento}", response_model=DocumentoResposta)
 async def atualizar_documento(
     id_documento: int,
     documento_atualizacao: DocumentoAtualizar,
-    db: Session = Depends(conexao_db),
+    db: AsyncSession = Depends(conexao_db_assincrona),
     usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
 ):
     """
@@ -118,35 +508,21 @@ async def atualizar_documento(
     - **id_documento**: ID do documento
     - **documento_atualizacao**: Dados para atualizacao
     """
-    documento = (
-        db.query(DocumentoTexto)
-        .filter(
-            DocumentoTexto.id == id_documento,
-            DocumentoTexto.usuario_id == usuario_atual.id,
-        )
-        .first()
+    # O texto atual não é carregado só para conferir o dono
+    documento = await ServicoDocumento.obter_documento(
+        db, id_documento, usuario_atual.id
     )
 
-    if not documento:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
-        )
-
     # Atualizar apenas campos fornecidos
-    dados_atualizacao = documento_atualizacao.dict(exclude_unset=True)
-    for campo, valor in dados_atualizacao.items():
-        setattr(documento, campo, valor)
-
-    db.commit()
-    db.refresh(documento)
-
-    return documento
+    return await ServicoDocumento.atualizar_documento(
+        db, documento, documento_atualizacao.model_dump(exclude_unset=True)
+    )
 
 
 @router.delete("/{id_documento}", status_code=status.HTTP_204_NO_CONTENT)
 async def deletar_documento(
     id_documento: int,
-    db: Session = Depends(conexao_db),
+    db: AsyncSession = Depends(conexao_db_assincrona),
     usuario_atual: Usuario = Depends(ServicoAutenticacao.obter_usuario_atual),
 ):
     """
@@ -154,21 +530,7 @@ async def deletar_documento(
 
     - **id_documento**: ID do documento
     """
-    documento = (
-        db.query(DocumentoTexto)
-        .filter(
-            DocumentoTexto.id == id_documento,
-            DocumentoTexto.usuario_id == usuario_atual.id,
-        )
-        .first()
-    )
-
-    if not documento:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
-        )
-
-    db.delete(documento)
-    db.commit()
+    await ServicoDocumento.verificar_dono_documento(db, id_documento, usuario_atual.id)
+    await ServicoDocumento.excluir_documentos(db, usuario_atual.id, [id_documento])
 
     return None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class DocumentoBase(BaseModel):
@@ -36,6 +36,20 @@ class DocumentoResposta(DocumentoBase):
         from_attributes = True
 
 
+class DocumentoMetadados(BaseModel):
+    """Campos do DocumentoResposta sem o texto, para montar a resposta em blocos"""
+
+    nome_arquivo: str
+    id: int
+    tamanho_arquivo: int
+    usuario_id: int
+    data_criacao: datetime
+    data_atualizacao: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class DocumentoLista(BaseModel):
     """Schema para listagem de documentos"""
 
@@ -46,3 +60,79 @@ class DocumentoLista(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PaginaResposta(BaseModel):
+    """Schema para o texto de uma página"""
+
+    numero_pagina: int
+    texto: str
+
+
+class DocumentoPaginas(BaseModel):
+    """Schema para consulta de um intervalo de páginas do documento"""
+
+    documento_id: int
+    total_paginas: int
+    paginas: List[PaginaResposta]
+
+
+class DocumentoTrecho(BaseModel):
+    """Schema para consulta de um trecho do texto do documento"""
+
+    documento_id: int
+    inicio: int
+    tamanho_total: int
+    texto: str
+
+
+class VersaoTextoResumo(BaseModel):
+    """Schema para uma versão anterior do texto, sem o texto"""
+
+    versao: int
+    motivo: str
+    versao_extrator: Optional[int] = None
+    data_substituicao: Optional[datetime] = None
+
+
+class HistoricoTexto(BaseModel):
+    """Schema para o histórico de versões do texto de um documento"""
+
+    documento_id: int
+    versao_atual: int
+    versoes: List[VersaoTextoResumo]
+
+
+class VersaoTextoResposta(VersaoTextoResumo):
+    """Schema para o texto de uma versão anterior do documento"""
+
+    documento_id: int
+    texto_extraido: str
+
+
+class ResultadoBusca(BaseModel):
+    """Schema para resultado da busca textual"""
+
+    id: int
+    nome_arquivo: str
+    trecho: str
+    relevancia: float
+
+
+class ResultadoArquivoLote(BaseModel):
+    """Schema para o resultado de um arquivo do upload em lote"""
+
+    nome_arquivo: str
+    sucesso: bool
+    documento_id: Optional[int] = None
+    tamanho_arquivo: int
+    erro: Optional[str] = None
+
+
+class ResultadoLote(BaseModel):
+    """Schema para resposta do upload em lote"""
+
+    total: int
+    sucesso: int
+    falhas: int
+    arquivos: List[ResultadoArquivoLote]
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class TarefaResposta(BaseModel):
+    """Schema para resposta de tarefa de extração assíncrona"""
+
+    id: str
+    estado: str
+    nome_arquivo: str
+    documento_id: Optional[int] = None
+    erro: Optional[str] = None
+    data_criacao: datetime
+    data_atualizacao: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,311 @@
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import FileResponse, RedirectResponse
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # S3 é opcional: pip install boto3
+    boto3 = None
+    ClientError = OSError
+
+# Onde ficam os PDFs originais e os textos grandes: "local" (pasta no disco),
+# "s3" (bucket S3 ou compatível: MinIO, Ceph...) ou "nenhum" (o PDF é descartado)
+BACKENDS_ARMAZENAMENTO = ("local", "s3", "nenhum")
+ARMAZENAMENTO_ARQUIVOS = os.getenv("ARMAZENAMENTO_ARQUIVOS", "local").lower()
+PASTA_ARMAZENAMENTO = os.getenv("PASTA_ARMAZENAMENTO", "armazenamento")
+BUCKET_S3 = os.getenv("BUCKET_S3", "")
+PREFIXO_S3 = os.getenv("PREFIXO_S3", "documentos/")
+# Endpoint de um servidor compatível com S3 (ex.: http://localhost:9000 do MinIO)
+URL_ENDPOINT_S3 = os.getenv("URL_ENDPOINT_S3") or None
+EXPIRACAO_URL_S3_SEGUNDOS = int(os.getenv("EXPIRACAO_URL_S3_SEGUNDOS", "300"))
+
+# Textos que ocupariam mais que isso no banco (já compactados) vão para o
+# armazenamento e a linha guarda só a chave. O padrão 0 mantém todo texto no
+# banco: fora dele o texto só fica tão durável quanto o armazenamento (uma
+# pasta local some a cada deploy em discos efêmeros, como o do Render)
+LIMITE_TEXTO_NO_BANCO = int(os.getenv("LIMITE_TEXTO_NO_BANCO_KIB", "0")) * 1024
+
+# "direto": o próprio Python envia o arquivo (com sendfile quando o servidor
+# ASGI suporta http.response.pathsend); "x-accel-redirect": só os headers saem
+# daqui e o nginx envia o arquivo com sendfile, a partir do location interno
+ENVIOS_ARQUIVOS = ("direto", "x-accel-redirect")
+ENVIO_ARQUIVOS = os.getenv("ENVIO_ARQUIVOS", "direto").lower()
+PREFIXO_X_ACCEL_REDIRECT = os.getenv("PREFIXO_X_ACCEL_REDIRECT", "/_armazenamento/")
+
+if ARMAZENAMENTO_ARQUIVOS not in BACKENDS_ARMAZENAMENTO:
+    raise ValueError(
+        f"ARMAZENAMENTO_ARQUIVOS deve ser um de: {', '.join(BACKENDS_ARMAZENAMENTO)}"
+    )
+if ENVIO_ARQUIVOS not in ENVIOS_ARQUIVOS:
+    raise ValueError(f"ENVIO_ARQUIVOS deve ser um de: {', '.join(ENVIOS_ARQUIVOS)}")
+if ARMAZENAMENTO_ARQUIVOS == "s3" and boto3 is None:
+    raise ValueError("ARMAZENAMENTO_ARQUIVOS=s3 requer o pacote boto3")
+if ARMAZENAMENTO_ARQUIVOS == "s3" and not BUCKET_S3:
+    raise ValueError("ARMAZENAMENTO_ARQUIVOS=s3 requer BUCKET_S3")
+
+# As chaves são o SHA-256 do conteúdo, em hexadecimal
+_FORMATO_CHAVE = re.compile(r"[0-9a-f]{64}")
+
+
+def _validar_chave(chave: str) -> str:
+    # A chave vira caminho no disco: nada além de hexadecimal chega ao os.path
+    if not _FORMATO_CHAVE.fullmatch(chave):
+        raise ValueError(f"Chave de armazenamento inválida: {chave!r}")
+    return chave
+
+
+def caminho_relativo(chave: str) -> str:
+    """Caminho do blob dentro do armazenamento: ab/cd/abcd..."""
+    _validar_chave(chave)
+    return f"{chave[:2]}/{chave[2:4]}/{chave}"
+
+
+class ArmazenamentoLocal:
+    """
+    Blobs endereçados pelo conteúdo em uma pasta local, em dois níveis de subpastas
+
+    O mesmo conteúdo é guardado uma vez só. As gravações vão para um arquivo
+    temporário na pasta final e são publicadas com os.replace, então um blob
+    nunca é visto pela metade; os métodos são síncronos (chamar em thread).
+    """
+
+    def __init__(self, pasta: str):
+        self.pasta = os.path.abspath(pasta)
+
+    def caminho(self, chave: str) -> str:
+        return os.path.join(self.pasta, *caminho_relativo(chave).split("/"))
+
+    def _publicar(self, chave: str, escrever) -> None:
+        destino = self.caminho(chave)
+        if os.path.exists(destino):
+            # Já guardado: renova a data para a limpeza não levar o blob que
+            # está para ser referenciado de novo
+            os.utime(destino)
+            return
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+        try:
+            escrever(temporario)
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+
+    def guardar_arquivo(self, chave: str, caminho_origem: str) -> None:
+        def escrever(temporario: str) -> None:
+            try:
+                # Mesmo sistema de arquivos: vira um hard link, sem copiar bytes
+                os.link(caminho_origem, temporario)
+            except OSError:
+                shutil.copyfile(caminho_origem, temporario)
+
+        self._publicar(chave, escrever)
+
+    def guardar_bytes(self, chave: str, dados: bytes) -> None:
+        def escrever(temporario: str) -> None:
+            with open(temporario, "wb") as destino:
+                destino.write(dados)
+
+        self._publicar(chave, escrever)
+
+    def ler_bytes(self, chave: str) -> bytes:
+        with open(self.caminho(chave), "rb") as origem:
+            return origem.read()
+
+    def baixar_arquivo(self, chave: str, caminho_destino: str) -> None:
+        try:
+            os.link(self.caminho(chave), caminho_destino)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(self.caminho(chave), caminho_destino)
+
+    def existe(self, chave: str) -> bool:
+        return os.path.isfile(self.caminho(chave))
+
+    def remover(self, chave: str) -> None:
+        try:
+            os.remove(self.caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    def modificado_em(self, chave: str) -> Optional[datetime]:
+        """Data da última gravação do blob (None se ele não existir)"""
+        try:
+            modificado = os.stat(self.caminho(chave)).st_mtime
+        except FileNotFoundError:
+            return None
+        return datetime.fromtimestamp(modificado, timezone.utc)
+
+    def listar(self) -> Iterator[Tuple[str, datetime]]:
+        """Chave e data da última gravação de cada blob"""
+        for pasta, _, arquivos in os.walk(self.pasta):
+            for nome in arquivos:
+                if _FORMATO_CHAVE.fullmatch(nome):
+                    modificado = os.stat(os.path.join(pasta, nome)).st_mtime
+                    yield nome, datetime.fromtimestamp(modificado, timezone.utc)
+
+    def resposta_arquivo(
+        self, chave: str, media_type: str, cabecalhos: dict
+    ) -> Response:
+        """
+        Resposta que envia o blob sem passar os bytes pelo Python quando possível
+
+        Raises:
+            FileNotFoundError: Se o blob não existir
+        """
+        caminho = self.caminho(chave)
+        estado = os.stat(caminho)
+        if ENVIO_ARQUIVOS == "x-accel-redirect":
+            return Response(
+                media_type=media_type,
+                headers={
+                    "X-Accel-Redirect": PREFIXO_X_ACCEL_REDIRECT
+                    + caminho_relativo(chave),
+                    **cabecalhos,
+                },
+            )
+        # FileResponse responde a Range e usa http.response.pathsend (sendfile
+        # no servidor) quando disponível; senão lê o arquivo em blocos
+        return FileResponse(
+            caminho, media_type=media_type, headers=cabecalhos, stat_result=estado
+        )
+
+
+class ArmazenamentoS3:
+    """
+    Blobs endereçados pelo conteúdo em um bucket S3 ou compatível
+
+    Recebe o cliente boto3 já criado, então qualquer servidor compatível
+    serve (MinIO, ou o moto nos testes). O download não passa pela API: a
+    resposta é um redirecionamento para uma URL assinada de curta duração.
+    """
+
+    def __init__(self, cliente, bucket: str, prefixo: str = PREFIXO_S3):
+        self._cliente = cliente
+        self.bucket = bucket
+        self.prefixo = prefixo
+
+    def _objeto(self, chave: str) -> str:
+        return self.prefixo + _validar_chave(chave)
+
+    def _publicar(self, chave: str, enviar) -> None:
+        if self.existe(chave):
+            # Copiar o objeto sobre ele mesmo renova o LastModified (ver listar)
+            self._cliente.copy_object(
+                Bucket=self.bucket,
+                Key=self._objeto(chave),
+                CopySource={"Bucket": self.bucket, "Key": self._objeto(chave)},
+                MetadataDirective="REPLACE",
+            )
+            return
+        enviar()
+
+    def guardar_arquivo(self, chave: str, caminho_origem: str) -> None:
+        # upload_file divide os arquivos grandes em partes (multipart upload)
+        self._publicar(
+            chave,
+            lambda: self._cliente.upload_file(
+                caminho_origem, self.bucket, self._objeto(chave)
+            ),
+        )
+
+    def guardar_bytes(self, chave: str, dados: bytes) -> None:
+        self._publicar(
+            chave,
+            lambda: self._cliente.put_object(
+                Bucket=self.bucket, Key=self._objeto(chave), Body=dados
+            ),
+        )
+
+    def ler_bytes(self, chave: str) -> bytes:
+        try:
+            objeto = self._cliente.get_object(
+                Bucket=self.bucket, Key=self._objeto(chave)
+            )
+        except ClientError as erro:
+            if erro.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise FileNotFoundError(chave) from erro
+            raise
+        return objeto["Body"].read()
+
+    def baixar_arquivo(self, chave: str, caminho_destino: str) -> None:
+        # download_file baixa os arquivos grandes em partes, direto para o disco
+        try:
+            self._cliente.download_file(
+                self.bucket, self._objeto(chave), caminho_destino
+            )
+        except ClientError as erro:
+            if erro.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise FileNotFoundError(chave) from erro
+            raise
+
+    def existe(self, chave: str) -> bool:
+        try:
+            self._cliente.head_object(Bucket=self.bucket, Key=self._objeto(chave))
+        except ClientError as erro:
+            if erro.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return False
+            raise
+        return True
+
+    def remover(self, chave: str) -> None:
+        self._cliente.delete_object(Bucket=self.bucket, Key=self._objeto(chave))
+
+    def modificado_em(self, chave: str) -> Optional[datetime]:
+        """Data da última gravação do blob (None se ele não existir)"""
+        try:
+            objeto = self._cliente.head_object(
+                Bucket=self.bucket, Key=self._objeto(chave)
+            )
+        except ClientError as erro:
+            if erro.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return objeto["LastModified"]
+
+    def listar(self) -> Iterator[Tuple[str, datetime]]:
+        """Chave e data da última gravação de cada blob"""
+        paginador = self._cliente.get_paginator("list_objects_v2")
+        for pagina in paginador.paginate(Bucket=self.bucket, Prefix=self.prefixo):
+            for objeto in pagina.get("Contents", []):
+                chave = objeto["Key"][len(self.prefixo) :]
+                if _FORMATO_CHAVE.fullmatch(chave):
+                    yield chave, objeto["LastModified"]
+
+    def resposta_arquivo(
+        self, chave: str, media_type: str, cabecalhos: dict
+    ) -> Response:
+        """Redirecionamento para uma URL assinada do objeto"""
+        parametros = {
+            "Bucket": self.bucket,
+            "Key": self._objeto(chave),
+            "ResponseContentType": media_type,
+        }
+        if "Content-Disposition" in cabecalhos:
+            parametros["ResponseContentDisposition"] = cabecalhos["Content-Disposition"]
+        url = self._cliente.generate_presigned_url(
+            "get_object", Params=parametros, ExpiresIn=EXPIRACAO_URL_S3_SEGUNDOS
+        )
+        return RedirectResponse(url, headers={"Cache-Control": "no-store"})
+
+
+def criar_armazenamento():
+    """Armazenamento configurado pelas variáveis de ambiente (None se desligado)"""
+    if ARMAZENAMENTO_ARQUIVOS == "s3":
+        return ArmazenamentoS3(
+            boto3.client("s3", endpoint_url=URL_ENDPOINT_S3), BUCKET_S3
+        )
+    if ARMAZENAMENTO_ARQUIVOS == "local":
+        return ArmazenamentoLocal(PASTA_ARMAZENAMENTO)
+    return None
+
+
+armazenamento = criar_armazenamento()
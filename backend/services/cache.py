@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class EstatisticasCache:
+    """Contadores de acertos e falhas de um cache"""
+
+    def __init__(self):
+        self.acertos = 0
+        self.falhas = 0
+
+    def registrar(self, acerto: bool) -> None:
+        if acerto:
+            self.acertos += 1
+        else:
+            self.falhas += 1
+
+    def como_dict(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": round(self.acertos / total, 4) if total else 0.0,
+        }
+
+
+class CacheTTL:
+    """
+    Cache em memória com limite de itens (LRU) e tempo de vida por item
+
+    Seguro para uso entre threads, já que dependências síncronas do FastAPI
+    rodam no threadpool. Cada processo da API tem o seu próprio cache.
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl_segundos: float):
+        self.tamanho_maximo = max(1, tamanho_maximo)
+        self.ttl_segundos = ttl_segundos
+        self.estatisticas = EstatisticasCache()
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """Devolve o valor guardado ou None se não existir ou tiver expirado"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[0] <= time.monotonic():
+                del self._itens[chave]
+                item = None
+
+            if item is not None:
+                self._itens.move_to_end(chave)
+
+            self.estatisticas.registrar(item is not None)
+            return item[1] if item is not None else None
+
+    def guardar(
+        self, chave: Hashable, valor: Any, ttl_segundos: Optional[float] = None
+    ) -> None:
+        """Guarda um valor, descartando o menos usado se o cache estiver cheio"""
+        ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+        if ttl <= 0:
+            return
+
+        with self._trava:
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave: Hashable) -> None:
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._itens.clear()
+
+
+class CacheLRUBytes:
+    """
+    Cache em memória de valores em bytes, limitado pelo total de bytes guardados
+
+    Descarta os itens menos usados quando o total passa do limite e cada item
+    vale até o seu tempo de vida. Cada processo da API tem o seu próprio cache.
+    """
+
+    def __init__(self, bytes_maximos: int, ttl_segundos: float):
+        self.bytes_maximos = max(0, bytes_maximos)
+        self.ttl_segundos = ttl_segundos
+        self.bytes_usados = 0
+        self.estatisticas = EstatisticasCache()
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, chave: Hashable) -> Optional[bytes]:
+        """Devolve o valor guardado ou None se não existir ou tiver expirado"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None and item[0] <= time.monotonic():
+                self._descartar(chave)
+                item = None
+
+            if item is not None:
+                self._itens.move_to_end(chave)
+
+            self.estatisticas.registrar(item is not None)
+            return item[1] if item is not None else None
+
+    def guardar(self, chave: Hashable, valor: bytes) -> None:
+        """Guarda um valor, descartando os menos usados até caber no limite"""
+        if len(valor) > self.bytes_maximos or self.ttl_segundos <= 0:
+            return
+
+        with self._trava:
+            self._descartar(chave)
+            self._itens[chave] = (time.monotonic() + self.ttl_segundos, valor)
+            self.bytes_usados += len(valor)
+            while self.bytes_usados > self.bytes_maximos:
+                self._descartar(next(iter(self._itens)))
+
+    def remover(self, chave: Hashable) -> None:
+        with self._trava:
+            self._descartar(chave)
+
+    def limpar(self) -> None:
+        with self._trava:
+            self._itens.clear()
+            self.bytes_usados = 0
+
+    def _descartar(self, chave: Hashable) -> None:
+        item = self._itens.pop(chave, None)
+        if item is not None:
+            self.bytes_usados -= len(item[1])
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response, status
+
+# O cliente pode guardar a resposta, mas precisa revalidar (If-None-Match) antes de usar
+CONTROLE_CACHE = "private, no-cache"
+
+
+def _em_utc(data: datetime) -> datetime:
+    # O SQLite devolve CURRENT_TIMESTAMP sem fuso, mas em UTC
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def etag_documento(documento) -> str:
+    """
+    ETag de um documento, a partir do ID, dono, criação e versão (sem ler o texto)
+
+    O dono e a data de criação impedem que o ETag de um documento apagado
+    valha para outro que recebeu o mesmo ID.
+    """
+    criacao = int(_em_utc(documento.data_criacao).timestamp())
+    return (
+        f'W/"d{documento.id}.{documento.usuario_id}.{criacao}.{documento.versao or 1}"'
+    )
+
+
+def etag_listagem(usuario_id: int, versao: int) -> str:
+    """ETag da listagem, a partir do contador de alterações do usuario"""
+    return f'W/"u{usuario_id}.{versao}"'
+
+
+def etag_arquivo(chave_arquivo: str) -> str:
+    """ETag forte do PDF original: a chave já é o SHA-256 do conteúdo"""
+    return f'"{chave_arquivo}"'
+
+
+def cabecalhos_cache(etag: str, ultima_modificacao: Optional[datetime]) -> dict:
+    """Headers de validação enviados tanto na resposta completa quanto no 304"""
+    cabecalhos = {"ETag": etag, "Cache-Control": CONTROLE_CACHE}
+    if ultima_modificacao is not None:
+        cabecalhos["Last-Modified"] = format_datetime(
+            _em_utc(ultima_modificacao), usegmt=True
+        )
+    return cabecalhos
+
+
+def _etags_iguais(cabecalho: str, etag: str) -> bool:
+    # Comparação fraca: W/"x" e "x" representam a mesma versão
+    valor = etag.removeprefix("W/")
+    for candidata in cabecalho.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == valor:
+            return True
+    return False
+
+
+def nao_modificado(
+    request: Request, etag: str, ultima_modificacao: Optional[datetime]
+) -> bool:
+    """
+    Verifica se a cópia do cliente ainda vale (If-None-Match / If-Modified-Since)
+
+    Como manda a RFC 9110, If-Modified-Since só é considerado quando a
+    requisição não traz If-None-Match.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etags_iguais(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or ultima_modificacao is None:
+        return False
+    try:
+        data_cliente = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if data_cliente.tzinfo is None:
+        return False
+    return _em_utc(ultima_modificacao) <= data_cliente
+
+
+def resposta_nao_modificada(
+    etag: str, ultima_modificacao: Optional[datetime]
+) -> Response:
+    """Resposta 304, sem corpo, com os mesmos headers de validação"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cabecalhos_cache(etag, ultima_modificacao),
+    )
@@ -0,0 +1,141 @@
+import logging
+import os
+from typing import Optional, Tuple
+from backend.services.cache import CacheLRUBytes, EstatisticasCache
+
+try:
+    import redis.asyncio as redis_assincrono
+    from redis.exceptions import RedisError
+except ImportError:  # Redis é opcional: pip install redis
+    redis_assincrono = None
+    RedisError = OSError
+
+# Onde ficam as respostas serializadas: "memoria" (LRU por processo),
+# "redis" (compartilhado entre processos) ou "nenhum" (desligado)
+BACKENDS_CACHE_RESPOSTAS = ("memoria", "redis", "nenhum")
+CACHE_RESPOSTAS = os.getenv("CACHE_RESPOSTAS", "memoria").lower()
+TAMANHO_CACHE_RESPOSTAS_MB = int(os.getenv("TAMANHO_CACHE_RESPOSTAS_MB", "64"))
+# Respostas maiores que isso não são guardadas (continuam sendo enviadas em partes)
+TAMANHO_MAXIMO_RESPOSTA_CACHE = (
+    int(os.getenv("TAMANHO_MAXIMO_RESPOSTA_CACHE_KIB", "1024")) * 1024
+)
+TTL_CACHE_RESPOSTAS_SEGUNDOS = int(os.getenv("TTL_CACHE_RESPOSTAS_SEGUNDOS", "300"))
+URL_REDIS_CACHE = os.getenv("URL_REDIS_CACHE", "redis://localhost:6379/0")
+PREFIXO_REDIS_CACHE = os.getenv("PREFIXO_REDIS_CACHE", "desafio_api:")
+if CACHE_RESPOSTAS not in BACKENDS_CACHE_RESPOSTAS:
+    raise ValueError(
+        f"CACHE_RESPOSTAS deve ser um de: {', '.join(BACKENDS_CACHE_RESPOSTAS)}"
+    )
+if CACHE_RESPOSTAS == "redis" and redis_assincrono is None:
+    raise ValueError("CACHE_RESPOSTAS=redis requer o pacote redis")
+
+logger = logging.getLogger(__name__)
+
+
+def chave_documento(usuario_id: int, id_documento: int) -> str:
+    return f"documento:{usuario_id}:{id_documento}"
+
+
+def rotulo_documento(documento) -> str:
+    """
+    Rótulo guardado com a resposta de um documento: versão e data de criação
+
+    A data de criação separa um documento de outro que recebeu o mesmo id
+    depois de uma exclusão (bancos SQLite criados antes do AUTOINCREMENT),
+    mesmo que a cópia antiga tenha ficado no cache de outro processo.
+    """
+    return f"{documento.versao or 1}:{documento.data_criacao.isoformat()}"
+
+
+def chave_listagem(usuario_id: int, versao: int, *parametros) -> str:
+    # A versão dos documentos do usuario faz parte da chave: qualquer escrita
+    # torna as páginas antigas inalcançáveis, até em outros processos
+    return f"listagem:{usuario_id}:{versao}:" + ":".join(map(str, parametros))
+
+
+def empacotar(rotulo: str, corpo: bytes) -> bytes:
+    """Junta um rótulo de uma linha (versão, cursor...) ao corpo da resposta"""
+    return rotulo.encode("utf-8") + b"\n" + corpo
+
+
+def desempacotar(valor: bytes) -> Tuple[str, bytes]:
+    rotulo, _, corpo = valor.partition(b"\n")
+    return rotulo.decode("utf-8"), corpo
+
+
+class CacheRespostasMemoria:
+    """Respostas em um LRU limitado por bytes, separado em cada processo da API"""
+
+    def __init__(self, bytes_maximos: int, ttl_segundos: float):
+        self._cache = CacheLRUBytes(bytes_maximos, ttl_segundos)
+        self.estatisticas = self._cache.estatisticas
+
+    async def obter(self, chave: str) -> Optional[bytes]:
+        return self._cache.obter(chave)
+
+    async def guardar(self, chave: str, valor: bytes) -> None:
+        self._cache.guardar(chave, valor)
+
+    async def remover(self, *chaves: str) -> None:
+        for chave in chaves:
+            self._cache.remover(chave)
+
+    async def fechar(self) -> None:
+        self._cache.limpar()
+
+
+class CacheRespostasRedis:
+    """
+    Respostas no Redis (ou em outro servidor compatível), compartilhadas entre processos
+
+    Recebe o cliente assíncrono já criado, então qualquer implementação
+    compatível com redis.asyncio serve (ex.: fakeredis nos testes). Falhas
+    de conexão viram falhas de cache: a resposta é montada a partir do banco.
+    """
+
+    def __init__(self, cliente, ttl_segundos: int, prefixo: str = PREFIXO_REDIS_CACHE):
+        self._cliente = cliente
+        self.ttl_segundos = ttl_segundos
+        self.prefixo = prefixo
+        self.estatisticas = EstatisticasCache()
+
+    async def obter(self, chave: str) -> Optional[bytes]:
+        try:
+            valor = await self._cliente.get(self.prefixo + chave)
+        except (RedisError, OSError) as erro:
+            logger.warning("Cache de respostas indisponível: %s", erro)
+            valor = None
+        self.estatisticas.registrar(valor is not None)
+        return valor
+
+    async def guardar(self, chave: str, valor: bytes) -> None:
+        try:
+            await self._cliente.set(self.prefixo + chave, valor, ex=self.ttl_segundos)
+        except (RedisError, OSError) as erro:
+            logger.warning("Cache de respostas indisponível: %s", erro)
+
+    async def remover(self, *chaves: str) -> None:
+        if not chaves:
+            return
+        try:
+            await self._cliente.delete(*(self.prefixo + chave for chave in chaves))
+        except (RedisError, OSError) as erro:
+            logger.warning("Cache de respostas indisponível: %s", erro)
+
+    async def fechar(self) -> None:
+        await self._cliente.aclose()
+
+
+def criar_cache_respostas():
+    """Cache de respostas configurado pelas variáveis de ambiente"""
+    if CACHE_RESPOSTAS == "redis":
+        return CacheRespostasRedis(
+            redis_assincrono.from_url(URL_REDIS_CACHE), TTL_CACHE_RESPOSTAS_SEGUNDOS
+        )
+    bytes_maximos = (
+        TAMANHO_CACHE_RESPOSTAS_MB * 1024 * 1024 if CACHE_RESPOSTAS == "memoria" else 0
+    )
+    return CacheRespostasMemoria(bytes_maximos, TTL_CACHE_RESPOSTAS_SEGUNDOS)
+
+
+cache_respostas = criar_cache_respostas()
@@ -0,0 +1,24 @@
+from typing import Tuple
+
+
+class MiddlewareCompressao:
+    """
+    Aplica o middleware de compressão em todas as rotas, menos nas de arquivos
+
+    O PDF já é compactado por dentro, e passar pelo gzip/brotli desfaria o
+    envio com sendfile e as respostas a Range. As rotas cujo caminho termina
+    com um dos sufixos informados vão direto para a aplicação.
+    """
+
+    def __init__(self, app, middleware, sufixos_ignorados: Tuple[str, ...], **opcoes):
+        self.app = app
+        self.comprimido = middleware(app, **opcoes)
+        self.sufixos_ignorados = sufixos_ignorados
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].rstrip("/").endswith(
+            self.sufixos_ignorados
+        ):
+            await self.app(scope, receive, send)
+            return
+        await self.comprimido(scope, receive, send)
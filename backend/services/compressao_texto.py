@@ -0,0 +1,134 @@
+import codecs
+import os
+import zlib
+from typing import Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional: pip install zstandard
+    zstandard = None
+
+# Codecs aceitos para o texto dos documentos; "nenhum" grava o texto puro
+SEM_COMPRESSAO = "nenhum"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+CODECS_TEXTO = (SEM_COMPRESSAO, CODEC_ZLIB, CODEC_ZSTD)
+
+# Codec usado nas gravações novas; linhas antigas continuam legíveis em qualquer modo
+COMPRESSAO_TEXTO = os.getenv("COMPRESSAO_TEXTO", SEM_COMPRESSAO).lower()
+NIVEL_ZLIB = int(os.getenv("NIVEL_ZLIB", "6"))
+NIVEL_ZSTD = int(os.getenv("NIVEL_ZSTD", "3"))
+if COMPRESSAO_TEXTO not in CODECS_TEXTO:
+    raise ValueError(f"COMPRESSAO_TEXTO deve ser um de: {', '.join(CODECS_TEXTO)}")
+if COMPRESSAO_TEXTO == CODEC_ZSTD and zstandard is None:
+    raise ValueError("COMPRESSAO_TEXTO=zstd requer o pacote zstandard")
+
+# Bytes compactados entregues por vez ao descompactador em iterar_texto_das_colunas
+TAMANHO_BLOCO_COMPACTADO = 64 * 1024
+
+
+def compactar(texto: str, codec: str) -> bytes:
+    dados = texto.encode("utf-8")
+    if codec == CODEC_ZLIB:
+        return zlib.compress(dados, NIVEL_ZLIB)
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+    raise ValueError(f"Codec de texto indisponível: {codec}")
+
+
+def descompactar(codec: str, dados: bytes) -> str:
+    # "nenhum" só aparece nos textos guardados fora do banco, em UTF-8 puro
+    if codec == SEM_COMPRESSAO:
+        return bytes(dados).decode("utf-8")
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(dados).decode("utf-8")
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(dados).decode("utf-8")
+    raise ValueError(f"Codec de texto indisponível: {codec}")
+
+
+def colunas_texto(texto: str, codec: Optional[str] = None) -> dict:
+    """
+    Valores das colunas de texto do documento para gravar o texto informado
+
+    Compactado, o texto vai para texto_compactado e texto_extraido fica vazio
+    (a coluna é NOT NULL); se a compressão não diminuir o tamanho, o texto é
+    gravado puro, com codec_texto nulo.
+
+    Args:
+        texto: Texto completo do documento
+        codec: Codec a usar (padrão: COMPRESSAO_TEXTO)
+
+    Returns:
+        dict: texto_extraido, texto_compactado e codec_texto
+    """
+    codec = codec or COMPRESSAO_TEXTO
+    if codec != SEM_COMPRESSAO:
+        dados = compactar(texto, codec)
+        if len(dados) < len(texto.encode("utf-8")):
+            return {
+                "texto_extraido": "",
+                "texto_compactado": dados,
+                "codec_texto": codec,
+            }
+    return {"texto_extraido": texto, "texto_compactado": None, "codec_texto": None}
+
+
+def texto_das_colunas(
+    texto_extraido: str, codec_texto: Optional[str], texto_compactado: Optional[bytes]
+) -> str:
+    """Texto completo a partir das colunas gravadas, compactadas ou não"""
+    if codec_texto is None:
+        return texto_extraido
+    return descompactar(codec_texto, texto_compactado)
+
+
+class _SemDescompactacao:
+    def decompress(self, dados) -> bytes:
+        return bytes(dados)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _descompactador(codec: str):
+    if codec == SEM_COMPRESSAO:
+        return _SemDescompactacao()
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    if codec == CODEC_ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Codec de texto indisponível: {codec}")
+
+
+def iterar_texto_das_colunas(
+    texto_extraido: str,
+    codec_texto: Optional[str],
+    texto_compactado: Optional[bytes],
+    tamanho_bloco: int,
+) -> Iterator[str]:
+    """
+    Gera o texto completo em blocos, sem montar o texto inteiro de novo
+
+    O texto puro é fatiado em blocos de tamanho_bloco caracteres; o
+    compactado é descompactado aos poucos, então o texto descompactado
+    nunca fica inteiro na memória.
+    """
+    if codec_texto is None:
+        for inicio in range(0, len(texto_extraido), tamanho_bloco):
+            yield texto_extraido[inicio : inicio + tamanho_bloco]
+        return
+
+    descompactador = _descompactador(codec_texto)
+    decodificador = codecs.getincrementaldecoder("utf-8")()
+    dados = memoryview(texto_compactado)
+    for inicio in range(0, len(dados), TAMANHO_BLOCO_COMPACTADO):
+        bloco = decodificador.decode(
+            descompactador.decompress(dados[inicio : inicio + TAMANHO_BLOCO_COMPACTADO])
+        )
+        if bloco:
+            yield bloco
+
+    bloco = decodificador.decode(descompactador.flush(), final=True)
+    if bloco:
+        yield bloco
@@ -0,0 +1,69 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from fastapi import HTTPException, status
+
+# Configurações do executor de hash de senhas
+THREADS_SENHAS = int(os.getenv("THREADS_SENHAS", str(os.cpu_count() or 1)))
+MAXIMO_SENHAS_PENDENTES = int(os.getenv("MAXIMO_SENHAS_PENDENTES", "64"))
+
+
+class ExecutorSenhas:
+    """
+    Threads dedicadas ao bcrypt, fora do event loop e do threadpool do FastAPI
+
+    O bcrypt libera o GIL durante o cálculo, então threads bastam para usar
+    vários núcleos. Quando há trabalhos demais na fila o pedido falha na hora
+    em vez de esperar, para uma enxurrada de logins não derrubar a API.
+    """
+
+    def __init__(self, threads: int, maximo_pendentes: int):
+        self.threads = max(1, threads)
+        self.maximo_pendentes = max(1, maximo_pendentes)
+        self.pendentes = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def iniciar(self) -> None:
+        """Cria as threads de senha, se ainda não existirem"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix="senhas"
+            )
+
+    def _liberar_vaga(self, futuro: asyncio.Future) -> None:
+        self.pendentes -= 1
+        # Marca como lido o erro de um hash que ninguém mais espera
+        if not futuro.cancelled():
+            futuro.exception()
+
+    async def executar(self, funcao: Callable[..., Any], *argumentos: Any) -> Any:
+        """
+        Executa a função em uma das threads de senha
+
+        Raises:
+            HTTPException: 503 se a fila de hashes estiver cheia
+        """
+        if self.pendentes >= self.maximo_pendentes:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado validando senhas, tente novamente em instantes",
+                headers={"Retry-After": "1"},
+            )
+
+        self.iniciar()
+        futuro = asyncio.wrap_future(self._executor.submit(funcao, *argumentos))
+        self.pendentes += 1
+        # A vaga só volta quando o hash termina: se quem pediu desistir (o
+        # cliente desconectou), a thread continua ocupada com ele
+        futuro.add_done_callback(self._liberar_vaga)
+        return await asyncio.shield(futuro)
+
+    def encerrar(self) -> None:
+        """Encerra as threads de senha cancelando o que ainda estiver na fila"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+executor_senhas = ExecutorSenhas(THREADS_SENHAS, MAXIMO_SENHAS_PENDENTES)
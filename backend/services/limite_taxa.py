@@ -0,0 +1,472 @@
+import logging
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from backend.services.cache_respostas import URL_REDIS_CACHE
+from backend.services.metricas import requisicoes_limitadas
+from backend.services.servico_autenticacao import ServicoAutenticacao
+
+try:
+    import redis.asyncio as redis_assincrono
+    from redis.exceptions import RedisError
+except ImportError:  # Redis é opcional: pip install redis
+    redis_assincrono = None
+    RedisError = OSError
+
+# Onde ficam os baldes: "memoria" (por processo), "redis" (compartilhado
+# entre processos e máquinas) ou "nenhum" (sem limites)
+BACKENDS_LIMITE_TAXA = ("memoria", "redis", "nenhum")
+LIMITE_TAXA = os.getenv("LIMITE_TAXA", "memoria").lower()
+URL_REDIS_LIMITE = os.getenv("URL_REDIS_LIMITE", URL_REDIS_CACHE)
+PREFIXO_REDIS_LIMITE = os.getenv("PREFIXO_REDIS_LIMITE", "desafio_api:limite:")
+
+# Orçamentos por usuario (assunto do token) nas rotas de upload
+UPLOADS_POR_MINUTO = float(os.getenv("UPLOADS_POR_MINUTO", "30"))
+MB_UPLOAD_POR_MINUTO = float(os.getenv("MB_UPLOAD_POR_MINUTO", "500"))
+UPLOADS_SIMULTANEOS_POR_USUARIO = int(os.getenv("UPLOADS_SIMULTANEOS_POR_USUARIO", "3"))
+# Um upload preso além disso deixa de ocupar a vaga (só no Redis, onde um
+# processo que caiu não tem como devolver a vaga)
+DURACAO_MAXIMA_UPLOAD_SEGUNDOS = int(os.getenv("DURACAO_MAXIMA_UPLOAD_SEGUNDOS", "600"))
+
+# Tentativas de login erradas por nome de usuario (de cada IP) e tentativas
+# por IP de origem
+TENTATIVAS_LOGIN_POR_MINUTO = float(os.getenv("TENTATIVAS_LOGIN_POR_MINUTO", "10"))
+TENTATIVAS_LOGIN_POR_MINUTO_IP = float(
+    os.getenv("TENTATIVAS_LOGIN_POR_MINUTO_IP", "60")
+)
+
+# Chaves guardadas no backend em memória; as mais antigas saem primeiro
+MAXIMO_CHAVES_LIMITE = int(os.getenv("MAXIMO_CHAVES_LIMITE", "100000"))
+# Espera sugerida quando o limite é de requisições simultâneas
+SEGUNDOS_ESPERA_SIMULTANEOS = 5
+
+if LIMITE_TAXA not in BACKENDS_LIMITE_TAXA:
+    raise ValueError(f"LIMITE_TAXA deve ser um de: {', '.join(BACKENDS_LIMITE_TAXA)}")
+if LIMITE_TAXA == "redis" and redis_assincrono is None:
+    raise ValueError("LIMITE_TAXA=redis requer o pacote redis")
+
+logger = logging.getLogger(__name__)
+
+# Balde de tokens atômico no Redis, com o relógio do próprio servidor.
+# ARGV: capacidade, tokens por segundo, custo, forçar (1 = debita mesmo sem saldo)
+SCRIPT_BALDE = """
+local capacidade = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local custo = tonumber(ARGV[3])
+local relogio = redis.call("TIME")
+local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+local balde = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(balde[1]) or capacidade
+local ultimo = tonumber(balde[2]) or agora
+tokens = math.min(capacidade, tokens + math.max(0, agora - ultimo) * por_segundo)
+local espera = 0
+if tokens >= custo or ARGV[4] == "1" then
+    tokens = tokens - custo
+else
+    espera = (custo - tokens) / por_segundo
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(agora))
+redis.call("EXPIRE", KEYS[1], math.ceil((capacidade - tokens) / por_segundo) + 1)
+return tostring(espera)
+"""
+
+# Vários baldes de uma vez: só debita se todos tiverem saldo. Devolve a
+# posição (a partir de 1) do primeiro sem saldo e a espera, ou 0.
+# ARGV: capacidade, tokens por segundo e custo de cada chave, em sequência
+SCRIPT_BALDES = """
+local relogio = redis.call("TIME")
+local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+local saldos = {}
+for i, chave in ipairs(KEYS) do
+    local capacidade = tonumber(ARGV[3 * i - 2])
+    local por_segundo = tonumber(ARGV[3 * i - 1])
+    local custo = tonumber(ARGV[3 * i])
+    local balde = redis.call("HMGET", chave, "tokens", "ts")
+    local tokens = tonumber(balde[1]) or capacidade
+    local ultimo = tonumber(balde[2]) or agora
+    tokens = math.min(capacidade, tokens + math.max(0, agora - ultimo) * por_segundo)
+    if tokens < custo then
+        return {i, tostring((custo - tokens) / por_segundo)}
+    end
+    saldos[i] = tokens
+end
+for i, chave in ipairs(KEYS) do
+    local capacidade = tonumber(ARGV[3 * i - 2])
+    local por_segundo = tonumber(ARGV[3 * i - 1])
+    local tokens = saldos[i] - tonumber(ARGV[3 * i])
+    redis.call("HSET", chave, "tokens", tostring(tokens), "ts", tostring(agora))
+    redis.call("EXPIRE", chave, math.ceil((capacidade - tokens) / por_segundo) + 1)
+end
+return {0, "0"}
+"""
+
+# Vagas simultâneas: cada requisição é um membro do sorted set, com a hora
+# de entrada; membros mais velhos que a duração máxima são descartados.
+# ARGV: máximo, duração máxima em segundos, identificador da requisição
+SCRIPT_VAGAS = """
+local agora = tonumber(redis.call("TIME")[1])
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", agora - tonumber(ARGV[2]))
+if redis.call("ZCARD", KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call("ZADD", KEYS[1], agora, ARGV[3])
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class LimitadorMemoria:
+    """
+    Baldes de tokens e vagas simultâneas em memória, separados em cada processo
+
+    Com N workers cada um aplica o orçamento inteiro, então o limite efetivo
+    fica até N vezes maior; para um limite único use LIMITE_TAXA=redis. Os
+    métodos não têm await no meio, então são atômicos no event loop.
+    """
+
+    def __init__(self, maximo_chaves: int):
+        self.maximo_chaves = maximo_chaves
+        self._baldes: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._vagas: Dict[str, int] = {}
+
+    async def consumir(
+        self,
+        chave: str,
+        custo: float,
+        capacidade: float,
+        por_segundo: float,
+        forcar: bool = False,
+    ) -> float:
+        agora = time.monotonic()
+        tokens, ultimo = self._baldes.pop(chave, (capacidade, agora))
+        tokens = min(capacidade, tokens + (agora - ultimo) * por_segundo)
+        espera = 0.0
+        if tokens >= custo or forcar:
+            tokens -= custo
+        else:
+            espera = (custo - tokens) / por_segundo
+
+        self._guardar(chave, tokens, agora)
+        return espera
+
+    async def consumir_todos(
+        self, baldes: Sequence[Tuple[str, float, float, float]]
+    ) -> Tuple[Optional[int], float]:
+        agora = time.monotonic()
+        saldos = []
+        for posicao, (chave, custo, capacidade, por_segundo) in enumerate(baldes):
+            tokens, ultimo = self._baldes.get(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - ultimo) * por_segundo)
+            if tokens < custo:
+                return posicao, (custo - tokens) / por_segundo
+            saldos.append(tokens)
+
+        for (chave, custo, _, _), tokens in zip(baldes, saldos):
+            self._baldes.pop(chave, None)
+            self._guardar(chave, tokens - custo, agora)
+        return None, 0.0
+
+    def _guardar(self, chave: str, tokens: float, agora: float) -> None:
+        self._baldes[chave] = (tokens, agora)
+        if len(self._baldes) > self.maximo_chaves:
+            # A chave mais antiga volta cheia se aparecer de novo
+            self._baldes.popitem(last=False)
+
+    async def entrar(self, chave: str, maximo: int) -> Optional[str]:
+        ocupadas = self._vagas.get(chave, 0)
+        if ocupadas >= maximo:
+            return None
+        self._vagas[chave] = ocupadas + 1
+        return chave
+
+    async def sair(self, chave: str, ficha: str) -> None:
+        ocupadas = self._vagas.get(chave, 0) - 1
+        if ocupadas > 0:
+            self._vagas[chave] = ocupadas
+        else:
+            self._vagas.pop(chave, None)
+
+    async def fechar(self) -> None:
+        self._baldes.clear()
+        self._vagas.clear()
+
+
+class LimitadorRedis:
+    """
+    Baldes de tokens e vagas simultâneas no Redis, compartilhados entre processos
+
+    Cada operação é um script Lua, atômico no servidor. Se o Redis ficar
+    indisponível os limites deixam de ser aplicados (a requisição passa) em
+    vez de derrubar os uploads e o login.
+    """
+
+    def __init__(self, cliente, prefixo: str = PREFIXO_REDIS_LIMITE):
+        self._cliente = cliente
+        self.prefixo = prefixo
+        self._balde = cliente.register_script(SCRIPT_BALDE)
+        self._baldes = cliente.register_script(SCRIPT_BALDES)
+        self._vagas = cliente.register_script(SCRIPT_VAGAS)
+
+    async def consumir(
+        self,
+        chave: str,
+        custo: float,
+        capacidade: float,
+        por_segundo: float,
+        forcar: bool = False,
+    ) -> float:
+        try:
+            espera = await self._balde(
+                keys=[self.prefixo + chave],
+                args=[capacidade, por_segundo, custo, "1" if forcar else "0"],
+            )
+        except (RedisError, OSError) as erro:
+            logger.warning("Limite de taxa indisponível: %s", erro)
+            return 0.0
+        return float(espera)
+
+    async def consumir_todos(
+        self, baldes: Sequence[Tuple[str, float, float, float]]
+    ) -> Tuple[Optional[int], float]:
+        argumentos = []
+        for _, custo, capacidade, por_segundo in baldes:
+            argumentos += [capacidade, por_segundo, custo]
+        try:
+            posicao, espera = await self._baldes(
+                keys=[self.prefixo + chave for chave, _, _, _ in baldes],
+                args=argumentos,
+            )
+        except (RedisError, OSError) as erro:
+            logger.warning("Limite de taxa indisponível: %s", erro)
+            return None, 0.0
+        if not posicao:
+            return None, 0.0
+        return int(posicao) - 1, float(espera)
+
+    async def entrar(self, chave: str, maximo: int) -> Optional[str]:
+        ficha = uuid.uuid4().hex
+        try:
+            aceita = await self._vagas(
+                keys=[self.prefixo + chave],
+                args=[maximo, DURACAO_MAXIMA_UPLOAD_SEGUNDOS, ficha],
+            )
+        except (RedisError, OSError) as erro:
+            logger.warning("Limite de taxa indisponível: %s", erro)
+            return ficha
+        return ficha if aceita else None
+
+    async def sair(self, chave: str, ficha: str) -> None:
+        try:
+            await self._cliente.zrem(self.prefixo + chave, ficha)
+        except (RedisError, OSError) as erro:
+            logger.warning("Limite de taxa indisponível: %s", erro)
+
+    async def fechar(self) -> None:
+        await self._cliente.aclose()
+
+
+def criar_limitador():
+    """Limitador configurado pelas variáveis de ambiente (None se desligado)"""
+    if LIMITE_TAXA == "redis":
+        return LimitadorRedis(redis_assincrono.from_url(URL_REDIS_LIMITE))
+    if LIMITE_TAXA == "memoria":
+        return LimitadorMemoria(MAXIMO_CHAVES_LIMITE)
+    return None
+
+
+limitador = criar_limitador()
+
+
+def _segundos_retry_after(espera: float) -> str:
+    return str(max(1, math.ceil(espera)))
+
+
+def _detalhe_limite(regra: str) -> str:
+    return {
+        "uploads": "Limite de uploads por minuto atingido",
+        "bytes_upload": "Limite de MB enviados por minuto atingido",
+        "uploads_simultaneos": "Limite de uploads simultâneos atingido",
+        "login": "Muitas tentativas de login, tente novamente mais tarde",
+    }[regra]
+
+
+def _usuario_do_token(scope) -> Optional[str]:
+    for nome, valor in scope["headers"]:
+        if nome == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            if esquema.lower() != "bearer" or not token:
+                return None
+            try:
+                dados = ServicoAutenticacao.verificar_token(token, ValueError())
+            except ValueError:
+                return None
+            return dados.nome_usuario
+    return None
+
+
+class MiddlewareLimiteTaxa:
+    """
+    Aplica os orçamentos de upload de cada usuario antes de receber o corpo
+
+    O usuario é o assunto do token, resolvido por ServicoAutenticacao (sem ir
+    ao banco); requisições sem token válido passam direto e recebem o 401 da
+    rota. Confere uploads simultâneos, uploads por minuto e MB por minuto
+    (pelo Content-Length; sem ele, os bytes recebidos são debitados no final),
+    e só debita os orçamentos se a requisição passar em todos. Middleware ASGI puro, como MiddlewareLimiteUpload.
+    """
+
+    def __init__(self, app, rotas):
+        self.app = app
+        self.rotas = set(rotas)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            limitador is None
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") not in self.rotas
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        usuario = _usuario_do_token(scope)
+        if usuario is None:
+            await self.app(scope, receive, send)
+            return
+
+        tamanho = None
+        for nome, valor in scope["headers"]:
+            if nome == b"content-length" and valor.isdigit():
+                tamanho = int(valor)
+
+        bytes_por_minuto = MB_UPLOAD_POR_MINUTO * 1024 * 1024
+        regras = ["uploads"]
+        baldes = [
+            (f"uploads:{usuario}", 1, UPLOADS_POR_MINUTO, UPLOADS_POR_MINUTO / 60)
+        ]
+        if tamanho is not None:
+            # Um upload maior que o orçamento inteiro usa o balde cheio
+            regras.append("bytes_upload")
+            baldes.append(
+                (
+                    f"bytes_upload:{usuario}",
+                    min(tamanho, bytes_por_minuto),
+                    bytes_por_minuto,
+                    bytes_por_minuto / 60,
+                )
+            )
+
+        # Os orçamentos só são debitados se a requisição for aceita: a vaga
+        # é reservada primeiro e devolvida se algum balde estiver sem saldo
+        chave_vagas = f"uploads_simultaneos:{usuario}"
+        ficha = await limitador.entrar(chave_vagas, UPLOADS_SIMULTANEOS_POR_USUARIO)
+        if ficha is None:
+            await self._recusar(
+                scope,
+                receive,
+                send,
+                "uploads_simultaneos",
+                SEGUNDOS_ESPERA_SIMULTANEOS,
+            )
+            return
+        sem_saldo, espera = await limitador.consumir_todos(baldes)
+        if sem_saldo is not None:
+            await limitador.sair(chave_vagas, ficha)
+            await self._recusar(scope, receive, send, regras[sem_saldo], espera)
+            return
+
+        recebidos = 0
+
+        async def receber():
+            nonlocal recebidos
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+            return mensagem
+
+        try:
+            await self.app(scope, receber if tamanho is None else receive, send)
+        finally:
+            await limitador.sair(chave_vagas, ficha)
+            if tamanho is None and recebidos:
+                await limitador.consumir(
+                    f"bytes_upload:{usuario}",
+                    recebidos,
+                    bytes_por_minuto,
+                    bytes_por_minuto / 60,
+                    forcar=True,
+                )
+
+    @staticmethod
+    async def _recusar(scope, receive, send, regra: str, espera: float) -> None:
+        requisicoes_limitadas.incrementar(regra)
+        resposta = JSONResponse(
+            {"detail": _detalhe_limite(regra)},
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": _segundos_retry_after(espera)},
+        )
+        await resposta(scope, receive, send)
+
+
+def _baldes_login(ip: Optional[str], nome_usuario: str, custo_ip: float) -> list:
+    # O balde do usuario é por IP: tentativas erradas de outro lugar não
+    # bloqueiam o dono da conta
+    baldes = [
+        (
+            f"login:{nome_usuario.lower()}:{ip}",
+            0,
+            TENTATIVAS_LOGIN_POR_MINUTO,
+            TENTATIVAS_LOGIN_POR_MINUTO / 60,
+        )
+    ]
+    if ip is not None:
+        baldes.append(
+            (
+                f"login_ip:{ip}",
+                custo_ip,
+                TENTATIVAS_LOGIN_POR_MINUTO_IP,
+                TENTATIVAS_LOGIN_POR_MINUTO_IP / 60,
+            )
+        )
+    return baldes
+
+
+async def verificar_tentativa_login(ip: Optional[str], nome_usuario: str) -> None:
+    """
+    Confere as tentativas de login do nome de usuario e do IP de origem
+
+    Chamado antes de conferir a senha, então o bcrypt não roda para quem já
+    passou do limite. Toda tentativa desconta do IP; do par usuario e IP só
+    descontam as erradas (registrar_falha_login), e o par fica bloqueado
+    enquanto o saldo estiver negativo.
+
+    Raises:
+        HTTPException: 429 com Retry-After se algum dos dois passou do limite
+    """
+    if limitador is None:
+        return
+
+    sem_saldo, espera = await limitador.consumir_todos(
+        _baldes_login(ip, nome_usuario, 1)
+    )
+    if sem_saldo is not None:
+        requisicoes_limitadas.incrementar("login")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=_detalhe_limite("login"),
+            headers={"Retry-After": _segundos_retry_after(espera)},
+        )
+
+
+async def registrar_falha_login(ip: Optional[str], nome_usuario: str) -> None:
+    """Desconta uma tentativa errada do par nome de usuario e IP de origem"""
+    if limitador is None:
+        return
+
+    chave, _, capacidade, por_segundo = _baldes_login(ip, nome_usuario, 0)[0]
+    await limitador.consumir(chave, 1, capacidade, por_segundo, forcar=True)
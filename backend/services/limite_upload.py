@@ -0,0 +1,57 @@
+from typing import Dict
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+# Espaço para os cabeçalhos e delimitadores do multipart além do próprio arquivo
+FOLGA_MULTIPART = 64 * 1024
+
+
+class MiddlewareLimiteUpload:
+    """
+    Recusa com 413 os uploads maiores que o limite da rota, sem receber o corpo
+
+    Com Content-Length acima do limite a resposta sai antes de ler qualquer
+    byte do corpo; sem ele (chunked), ou com um Content-Length falso, os
+    bytes são contados enquanto chegam e a leitura é interrompida assim que
+    passam do limite. Middleware ASGI puro, para não bufferizar o corpo.
+    """
+
+    def __init__(self, app, limites: Dict[str, int]):
+        self.app = app
+        self.limites = limites
+
+    async def __call__(self, scope, receive, send):
+        limite = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limite = self.limites.get(scope["path"].rstrip("/"))
+        if limite is None:
+            await self.app(scope, receive, send)
+            return
+
+        detalhe = f"O upload passa do limite de {limite // (1024 * 1024)} MB"
+        for nome, valor in scope["headers"]:
+            if nome == b"content-length" and valor.isdigit() and int(valor) > limite:
+                resposta = JSONResponse(
+                    {"detail": detalhe},
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    headers={"Connection": "close"},
+                )
+                await resposta(scope, receive, send)
+                return
+
+        recebidos = 0
+
+        async def receber():
+            nonlocal recebidos
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > limite:
+                    # Sai do parser do multipart e vira a resposta 413 da rota
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=detalhe,
+                    )
+            return mensagem
+
+        await self.app(scope, receber, send)
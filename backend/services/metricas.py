@@ -0,0 +1,374 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from starlette.routing import Match
+from sqlalchemy.engine import Engine
+from backend.services.cache import EstatisticasCache
+
+# Limites dos buckets dos histogramas, em segundos
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_QUANTIDADE = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_PAGINAS_POR_SEGUNDO = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+TIPO_CONTEUDO_METRICAS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str]) -> str:
+    if not nomes:
+        return ""
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = (
+            str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        )
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._trava = threading.Lock()
+
+    def _chave(self, valores: Sequence[str]) -> Tuple[str, ...]:
+        if len(valores) != len(self.rotulos):
+            raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}")
+        return tuple(str(valor) for valor in valores)
+
+    def _linhas(self) -> List[str]:
+        raise NotImplementedError
+
+    def exportar(self) -> str:
+        cabecalho = [
+            f"# HELP {self.nome} {self.descricao}",
+            f"# TYPE {self.nome} {self.tipo}",
+        ]
+        return "\n".join(cabecalho + self._linhas())
+
+
+class _MetricaSimples(_Metrica):
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, descricao, rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._funcao: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def _somar(self, valores_rotulos: Sequence[str], valor: float) -> None:
+        chave = self._chave(valores_rotulos)
+        with self._trava:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def definir_funcao(
+        self, funcao: Callable[[], Dict[Tuple[str, ...], float]]
+    ) -> None:
+        """Calcula os valores na hora da coleta, lidos de outro objeto"""
+        self._funcao = funcao
+
+    def _linhas(self) -> List[str]:
+        if self._funcao is not None:
+            itens = list(self._funcao().items())
+        else:
+            with self._trava:
+                itens = list(self._valores.items())
+        return [
+            f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+            for chave, valor in itens
+        ]
+
+
+class Contador(_MetricaSimples):
+    """Valor que só cresce (ex.: total de requisições)"""
+
+    tipo = "counter"
+
+    def incrementar(self, *valores_rotulos: str, valor: float = 1) -> None:
+        self._somar(valores_rotulos, valor)
+
+
+class Medidor(_MetricaSimples):
+    """Valor que sobe e desce (ex.: requisições em andamento)"""
+
+    tipo = "gauge"
+
+    def somar(self, *valores_rotulos: str, valor: float = 1) -> None:
+        self._somar(valores_rotulos, valor)
+
+
+class Histograma(_Metrica):
+    """Distribuição de valores em buckets cumulativos, com soma e contagem"""
+
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nome: str,
+        descricao: str,
+        rotulos: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_LATENCIA,
+    ):
+        super().__init__(nome, descricao, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # Por série: contagem por bucket (não cumulativa), soma e total
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observar(self, valor: float, *valores_rotulos: str) -> None:
+        chave = self._chave(valores_rotulos)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def _linhas(self) -> List[str]:
+        with self._trava:
+            itens = [
+                (chave, list(contagens), soma, total)
+                for chave, (contagens, soma, total) in self._series.items()
+            ]
+
+        linhas = []
+        nomes_bucket = self.rotulos + ("le",)
+        for chave, contagens, soma, total in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(
+                    nomes_bucket, chave + (_formatar_numero(float(limite)),)
+                )
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {total}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas do processo, exportadas no formato texto do Prometheus"""
+
+    def __init__(self):
+        self._metricas: List[_Metrica] = []
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        return "\n".join(metrica.exportar() for metrica in self._metricas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+requisicoes_total = registro_metricas.registrar(
+    Contador(
+        "http_requisicoes_total",
+        "Requisições HTTP atendidas",
+        ("metodo", "rota", "status"),
+    )
+)
+duracao_requisicoes = registro_metricas.registrar(
+    Histograma(
+        "http_requisicao_duracao_segundos",
+        "Latência das requisições HTTP por rota",
+        ("metodo", "rota"),
+    )
+)
+requisicoes_em_andamento = registro_metricas.registrar(
+    Medidor("http_requisicoes_em_andamento", "Requisições HTTP sendo atendidas agora")
+)
+consultas_por_requisicao = registro_metricas.registrar(
+    Histograma(
+        "db_consultas_por_requisicao",
+        "Quantidade de consultas ao banco em cada requisição",
+        ("rota",),
+        BUCKETS_QUANTIDADE,
+    )
+)
+tempo_banco_por_requisicao = registro_metricas.registrar(
+    Histograma(
+        "db_tempo_por_requisicao_segundos",
+        "Tempo somado das consultas ao banco em cada requisição",
+        ("rota",),
+    )
+)
+etapas_upload = registro_metricas.registrar(
+    Histograma(
+        "upload_etapa_duracao_segundos",
+        "Duração de cada etapa do upload "
+        "(leitura, analise, pagina, extracao, ocr, gravacao)",
+        ("etapa",),
+    )
+)
+bytes_processados = registro_metricas.registrar(
+    Contador("upload_bytes_processados_total", "Bytes de PDF recebidos e processados")
+)
+paginas_extraidas = registro_metricas.registrar(
+    Contador("upload_paginas_extraidas_total", "Páginas extraídas pelo PyPDF2")
+)
+paginas_ocr = registro_metricas.registrar(
+    Contador(
+        "upload_paginas_ocr_total",
+        "Páginas sem texto enviadas ao OCR, por resultado "
+        "(reconhecida, vazia, tempo_esgotado, erro)",
+        ("resultado",),
+    )
+)
+paginas_por_segundo = registro_metricas.registrar(
+    Histograma(
+        "upload_paginas_por_segundo",
+        "Vazão de extração de cada PDF, em páginas por segundo",
+        buckets=BUCKETS_PAGINAS_POR_SEGUNDO,
+    )
+)
+
+requisicoes_limitadas = registro_metricas.registrar(
+    Contador(
+        "limite_taxa_recusas_total",
+        "Requisições recusadas com 429 pelo limite de taxa, por regra "
+        "(uploads, bytes_upload, uploads_simultaneos, login)",
+        ("regra",),
+    )
+)
+
+tempo_inicializacao = registro_metricas.registrar(
+    Medidor(
+        "api_inicializacao_segundos",
+        "Tempo de subida do processo da API, por etapa "
+        "(importacao, banco, ciclo_de_vida)",
+        ("etapa",),
+    )
+)
+
+
+cache_acertos = registro_metricas.registrar(
+    Contador("cache_acertos_total", "Acertos dos caches em memória", ("cache",))
+)
+cache_falhas = registro_metricas.registrar(
+    Contador("cache_falhas_total", "Falhas dos caches em memória", ("cache",))
+)
+
+
+def observar_caches(caches: Dict[str, EstatisticasCache]) -> None:
+    """Exporta os acertos e falhas das estatísticas de cache informadas, por nome"""
+    cache_acertos.definir_funcao(
+        lambda: {(nome,): estatisticas.acertos for nome, estatisticas in caches.items()}
+    )
+    cache_falhas.definir_funcao(
+        lambda: {(nome,): estatisticas.falhas for nome, estatisticas in caches.items()}
+    )
+
+
+@contextmanager
+def medir_etapa(etapa: str) -> Iterator[None]:
+    """
+    Mede a duração de um bloco como uma etapa do upload
+
+    Uso: with medir_etapa("leitura"): ...
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        etapas_upload.observar(time.perf_counter() - inicio, etapa)
+
+
+# Consultas ao banco da requisição atual: [quantidade, segundos]
+consultas_requisicao: contextvars.ContextVar[Optional[List[float]]] = (
+    contextvars.ContextVar("consultas_requisicao", default=None)
+)
+
+
+def _antes_de_executar(conexao, cursor, comando, parametros, contexto, executemany):
+    conexao.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+
+def _depois_de_executar(conexao, cursor, comando, parametros, contexto, executemany):
+    inicio = conexao.info["inicio_consultas"].pop()
+    acumulado = consultas_requisicao.get()
+    if acumulado is not None:
+        acumulado[0] += 1
+        acumulado[1] += time.perf_counter() - inicio
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Conta e cronometra as consultas feitas pela engine (síncrona) informada"""
+    event.listen(engine, "before_cursor_execute", _antes_de_executar)
+    event.listen(engine, "after_cursor_execute", _depois_de_executar)
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede latência, status e consultas ao banco por rota
+
+    A rota é o caminho declarado (ex.: /documentos/{id_documento}), para que
+    cada ID não vire uma série nova; caminhos sem rota viram "desconhecida".
+    As respostas dadas antes do roteamento (429 do limite de taxa, 413 do
+    limite de upload) não têm endpoint, e a rota vem da tabela de rotas.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._rotas: Optional[Dict[Callable, str]] = None
+
+    def _rota(self, scope) -> str:
+        if self._rotas is None:
+            self._rotas = {
+                rota.endpoint: rota.path
+                for rota in scope["app"].routes
+                if hasattr(rota, "endpoint")
+            }
+        rota = self._rotas.get(scope.get("endpoint"))
+        if rota is not None:
+            return rota
+        for candidata in scope["app"].routes:
+            if (
+                hasattr(candidata, "endpoint")
+                and candidata.matches(scope)[0] != Match.NONE
+            ):
+                return candidata.path
+        return "desconhecida"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_resposta = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status_resposta[0] = mensagem["status"]
+            await send(mensagem)
+
+        acumulado = [0, 0.0]
+        token = consultas_requisicao.set(acumulado)
+        requisicoes_em_andamento.somar()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            requisicoes_em_andamento.somar(valor=-1)
+            consultas_requisicao.reset(token)
+
+            rota = self._rota(scope)
+            metodo = scope["method"]
+            requisicoes_total.incrementar(metodo, rota, str(status_resposta[0]))
+            duracao_requisicoes.observar(duracao, metodo, rota)
+            consultas_por_requisicao.observar(acumulado[0], rota)
+            tempo_banco_por_requisicao.observar(acumulado[1], rota)
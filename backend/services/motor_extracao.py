@@ -0,0 +1,201 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+from fastapi import HTTPException, status
+
+# Configurações do pool de extração
+PROCESSOS_EXTRACAO = int(os.getenv("PROCESSOS_EXTRACAO", str(os.cpu_count() or 1)))
+TIMEOUT_EXTRACAO_SEGUNDOS = float(os.getenv("TIMEOUT_EXTRACAO_SEGUNDOS", "120"))
+MAXIMO_EXTRACOES_PENDENTES = int(os.getenv("MAXIMO_EXTRACOES_PENDENTES", "32"))
+
+
+class TempoEsgotado(BaseException):
+    """
+    Levantada no processo filho quando o trabalho passa do tempo limite
+
+    BaseException para não ser engolida por um except Exception do trabalho.
+    """
+
+
+def _alarme(sinal, quadro):
+    raise TempoEsgotado()
+
+
+def _executar_com_limite(limite: float, funcao: Callable[..., Any], *argumentos):
+    """
+    Roda a função no processo filho com o tempo limite contado a partir daqui
+
+    O relógio começa quando o processo pega o trabalho, e não quando ele
+    entra na fila; estourado, o trabalho é interrompido e o processo segue
+    vivo para o próximo. Sem SIGALRM (Windows) vale só o limite do pai.
+    """
+    if not hasattr(signal, "setitimer"):
+        return funcao(*argumentos)
+    anterior = signal.signal(signal.SIGALRM, _alarme)
+    signal.setitimer(signal.ITIMER_REAL, limite)
+    try:
+        return funcao(*argumentos)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, anterior)
+
+
+class MotorExtracao:
+    """Pool de processos para rodar trabalho pesado de CPU fora do event loop"""
+
+    def __init__(self, processos: int, timeout_segundos: float, maximo_pendentes: int):
+        self.processos = max(1, processos)
+        self.timeout_segundos = timeout_segundos
+        self.maximo_pendentes = max(1, maximo_pendentes)
+        self.pendentes = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Trabalhos ainda em cada pool, inclusive nos aposentados
+        self._em_andamento: Dict[ProcessPoolExecutor, Set[Future]] = {}
+        # Pools tirados de uso com um processo travado: mortos quando os
+        # outros trabalhos deles terminarem
+        self._aposentados: Dict[ProcessPoolExecutor, Future] = {}
+
+    def iniciar(self) -> None:
+        """
+        Cria o pool de processos, se ainda não existir
+
+        Usa o contexto "spawn" para que os processos filhos não herdem
+        conexões de banco, threads e sockets do processo da API.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processos,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._em_andamento[self._executor] = set()
+
+    def encerrar(self) -> None:
+        """Encerra o pool de processos cancelando o que ainda estiver na fila"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._em_andamento.pop(self._executor, None)
+            self._executor = None
+        for executor in list(self._aposentados):
+            self._descartar(executor)
+
+    def _descartar(self, executor: ProcessPoolExecutor) -> None:
+        """Mata os processos de um pool e o tira de uso; o próximo trabalho cria outro"""
+        if self._executor is executor:
+            self._executor = None
+        self._em_andamento.pop(executor, None)
+        self._aposentados.pop(executor, None)
+        # O ProcessPoolExecutor não expõe os processos, e só matando o processo
+        # um trabalho em andamento para
+        for processo in list((executor._processes or {}).values()):
+            processo.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _aposentar(self, executor: ProcessPoolExecutor, travado: Future) -> None:
+        """
+        Tira de uso um pool com um processo que não respondeu ao tempo limite
+
+        Matar o processo quebraria o pool inteiro e os trabalhos de outros
+        usuarios nele; o pool só é morto quando eles terminarem, e os
+        trabalhos novos vão para um pool novo.
+        """
+        if self._executor is executor:
+            self._executor = None
+        self._aposentados[executor] = travado
+        self._encerrar_se_livre(executor)
+
+    def _encerrar_se_livre(self, executor: ProcessPoolExecutor) -> None:
+        travado = self._aposentados.get(executor)
+        if travado is not None and self._em_andamento.get(executor, set()) <= {travado}:
+            self._descartar(executor)
+
+    def _liberar_vaga(
+        self, executor: ProcessPoolExecutor, trabalho: Future, futuro: asyncio.Future
+    ) -> None:
+        self.pendentes -= 1
+        self._em_andamento.get(executor, set()).discard(trabalho)
+        self._encerrar_se_livre(executor)
+        # Marca como lido o erro de um trabalho que ninguém mais espera
+        if not futuro.cancelled():
+            futuro.exception()
+
+    async def executar(self, funcao: Callable[..., Any], *argumentos: Any) -> Any:
+        """
+        Executa uma função em um processo do pool sem bloquear o event loop
+
+        O tempo limite conta a partir de quando o processo pega o trabalho,
+        não do tempo na fila: o próprio processo filho interrompe o trabalho
+        e segue atendendo. Se o processo não responder (preso em código C),
+        depois do dobro do tempo limite o pool é aposentado, sem derrubar os
+        trabalhos dos outros. A vaga em pendentes só é liberada quando o
+        trabalho de fato termina, e não quando quem pediu desiste dele.
+
+        Args:
+            funcao: Função de nível de módulo (precisa ser serializável)
+            argumentos: Argumentos posicionais da função
+
+        Returns:
+            Any: Resultado da função
+
+        Raises:
+            HTTPException: 429 se houver trabalhos demais em andamento,
+                504 se o tempo limite estourar e 503 se o pool quebrar
+        """
+        if self.pendentes >= self.maximo_pendentes:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitos documentos em processamento, tente novamente em instantes",
+                headers={"Retry-After": "5"},
+            )
+
+        self.iniciar()
+        executor = self._executor
+        try:
+            trabalho = executor.submit(
+                _executar_com_limite, self.timeout_segundos, funcao, *argumentos
+            )
+            futuro = asyncio.wrap_future(trabalho)
+            self.pendentes += 1
+            self._em_andamento[executor].add(trabalho)
+            futuro.add_done_callback(
+                lambda futuro: self._liberar_vaga(executor, trabalho, futuro)
+            )
+
+            # asyncio.wait não cancela o futuro: o tempo limite (ou o
+            # cancelamento de quem pediu) não dá o trabalho por encerrado
+            # enquanto o processo ainda roda
+            intervalo = min(1.0, self.timeout_segundos / 4)
+            inicio = None
+            while not futuro.done():
+                await asyncio.wait({futuro}, timeout=intervalo)
+                # "running" vale desde a entrada na fila de chamadas, que tem
+                # no máximo um trabalho esperando por processo livre; daí o
+                # dobro do tempo limite
+                if futuro.done() or not trabalho.running():
+                    continue
+                inicio = inicio or time.monotonic()
+                if time.monotonic() - inicio > 2 * self.timeout_segundos:
+                    self._aposentar(executor, trabalho)
+                    raise TempoEsgotado()
+            return futuro.result()
+        except TempoEsgotado:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Tempo limite de processamento do PDF excedido",
+            )
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória), recria o pool
+            self._descartar(executor)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Serviço de extração indisponível, tente novamente",
+            )
+
+
+motor_extracao = MotorExtracao(
+    PROCESSOS_EXTRACAO, TIMEOUT_EXTRACAO_SEGUNDOS, MAXIMO_EXTRACOES_PENDENTES
+)
@@ -1,14 +1,18 @@
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from backend.database import conexao_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import conexao_db_assincrona
 from backend.models import Usuario
 from backend.schemas.usuario import TokenDados
+from backend.services.cache import CacheTTL
+from backend.services.executor_senhas import executor_senhas
 
 # Configurações de segurança
 CHAVE_SECRETA = os.getenv("CHAVE_SECRETA")
@@ -21,6 +25,12 @@ contexto_senhas = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Esquema de autenticação Bearer Token
 esquema_autenticacao = HTTPBearer()
 
+# Caches de tokens decodificados e de usuarios autenticados (por processo)
+TAMANHO_CACHE_USUARIOS = int(os.getenv("TAMANHO_CACHE_USUARIOS", "10000"))
+TTL_CACHE_USUARIOS_SEGUNDOS = float(os.getenv("TTL_CACHE_USUARIOS_SEGUNDOS", "60"))
+cache_tokens = CacheTTL(TAMANHO_CACHE_USUARIOS, MINUTOS_EXPIRACAO_TOKEN * 60)
+cache_usuarios = CacheTTL(TAMANHO_CACHE_USUARIOS, TTL_CACHE_USUARIOS_SEGUNDOS)
+
 
 class ServicoAutenticacao:
     """Service para operações de autenticação e autorização"""
@@ -52,6 +62,41 @@ class ServicoAutenticacao:
         """
         return contexto_senhas.hash(senha)
 
+    @staticmethod
+    async def verificar_senha_async(senha_digitada: str, hash_senha: str) -> bool:
+        """
+        Verifica a senha no executor de senhas, sem travar o event loop
+
+        Args:
+            senha_digitada: Senha digitada pelo usuário
+            hash_senha: Hash da senha armazenado no banco
+
+        Returns:
+            bool: True se senha correta, False caso contrário
+
+        Raises:
+            HTTPException: 503 se o executor de senhas estiver sobrecarregado
+        """
+        return await executor_senhas.executar(
+            contexto_senhas.verify, senha_digitada, hash_senha
+        )
+
+    @staticmethod
+    async def gerar_hash_senha_async(senha: str) -> str:
+        """
+        Gera hash da senha no executor de senhas, sem travar o event loop
+
+        Args:
+            senha: Senha digitada pelo usuário
+
+        Returns:
+            str: Hash criptogradado da senha
+
+        Raises:
+            HTTPException: 503 se o executor de senhas estiver sobrecarregado
+        """
+        return await executor_senhas.executar(contexto_senhas.hash, senha)
+
     @staticmethod
     def criar_token_acesso(
         dados: dict, tempo_expiracao: Optional[timedelta] = None
@@ -75,7 +120,9 @@ class ServicoAutenticacao:
             )
 
         dados_para_codificar.update({"exp": data_expiracao})
-        token_jwt = jwt.encode(dados_para_codificar, CHAVE_SECRETA, algorithm=ALGORITMO_JWT)
+        token_jwt = jwt.encode(
+            dados_para_codificar, CHAVE_SECRETA, algorithm=ALGORITMO_JWT
+        )
         return token_jwt
 
     @staticmethod
@@ -93,6 +140,11 @@ class ServicoAutenticacao:
         Raises:
             HTTPException: Se token inválido
         """
+        # Token já validado antes: evita decodificar e checar a assinatura de novo
+        nome_usuario = cache_tokens.obter(token)
+        if nome_usuario is not None:
+            return TokenDados(nome_usuario=nome_usuario)
+
         try:
             dados_token = jwt.decode(token, CHAVE_SECRETA, algorithms=[ALGORITMO_JWT])
             nome_usuario: str = dados_token.get("sub")
@@ -101,12 +153,18 @@ class ServicoAutenticacao:
             dados_validados = TokenDados(nome_usuario=nome_usuario)
         except JWTError:
             raise excecao_credenciais
+
+        # O token só fica no cache até expirar
+        expiracao = dados_token.get("exp")
+        if expiracao is not None:
+            cache_tokens.guardar(token, nome_usuario, expiracao - time.time())
+
         return dados_validados
 
     @staticmethod
-    def obter_usuario_atual(
+    async def obter_usuario_atual(
         credenciais: HTTPAuthorizationCredentials = Depends(esquema_autenticacao),
-        db: Session = Depends(conexao_db),
+        db: AsyncSession = Depends(conexao_db_assincrona),
     ) -> Usuario:
         """
         Obtém o usuário atual baseado no token
@@ -130,17 +188,40 @@ class ServicoAutenticacao:
         token = credenciais.credentials
         dados_token = ServicoAutenticacao.verificar_token(token, excecao_credenciais)
 
-        usuario = (
-            db.query(Usuario)
-            .filter(Usuario.nome_usuario == dados_token.nome_usuario)
-            .first()
+        # Cada requisição recebe sua própria cópia, fora de qualquer sessão
+        dados_usuario = cache_usuarios.obter(dados_token.nome_usuario)
+        if dados_usuario is not None:
+            return Usuario(**dados_usuario)
+
+        usuario = await db.scalar(
+            select(Usuario).where(Usuario.nome_usuario == dados_token.nome_usuario)
         )
 
         if usuario is None:
             raise excecao_credenciais
 
+        cache_usuarios.guardar(
+            usuario.nome_usuario,
+            {
+                coluna.key: getattr(usuario, coluna.key)
+                for coluna in Usuario.__table__.columns
+            },
+        )
+
         return usuario
 
+    @staticmethod
+    def invalidar_usuario_em_cache(nome_usuario: str) -> None:
+        """
+        Remove o usuario do cache de autenticação deste processo
+
+        Nos demais processos o dado antigo expira sozinho pelo TTL do cache.
+
+        Args:
+            nome_usuario: Nome de usuario
+        """
+        cache_usuarios.remover(nome_usuario)
+
     @staticmethod
     def gerar_token_para_usuario(nome_usuario: str) -> str:
         """
@@ -0,0 +1,626 @@
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.services.armazenamento import armazenamento
+from backend.services.compressao_texto import texto_das_colunas
+
+# Configuração de idioma da busca no Postgres (stemming e stopwords)
+IDIOMA_BUSCA = re.sub(r"\W", "", os.getenv("IDIOMA_BUSCA", "portuguese"))
+MAXIMO_RESULTADOS_BUSCA = 100
+
+# No Postgres o texto é indexado em partes: um tsvector passa de 1 MB (e o
+# to_tsvector falha) bem antes de um texto grande acabar
+MAXIMO_CARACTERES_PARTE_BUSCA = int(
+    os.getenv("MAXIMO_CARACTERES_PARTE_BUSCA", "200000")
+)
+
+# Palavras de cada trecho devolvido na busca
+PALAVRAS_TRECHO = 16
+
+# Documentos lidos por vez ao montar o índice de um banco já com dados
+LOTE_INDEXACAO = 200
+
+logger = logging.getLogger(__name__)
+
+
+def _dialeto(db: AsyncSession) -> str:
+    return db.bind.dialect.name
+
+
+def _consulta_fts5(consulta: str, usuario_id: int) -> str:
+    """
+    Transforma o texto digitado em termos entre aspas, sem sintaxe do FTS5
+
+    Os termos só valem no nome e no texto, e a consulta fica presa à partição
+    do usuario, para o FTS5 cruzar as listas de documentos dos termos com a
+    do usuario em vez de percorrer os documentos de todos.
+    """
+    termos = _termos(consulta)
+    if not termos:
+        return ""
+    termos_entre_aspas = " ".join(f'"{termo}"' for termo in termos)
+    return (
+        f'usuario : "{_particao(usuario_id)}" AND '
+        f"{{nome_arquivo texto}} : ({termos_entre_aspas})"
+    )
+
+
+def _particao(usuario_id: int) -> str:
+    """Termo que marca no FTS5 os documentos do usuario"""
+    return f"u{usuario_id}"
+
+
+def _termos(texto: str) -> List[str]:
+    """
+    Termos do texto sem acentos e em minúsculas, como entram no FTS5
+
+    Texto e consulta passam pela mesma normalização antes do tokenizador do
+    FTS5, então os termos dos dois lados sempre batem.
+    """
+    return re.findall(r"[^\W_]+", _sem_acentos(texto))
+
+
+def _contagem_termos(texto: str) -> str:
+    """Termos distintos do texto com as ocorrências de cada um ("termo:2 outro:1")"""
+    return " ".join(
+        f"{termo}:{quantidade}"
+        for termo, quantidade in sorted(Counter(_termos(texto)).items())
+    )
+
+
+def _texto_indexado(contagem_termos: str) -> str:
+    """
+    Texto que vai para o FTS5: cada termo repetido pelas suas ocorrências
+
+    A ordem das palavras não importa para a busca (só termos soltos) nem
+    para o bm25, que conta ocorrências e tamanho do documento. Como sai só da
+    contagem, a remoção remonta o mesmo texto sem ler o documento.
+    """
+    termos = []
+    for item in contagem_termos.split():
+        termo, quantidade = item.rsplit(":", 1)
+        termos.extend([termo] * int(quantidade))
+    return " ".join(termos)
+
+
+def _partes_texto(texto: str) -> List[str]:
+    """Texto em partes de até MAXIMO_CARACTERES_PARTE_BUSCA, cortadas num espaço"""
+    partes = []
+    inicio = 0
+    while len(texto) - inicio > MAXIMO_CARACTERES_PARTE_BUSCA:
+        fim = inicio + MAXIMO_CARACTERES_PARTE_BUSCA
+        espaco = texto.rfind(" ", fim - MAXIMO_CARACTERES_PARTE_BUSCA // 10, fim)
+        if espaco > inicio:
+            fim = espaco
+        partes.append(texto[inicio:fim])
+        inicio = fim
+    partes.append(texto[inicio:])
+    return partes
+
+
+def _linhas_indice(dialeto: str, documentos: List[dict]) -> List[dict]:
+    """Linhas do índice de cada documento: uma no FTS5, uma por parte no Postgres"""
+    if dialeto == "postgresql":
+        return [
+            {
+                "documento_id": documento["documento_id"],
+                "parte": parte,
+                "usuario_id": documento["usuario_id"],
+                "nome_arquivo": documento["nome_arquivo"],
+                "texto": texto,
+            }
+            for documento in documentos
+            for parte, texto in enumerate(_partes_texto(documento["texto"]))
+        ]
+    linhas = []
+    for documento in documentos:
+        termos = _contagem_termos(documento["texto"])
+        linhas.append(
+            {
+                "documento_id": documento["documento_id"],
+                "usuario": _particao(documento["usuario_id"]),
+                "nome_arquivo": " ".join(_termos(documento["nome_arquivo"])),
+                "termos": termos,
+                "texto": _texto_indexado(termos),
+            }
+        )
+    return linhas
+
+
+def _inserir_linhas(dialeto: str) -> str:
+    if dialeto == "postgresql":
+        # O nome vai em todas as partes, para valer junto com qualquer uma delas
+        return (
+            "INSERT INTO documentos_busca (documento_id, parte, usuario_id, vetor) "
+            "VALUES (:documento_id, :parte, :usuario_id, "
+            f"to_tsvector('{IDIOMA_BUSCA}', "
+            "CAST(:nome_arquivo AS TEXT) || ' ' || CAST(:texto AS TEXT)))"
+        )
+    return (
+        "INSERT INTO documentos_busca (rowid, usuario, nome_arquivo, texto) "
+        "VALUES (:documento_id, :usuario, :nome_arquivo, :texto)"
+    )
+
+
+def _inserir_termos() -> str:
+    return (
+        "INSERT INTO termos_busca (documento_id, usuario, nome_arquivo, termos) "
+        "VALUES (:documento_id, :usuario, :nome_arquivo, :termos)"
+    )
+
+
+def _sem_acentos(texto: str) -> str:
+    return "".join(
+        caractere
+        for caractere in unicodedata.normalize("NFKD", texto)
+        if not unicodedata.combining(caractere)
+    ).casefold()
+
+
+def _casa_termo(palavra: str, termos: List[str]) -> bool:
+    # Começar pelo termo aproxima o radical que o Postgres compara
+    palavra = _sem_acentos(palavra)
+    return any(palavra.startswith(termo) for termo in termos)
+
+
+def _montar_trecho(pagina: str, indice: int, termos: List[str]) -> str:
+    palavras = list(re.finditer(r"\w+", pagina))
+    if not palavras:
+        return ""
+    inicio = max(0, min(indice - PALAVRAS_TRECHO // 2, len(palavras) - PALAVRAS_TRECHO))
+    fim = min(len(palavras), inicio + PALAVRAS_TRECHO)
+
+    partes = []
+    posicao = palavras[inicio].start()
+    for palavra in palavras[inicio:fim]:
+        partes.append(pagina[posicao : palavra.start()])
+        if _casa_termo(palavra.group(), termos):
+            partes.append(f"[{palavra.group()}]")
+        else:
+            partes.append(palavra.group())
+        posicao = palavra.end()
+
+    trecho = re.sub(r"\s+", " ", "".join(partes))
+    if inicio > 0:
+        trecho = "..." + trecho
+    if fim < len(palavras):
+        trecho += "..."
+    return trecho
+
+
+def gerar_trecho(paginas: Iterable[str], consulta: str) -> str:
+    """
+    Trecho em volta do primeiro termo da consulta encontrado nas páginas
+
+    Os termos ficam entre [ ], como no trecho que o banco gerava. A
+    comparação ignora maiúsculas e acentos; sem nenhum termo encontrado, o
+    trecho é o começo da primeira página.
+
+    Args:
+        paginas: Texto das páginas, na ordem
+        consulta: Termos digitados pelo usuario
+
+    Returns:
+        str: Trecho com os termos marcados
+    """
+    termos = [_sem_acentos(termo) for termo in re.findall(r"\w+", consulta)]
+    primeira = None
+    for pagina in paginas:
+        if primeira is None:
+            primeira = pagina
+        # Conferência barata antes de separar a página em palavras
+        normalizada = _sem_acentos(pagina)
+        if not any(termo in normalizada for termo in termos):
+            continue
+        for indice, palavra in enumerate(re.finditer(r"\w+", pagina)):
+            if _casa_termo(palavra.group(), termos):
+                return _montar_trecho(pagina, indice, termos)
+
+    return _montar_trecho(primeira, 0, []) if primeira else ""
+
+
+def _documentos_gravados(conexao: Connection) -> Iterable[List[dict]]:
+    """
+    Lê os documentos gravados em lotes, com o texto já descompactado
+
+    O texto compactado ou guardado no armazenamento tem texto_extraido
+    vazio; indexar a coluna direto deixaria esses documentos sem texto.
+    """
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            text(
+                "SELECT id, usuario_id, nome_arquivo, texto_extraido, codec_texto, "
+                "texto_compactado, chave_texto FROM documentos_texto "
+                "WHERE id > :ultimo_id ORDER BY id LIMIT :lote"
+            ),
+            {"ultimo_id": ultimo_id, "lote": LOTE_INDEXACAO},
+        ).all()
+        if not linhas:
+            return
+        ultimo_id = linhas[-1].id
+
+        documentos = []
+        for linha in linhas:
+            dados = linha.texto_compactado
+            if linha.chave_texto is not None:
+                if armazenamento is None:
+                    logger.warning(
+                        "Documento %s fora do índice de busca: o texto está no "
+                        "armazenamento, que está desligado",
+                        linha.id,
+                    )
+                    continue
+                try:
+                    dados = armazenamento.ler_bytes(linha.chave_texto)
+                except FileNotFoundError:
+                    logger.warning(
+                        "Documento %s fora do índice de busca: o texto não está "
+                        "no armazenamento",
+                        linha.id,
+                    )
+                    continue
+            documentos.append(
+                {
+                    "documento_id": linha.id,
+                    "usuario_id": linha.usuario_id,
+                    "nome_arquivo": linha.nome_arquivo,
+                    "texto": texto_das_colunas(
+                        linha.texto_extraido, linha.codec_texto, dados
+                    ),
+                }
+            )
+        yield documentos
+
+
+class ServicoBusca:
+    """Classe para o índice de busca textual dos documentos"""
+
+    @staticmethod
+    def criar_indice(engine: Engine) -> None:
+        """
+        Cria o índice de busca, se ainda não existir, e indexa os documentos já gravados
+
+        O índice não guarda cópia do texto. No SQLite é uma tabela virtual
+        FTS5 sem conteúdo (content=''), com uma coluna de partição por
+        usuario, mais a tabela termos_busca com a contagem dos termos
+        indexados de cada documento, que é o que o FTS5 precisa para tirar
+        um documento sem reler o texto dele; no Postgres, uma tabela só com o
+        tsvector de cada parte do texto e um índice GIN em (usuario_id,
+        vetor). Um índice em formato anterior é recriado.
+
+        Args:
+            engine: Engine do banco de dados
+        """
+        postgres = engine.dialect.name == "postgresql"
+        inspetor = inspect(engine)
+        if inspetor.has_table("documentos_busca"):
+            colunas = {
+                coluna["name"] for coluna in inspetor.get_columns("documentos_busca")
+            }
+            formato_atual = (
+                "texto" not in colunas
+                if postgres
+                else "usuario" in colunas and inspetor.has_table("termos_busca")
+            )
+            if formato_atual:
+                return
+            logger.info("Recriando o índice de busca sem a cópia do texto")
+
+        with engine.begin() as conexao:
+            conexao.execute(text("DROP TABLE IF EXISTS documentos_busca"))
+            conexao.execute(text("DROP TABLE IF EXISTS termos_busca"))
+            if postgres:
+                conexao.execute(
+                    text(
+                        "CREATE TABLE documentos_busca ("
+                        " documento_id INTEGER NOT NULL,"
+                        " parte INTEGER NOT NULL,"
+                        " usuario_id INTEGER NOT NULL,"
+                        " vetor TSVECTOR NOT NULL,"
+                        " PRIMARY KEY (documento_id, parte))"
+                    )
+                )
+                # Com btree_gin o usuario entra no próprio índice GIN; sem a
+                # extensão, o filtro por usuario vem depois do @@
+                try:
+                    with conexao.begin_nested():
+                        conexao.execute(
+                            text("CREATE EXTENSION IF NOT EXISTS btree_gin")
+                        )
+                    colunas_indice = "usuario_id, vetor"
+                except DBAPIError:
+                    logger.warning(
+                        "Extensão btree_gin indisponível; a busca filtra o usuario "
+                        "depois de consultar o índice"
+                    )
+                    colunas_indice = "vetor"
+                conexao.execute(
+                    text(
+                        "CREATE INDEX ix_documentos_busca_usuario_vetor "
+                        f"ON documentos_busca USING GIN ({colunas_indice})"
+                    )
+                )
+            else:
+                conexao.execute(
+                    text(
+                        "CREATE VIRTUAL TABLE documentos_busca USING fts5("
+                        "usuario, nome_arquivo, texto, content='', "
+                        "tokenize = 'unicode61 remove_diacritics 2')"
+                    )
+                )
+                conexao.execute(
+                    text(
+                        "CREATE TABLE termos_busca ("
+                        " documento_id INTEGER PRIMARY KEY,"
+                        " usuario TEXT NOT NULL,"
+                        " nome_arquivo TEXT NOT NULL,"
+                        " termos TEXT NOT NULL)"
+                    )
+                )
+
+            for documentos in _documentos_gravados(conexao):
+                linhas = _linhas_indice(engine.dialect.name, documentos)
+                conexao.execute(text(_inserir_linhas(engine.dialect.name)), linhas)
+                if not postgres:
+                    conexao.execute(text(_inserir_termos()), linhas)
+
+    @staticmethod
+    def renomeacao_usa_texto(db: AsyncSession) -> bool:
+        """
+        Se renomear_documento precisa do texto do documento
+
+        No Postgres o nome entra no mesmo tsvector do texto, refeito do zero;
+        no SQLite o texto indexado é remontado de termos_busca.
+        """
+        return _dialeto(db) == "postgresql"
+
+    @staticmethod
+    async def indexar_documento(
+        db: AsyncSession,
+        documento_id: int,
+        usuario_id: int,
+        nome_arquivo: str,
+        texto: str,
+    ) -> None:
+        """
+        Insere o documento no índice de busca (sem fazer commit)
+
+        Um documento já indexado precisa sair antes por remover_documentos.
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+            usuario_id: ID do usuario dono do documento
+            nome_arquivo: Nome do arquivo
+            texto: Texto completo do documento
+        """
+        await ServicoBusca.indexar_documentos(
+            db,
+            [
+                {
+                    "documento_id": documento_id,
+                    "usuario_id": usuario_id,
+                    "nome_arquivo": nome_arquivo,
+                    "texto": texto,
+                }
+            ],
+        )
+
+    @staticmethod
+    async def indexar_documentos(db: AsyncSession, documentos: List[dict]) -> None:
+        """
+        Insere documentos novos no índice de busca em um único executemany
+        (sem fazer commit)
+
+        Args:
+            db: Sessão do banco de dados
+            documentos: documento_id, usuario_id, nome_arquivo e texto de cada um
+        """
+        if not documentos:
+            return
+
+        # Separar o texto em termos é trabalho de CPU proporcional ao texto
+        linhas = await run_in_threadpool(_linhas_indice, _dialeto(db), documentos)
+        if _dialeto(db) != "postgresql":
+            # O SQLite reaproveita o id do último documento apagado; uma
+            # entrada que tenha ficado para trás com ele sai antes
+            await ServicoBusca.remover_documentos(
+                db, [documento["documento_id"] for documento in documentos]
+            )
+            await db.execute(text(_inserir_termos()), linhas)
+        await db.execute(text(_inserir_linhas(_dialeto(db))), linhas)
+
+    @staticmethod
+    async def remover_documentos(db: AsyncSession, ids: List[int]) -> None:
+        """
+        Remove documentos do índice de busca (sem fazer commit)
+
+        O FTS5 sem conteúdo só tira uma entrada recebendo os mesmos valores
+        que foram indexados; eles são remontados de termos_busca, sem ler o
+        texto dos documentos.
+
+        Args:
+            db: Sessão do banco de dados
+            ids: IDs dos documentos
+        """
+        if not ids:
+            return
+
+        if _dialeto(db) == "postgresql":
+            await db.execute(
+                text(
+                    "DELETE FROM documentos_busca WHERE documento_id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(ids)},
+            )
+            return
+
+        linhas = (
+            await db.execute(
+                text(
+                    "SELECT documento_id, usuario, nome_arquivo, termos "
+                    "FROM termos_busca WHERE documento_id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(ids)},
+            )
+        ).all()
+        if not linhas:
+            return
+
+        await db.execute(
+            text(
+                "INSERT INTO documentos_busca "
+                "(documentos_busca, rowid, usuario, nome_arquivo, texto) "
+                "VALUES ('delete', :documento_id, :usuario, :nome_arquivo, :texto)"
+            ),
+            [
+                {
+                    "documento_id": linha.documento_id,
+                    "usuario": linha.usuario,
+                    "nome_arquivo": linha.nome_arquivo,
+                    "texto": _texto_indexado(linha.termos),
+                }
+                for linha in linhas
+            ],
+        )
+        await db.execute(
+            text("DELETE FROM termos_busca WHERE documento_id IN :ids").bindparams(
+                bindparam("ids", expanding=True)
+            ),
+            {"ids": [linha.documento_id for linha in linhas]},
+        )
+
+    @staticmethod
+    async def renomear_documento(
+        db: AsyncSession,
+        documento_id: int,
+        usuario_id: int,
+        nome_arquivo: str,
+        texto: Optional[str] = None,
+    ) -> None:
+        """
+        Troca o nome de um documento no índice de busca (sem fazer commit)
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+            usuario_id: ID do usuario dono do documento
+            nome_arquivo: Novo nome do arquivo
+            texto: Texto completo do documento, só se renomeacao_usa_texto
+        """
+        if _dialeto(db) == "postgresql":
+            await ServicoBusca.remover_documentos(db, [documento_id])
+            await ServicoBusca.indexar_documento(
+                db, documento_id, usuario_id, nome_arquivo, texto
+            )
+            return
+
+        termos = await db.scalar(
+            text("SELECT termos FROM termos_busca WHERE documento_id = :id"),
+            {"id": documento_id},
+        )
+        if termos is None:
+            return
+
+        await ServicoBusca.remover_documentos(db, [documento_id])
+        linha = {
+            "documento_id": documento_id,
+            "usuario": _particao(usuario_id),
+            "nome_arquivo": " ".join(_termos(nome_arquivo)),
+            "termos": termos,
+            "texto": _texto_indexado(termos),
+        }
+        await db.execute(text(_inserir_linhas(_dialeto(db))), linha)
+        await db.execute(text(_inserir_termos()), linha)
+
+    @staticmethod
+    async def buscar(
+        db: AsyncSession, usuario_id: int, consulta: str, limite: int
+    ) -> List[dict]:
+        """
+        Busca nos documentos do usuario, do mais relevante para o menos relevante
+
+        O índice não guarda o texto, então os resultados vêm sem trecho; ele
+        é montado a partir das páginas com gerar_trecho.
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            consulta: Termos digitados pelo usuario
+            limite: Quantidade máxima de resultados
+
+        Returns:
+            List[dict]: id, nome_arquivo e relevancia de cada documento
+
+        Raises:
+            HTTPException: Se a consulta não tiver nenhum termo
+        """
+        limite = max(1, min(limite, MAXIMO_RESULTADOS_BUSCA))
+
+        if _dialeto(db) == "postgresql":
+            if not consulta.strip():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Informe ao menos um termo para a busca",
+                )
+
+            # A relevância do documento é a da sua parte mais relevante
+            linhas = (
+                await db.execute(
+                    text(
+                        "SELECT d.id, d.nome_arquivo, r.relevancia FROM ("
+                        " SELECT b.documento_id,"
+                        " max(ts_rank(b.vetor, q.consulta)) AS relevancia"
+                        " FROM documentos_busca b,"
+                        f" websearch_to_tsquery('{IDIOMA_BUSCA}', :consulta) AS q(consulta)"
+                        " WHERE b.usuario_id = :usuario_id AND b.vetor @@ q.consulta"
+                        " GROUP BY b.documento_id"
+                        " ORDER BY relevancia DESC LIMIT :limite"
+                        ") r JOIN documentos_texto d ON d.id = r.documento_id"
+                        " ORDER BY r.relevancia DESC"
+                    ),
+                    {"consulta": consulta, "usuario_id": usuario_id, "limite": limite},
+                )
+            ).all()
+        else:
+            consulta_fts5 = _consulta_fts5(consulta, usuario_id)
+            if not consulta_fts5:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Informe ao menos um termo para a busca",
+                )
+
+            # bm25 devolve valores negativos: quanto menor, mais relevante. A
+            # coluna de partição não conta para a relevância
+            linhas = (
+                await db.execute(
+                    text(
+                        "SELECT d.id, d.nome_arquivo, -r.pontos FROM ("
+                        " SELECT rowid, bm25(documentos_busca, 0.0, 1.0, 1.0) AS pontos"
+                        " FROM documentos_busca WHERE documentos_busca MATCH :consulta"
+                        " ORDER BY pontos LIMIT :limite"
+                        ") r JOIN documentos_texto d ON d.id = r.rowid"
+                        " ORDER BY r.pontos"
+                    ),
+                    {"consulta": consulta_fts5, "limite": limite},
+                )
+            ).all()
+
+        return [
+            {
+                "id": documento_id,
+                "nome_arquivo": nome_arquivo,
+                "relevancia": float(relevancia),
+            }
+            for documento_id, nome_arquivo, relevancia in linhas
+        ]
@@ -1,7 +1,564 @@
 import PyPDF2
+import base64
+import binascii
+import hashlib
 import io
-from fastapi import HTTPException, status, UploadFile
-from typing import Tuple
+import json
+import mmap
+import os
+import tempfile
+import time
+from datetime import datetime
+from fastapi import HTTPException, Response, status, UploadFile
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as insert_postgres
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from backend.database import escrita_serializada
+from backend.models import (
+    DocumentoTexto,
+    PaginaDocumento,
+    VersaoDocumentos,
+    VersaoTextoDocumento,
+)
+from backend.services.armazenamento import LIMITE_TEXTO_NO_BANCO, armazenamento
+from backend.services.cache import EstatisticasCache
+from backend.services.cache_respostas import cache_respostas, chave_documento
+from backend.services.compressao_texto import (
+    CODEC_ZLIB,
+    COMPRESSAO_TEXTO,
+    SEM_COMPRESSAO,
+    colunas_texto,
+    iterar_texto_das_colunas,
+    texto_das_colunas,
+)
+from backend.services.metricas import (
+    bytes_processados,
+    etapas_upload,
+    medir_etapa,
+    paginas_extraidas,
+    paginas_por_segundo,
+)
+from backend.services.motor_extracao import motor_extracao
+from backend.services.servico_busca import ServicoBusca, gerar_trecho
+from backend.services.servico_ocr import ServicoOcr
+
+# Pasta onde os uploads ficam em disco enquanto o texto é extraído
+PASTA_TEMPORARIA_UPLOADS = os.getenv("PASTA_TEMPORARIA_UPLOADS", tempfile.gettempdir())
+TAMANHO_BLOCO_LEITURA = 1024 * 1024
+
+# Limites de cada PDF, conferidos antes de o PyPDF2 extrair qualquer texto
+MAXIMO_TAMANHO_PDF_MB = int(os.getenv("MAXIMO_TAMANHO_PDF_MB", "100"))
+MAXIMO_BYTES_PDF = MAXIMO_TAMANHO_PDF_MB * 1024 * 1024
+MAXIMO_PAGINAS_PDF = int(os.getenv("MAXIMO_PAGINAS_PDF", "5000"))
+# Todo PDF começa com %PDF-; a especificação tolera lixo antes, até 1024 bytes
+ASSINATURA_PDF = b"%PDF-"
+INICIO_ASSINATURA_PDF = 1024
+
+# Versão da extração (PyPDF2, OCR e junção das páginas). Incremente quando a
+# saída mudar: os documentos das versões anteriores deixam de ser reaproveitados
+# pelo hash e são refeitos por python -m backend.comandos.reextrair_textos
+VERSAO_EXTRATOR = 1
+
+# Textos anteriores guardados por documento (0 desliga o histórico)
+MAXIMO_VERSOES_TEXTO = int(os.getenv("MAXIMO_VERSOES_TEXTO", "10"))
+
+# Limites das consultas parciais de texto
+MAXIMO_PAGINAS_POR_CONSULTA = int(os.getenv("MAXIMO_PAGINAS_POR_CONSULTA", "100"))
+MAXIMO_CARACTERES_POR_TRECHO = int(os.getenv("MAXIMO_CARACTERES_POR_TRECHO", "1000000"))
+MAXIMO_LIMITE_LISTAGEM = 1000
+
+# Páginas de cada resultado da busca lidas à procura do trecho
+MAXIMO_PAGINAS_TRECHO = 50
+
+# Documentos tirados do índice de busca por vez ao apagar vários
+LOTE_REMOCAO_BUSCA = 100
+
+# Caracteres por bloco nas respostas que enviam o texto aos poucos
+TAMANHO_BLOCO_TEXTO = 1024 * 1024
+
+# Colunas recarregadas após uma atualização, incluindo o texto adiado
+DOCUMENTO_COLUNAS_COM_TEXTO = [
+    coluna.key for coluna in DocumentoTexto.__table__.columns
+]
+
+# Ordenações aceitas na listagem; o id acompanha a ordem de criação
+ORDENS_LISTAGEM = ("antigos", "recentes", "nome")
+
+
+class ArquivoNaoPdf(ValueError):
+    """O conteúdo do arquivo não começa com a assinatura de um PDF"""
+
+
+class ArquivoGrandeDemais(ValueError):
+    """O arquivo passa de MAXIMO_TAMANHO_PDF_MB"""
+
+
+class PaginasDemais(ValueError):
+    """O PDF tem mais páginas que MAXIMO_PAGINAS_PDF"""
+
+
+def _iterar_textos_paginas(leitor_pdf: PyPDF2.PdfReader) -> Iterator[str]:
+    """
+    Gera o texto de uma página por vez
+
+    O cache de objetos do PyPDF2 é limpo a cada página para que a memória não
+    cresça com o número de páginas do documento.
+    """
+    for indice in range(len(leitor_pdf.pages)):
+        yield leitor_pdf.pages[indice].extract_text()
+        leitor_pdf.resolved_objects.clear()
+
+
+def _ler_texto_pdf(conteudo_pdf: bytes) -> str:
+    """Lê o texto de todas as páginas de um PDF em memória"""
+    leitor_pdf = PyPDF2.PdfReader(io.BytesIO(conteudo_pdf))
+    return "\n".join(_iterar_textos_paginas(leitor_pdf)).strip()
+
+
+def _ler_paginas_arquivo_pdf(caminho_pdf: str) -> List[str]:
+    """
+    Lê o texto de cada página de um PDF em disco
+
+    O arquivo é mapeado em memória (mmap) em vez de copiado para um buffer, e
+    fica no nível do módulo para poder rodar nos processos do motor de extração.
+    """
+    return _ler_paginas_arquivo_pdf_com_tempos(caminho_pdf)[0]
+
+
+def _ler_paginas_arquivo_pdf_com_tempos(
+    caminho_pdf: str, maximo_paginas: Optional[int] = None
+) -> Tuple[List[str], float, List[float]]:
+    """
+    Igual a _ler_paginas_arquivo_pdf, devolvendo também o tempo de análise do
+    arquivo e o tempo de extração de cada página, em segundos
+
+    Com maximo_paginas, um PDF maior é recusado (PaginasDemais) logo depois
+    de aberto, antes de qualquer página ser extraída.
+    """
+    with open(caminho_pdf, "rb") as arquivo:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            inicio = time.perf_counter()
+            leitor_pdf = PyPDF2.PdfReader(mapa)
+            total_paginas = len(leitor_pdf.pages)
+            tempo_analise = time.perf_counter() - inicio
+
+            if maximo_paginas is not None and total_paginas > maximo_paginas:
+                raise PaginasDemais(
+                    f"O PDF tem {total_paginas} páginas; o limite é {maximo_paginas}"
+                )
+
+            paginas = []
+            tempos_paginas = []
+            inicio = time.perf_counter()
+            for texto in _iterar_textos_paginas(leitor_pdf):
+                paginas.append(texto)
+                agora = time.perf_counter()
+                tempos_paginas.append(agora - inicio)
+                inicio = agora
+
+            return paginas, tempo_analise, tempos_paginas
+
+
+def _copiar_upload(arquivo: UploadFile, caminho: str) -> Tuple[int, str]:
+    arquivo.file.seek(0)
+    return _copiar_com_hash(arquivo.file, caminho)
+
+
+def _copiar_com_hash(origem: BinaryIO, caminho: str) -> Tuple[int, str]:
+    """
+    Copia o PDF em blocos para o caminho, calculando o SHA-256 no caminho
+
+    A assinatura é conferida no primeiro bloco, antes de gravar qualquer byte,
+    e a cópia para assim que o tamanho passa de MAXIMO_BYTES_PDF.
+
+    Raises:
+        ArquivoNaoPdf: Se o conteúdo não começar como um PDF
+        ArquivoGrandeDemais: Se o arquivo passar do tamanho máximo
+    """
+    bloco = origem.read(TAMANHO_BLOCO_LEITURA)
+    if ASSINATURA_PDF not in bloco[:INICIO_ASSINATURA_PDF]:
+        raise ArquivoNaoPdf("O conteúdo do arquivo não é um PDF")
+
+    resumo = hashlib.sha256()
+    tamanho = 0
+    with open(caminho, "wb") as destino:
+        while bloco:
+            tamanho += len(bloco)
+            if tamanho > MAXIMO_BYTES_PDF:
+                raise ArquivoGrandeDemais(
+                    f"O PDF passa do limite de {MAXIMO_TAMANHO_PDF_MB} MB"
+                )
+            resumo.update(bloco)
+            destino.write(bloco)
+            bloco = origem.read(TAMANHO_BLOCO_LEITURA)
+    return tamanho, resumo.hexdigest()
+
+
+def _codificar_cursor(ordem: str, documento: DocumentoTexto) -> str:
+    dados = {"o": ordem, "id": documento.id}
+    if ordem == "nome":
+        dados["n"] = documento.nome_arquivo
+    return base64.urlsafe_b64encode(json.dumps(dados).encode()).decode()
+
+
+def _decodificar_cursor(cursor: str, ordem: str) -> dict:
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if dados["o"] != ordem or not isinstance(dados["id"], int):
+            raise ValueError
+        if ordem == "nome" and not isinstance(dados["n"], str):
+            raise ValueError
+        return dados
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido para esta ordenação",
+        )
+
+
+def _colunas_texto_armazenado(texto: str) -> dict:
+    """
+    Valores das colunas de texto, mandando para o armazenamento o texto grande
+
+    Como colunas_texto, mas se o texto (já compactado) passar de
+    LIMITE_TEXTO_NO_BANCO os bytes vão para o armazenamento, endereçados pelo
+    SHA-256, e a linha fica só com o codec e a chave.
+    """
+    colunas = colunas_texto(texto)
+    colunas["chave_texto"] = None
+    if armazenamento is None or not LIMITE_TEXTO_NO_BANCO:
+        return colunas
+
+    dados = colunas["texto_compactado"]
+    if dados is None:
+        dados = texto.encode("utf-8")
+    if len(dados) <= LIMITE_TEXTO_NO_BANCO:
+        return colunas
+
+    chave = hashlib.sha256(dados).hexdigest()
+    with medir_etapa("armazenamento"):
+        armazenamento.guardar_bytes(chave, dados)
+    return {
+        "texto_extraido": "",
+        "texto_compactado": None,
+        "codec_texto": colunas["codec_texto"] or COMPRESSAO_TEXTO,
+        "chave_texto": chave,
+    }
+
+
+def _colunas_texto_versao(colunas: dict) -> dict:
+    """
+    Colunas de uma versão anterior a partir das colunas gravadas no documento
+
+    Texto já compactado é copiado como está (do armazenamento, só a chave);
+    texto puro é compactado, porque as versões anteriores quase nunca são lidas.
+    """
+    if colunas["codec_texto"] is not None:
+        return colunas
+    codec = COMPRESSAO_TEXTO if COMPRESSAO_TEXTO != SEM_COMPRESSAO else CODEC_ZLIB
+    return {**colunas_texto(colunas["texto_extraido"], codec), "chave_texto": None}
+
+
+async def _dados_texto(
+    chave_texto: Optional[str], texto_compactado: Optional[bytes]
+) -> Optional[bytes]:
+    """Bytes do texto gravado, buscados no armazenamento quando estão fora do banco"""
+    if chave_texto is None:
+        return texto_compactado
+    if armazenamento is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="O texto deste documento está no armazenamento, que está desligado",
+        )
+    try:
+        return await run_in_threadpool(armazenamento.ler_bytes, chave_texto)
+    except FileNotFoundError:
+        # Blob perdido (ex.: pasta local apagada num redeploy)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="O texto deste documento não foi encontrado no armazenamento",
+        )
+
+
+def _chave_arquivo(hash_conteudo: Optional[str]) -> Optional[str]:
+    # A chave do PDF no armazenamento é o próprio SHA-256; todo caminho de
+    # criação chama guardar_pdf antes de gravar a linha
+    return hash_conteudo if armazenamento is not None else None
+
+
+async def _carregar_texto(documento: DocumentoTexto) -> None:
+    """Troca o texto vazio de um documento compactado pelo texto descompactado"""
+    if documento.codec_texto is not None:
+        texto = await run_in_threadpool(
+            texto_das_colunas,
+            documento.texto_extraido,
+            documento.codec_texto,
+            await _dados_texto(documento.chave_texto, documento.texto_compactado),
+        )
+        set_committed_value(documento, "texto_extraido", texto)
+
+
+def limites_paginas(paginas: List[str], texto: str) -> Optional[List[Tuple[int, int]]]:
+    """
+    Posição [inicio, fim) de cada página no texto do documento, em caracteres
+
+    O texto é o das páginas juntas por quebra de linha, com ou sem os
+    espaços das bordas (juntar_paginas os tira); o que saiu das bordas fica
+    fora da primeira e da última página. None se o texto não for formado
+    pelas páginas.
+    """
+    juntado = "\n".join(paginas)
+    if texto == juntado:
+        deslocamento = 0
+    elif texto == juntado.strip():
+        deslocamento = len(juntado) - len(juntado.lstrip())
+    else:
+        return None
+
+    limites = []
+    inicio = 0
+    for pagina in paginas:
+        fim = inicio + len(pagina)
+        limites.append(
+            (
+                min(max(inicio - deslocamento, 0), len(texto)),
+                min(max(fim - deslocamento, 0), len(texto)),
+            )
+        )
+        inicio = fim + 1
+    return limites
+
+
+def _linhas_paginas(documento_id: int, paginas: List[str], texto: str) -> List[dict]:
+    """Linhas da tabela de páginas, só com a posição de cada uma no texto"""
+    limites = limites_paginas(paginas, texto)
+    if limites is None:
+        # Não acontece pelos caminhos de gravação; no pior caso, cada página
+        # guarda o próprio texto, como as linhas antigas
+        return [
+            {"documento_id": documento_id, "numero_pagina": numero, "texto": pagina}
+            for numero, pagina in enumerate(paginas, 1)
+        ]
+    return [
+        {
+            "documento_id": documento_id,
+            "numero_pagina": numero,
+            "texto": "",
+            "inicio": inicio,
+            "fim": fim,
+        }
+        for numero, (inicio, fim) in enumerate(limites, 1)
+    ]
+
+
+def _recortar_blocos(
+    blocos: Iterator[str], limites: List[Tuple[int, int]]
+) -> List[str]:
+    """Recorta do texto lido em blocos os trechos [inicio, fim), parando no último"""
+    partes = [[] for _ in limites]
+    ultimo = max(fim for _, fim in limites)
+    posicao = 0
+    for bloco in blocos:
+        if posicao >= ultimo:
+            break
+        proxima = posicao + len(bloco)
+        for parte, (inicio, fim) in zip(partes, limites):
+            if inicio < proxima and fim > posicao:
+                parte.append(bloco[max(inicio - posicao, 0) : fim - posicao])
+        posicao = proxima
+    return ["".join(parte) for parte in partes]
+
+
+async def _recortar_texto(
+    db: AsyncSession, documento_id: int, limites: List[Tuple[int, int]]
+) -> List[str]:
+    """
+    Recorta do texto gravado do documento os trechos [inicio, fim) informados
+
+    Texto puro é recortado no banco, de uma vez do primeiro ao último trecho;
+    o compactado (ou no armazenamento) só é descompactado até o último.
+    """
+    primeiro = min(inicio for inicio, _ in limites)
+    ultimo = max(fim for _, fim in limites)
+    trecho, codec_texto, texto_compactado, chave_texto = (
+        await db.execute(
+            select(
+                func.substr(
+                    DocumentoTexto.texto_extraido, primeiro + 1, ultimo - primeiro
+                ),
+                DocumentoTexto.codec_texto,
+                DocumentoTexto.texto_compactado,
+                DocumentoTexto.chave_texto,
+            ).where(DocumentoTexto.id == documento_id)
+        )
+    ).one()
+
+    if codec_texto is None:
+        return [trecho[inicio - primeiro : fim - primeiro] for inicio, fim in limites]
+
+    blocos = iterar_texto_das_colunas(
+        "",
+        codec_texto,
+        await _dados_texto(chave_texto, texto_compactado),
+        TAMANHO_BLOCO_TEXTO,
+    )
+    return await run_in_threadpool(_recortar_blocos, blocos, limites)
+
+
+async def _ler_paginas(
+    db: AsyncSession, documento_id: int, inicio: int, fim: Optional[int] = None
+) -> List[Tuple[int, str]]:
+    """Número e texto das páginas gravadas do documento, de inicio a fim"""
+    consulta = select(
+        PaginaDocumento.numero_pagina,
+        PaginaDocumento.texto,
+        PaginaDocumento.inicio,
+        PaginaDocumento.fim,
+    ).where(
+        PaginaDocumento.documento_id == documento_id,
+        PaginaDocumento.numero_pagina >= inicio,
+    )
+    if fim is not None:
+        consulta = consulta.where(PaginaDocumento.numero_pagina <= fim)
+    linhas = (await db.execute(consulta.order_by(PaginaDocumento.numero_pagina))).all()
+
+    limites = [
+        (linha.inicio, linha.fim) for linha in linhas if linha.inicio is not None
+    ]
+    if not limites:
+        return [(linha.numero_pagina, linha.texto) for linha in linhas]
+
+    recortes = iter(await _recortar_texto(db, documento_id, limites))
+    return [
+        (linha.numero_pagina, linha.texto if linha.inicio is None else next(recortes))
+        for linha in linhas
+    ]
+
+
+async def _texto_documento(db: AsyncSession, documento_id: int) -> str:
+    """Texto completo gravado do documento, descompactado"""
+    texto_extraido, codec_texto, texto_compactado, chave_texto = (
+        await db.execute(
+            select(
+                DocumentoTexto.texto_extraido,
+                DocumentoTexto.codec_texto,
+                DocumentoTexto.texto_compactado,
+                DocumentoTexto.chave_texto,
+            ).where(DocumentoTexto.id == documento_id)
+        )
+    ).one()
+    return await run_in_threadpool(
+        texto_das_colunas,
+        texto_extraido,
+        codec_texto,
+        await _dados_texto(chave_texto, texto_compactado),
+    )
+
+
+async def _textos_paginas(
+    db: AsyncSession, documento_id: int, inicio: int, fim: int
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Total de páginas do documento e o texto das páginas de inicio a fim
+
+    Documentos gravados antes da tabela de páginas viram uma página única.
+    """
+    total_paginas = await db.scalar(
+        select(func.count(PaginaDocumento.id)).where(
+            PaginaDocumento.documento_id == documento_id
+        )
+    )
+
+    if total_paginas == 0:
+        texto = await _texto_documento(db, documento_id)
+        return 1, [(1, texto)] if inicio == 1 else []
+
+    return total_paginas, await _ler_paginas(db, documento_id, inicio, fim)
+
+
+async def _paginas_trechos(db: AsyncSession, ids: List[int]) -> Dict[int, List[str]]:
+    """
+    Texto das primeiras MAXIMO_PAGINAS_TRECHO páginas de cada documento
+
+    Uma consulta para todos os documentos, com o texto puro já recortado no
+    banco. Só o texto compactado, o do armazenamento e o de documentos sem
+    páginas é lido inteiro, na segunda consulta; um texto perdido no
+    armazenamento fica sem páginas, em vez de derrubar a busca toda.
+    """
+    paginas: Dict[int, List[str]] = {documento_id: [] for documento_id in ids}
+    limites: Dict[int, List[Tuple[int, int]]] = {}
+    linhas = await db.execute(
+        select(
+            PaginaDocumento.documento_id,
+            PaginaDocumento.texto,
+            PaginaDocumento.inicio,
+            PaginaDocumento.fim,
+            DocumentoTexto.codec_texto,
+            func.substr(
+                DocumentoTexto.texto_extraido,
+                PaginaDocumento.inicio + 1,
+                PaginaDocumento.fim - PaginaDocumento.inicio,
+            ),
+        )
+        .join(DocumentoTexto, DocumentoTexto.id == PaginaDocumento.documento_id)
+        .where(
+            PaginaDocumento.documento_id.in_(ids),
+            PaginaDocumento.numero_pagina <= MAXIMO_PAGINAS_TRECHO,
+        )
+        .order_by(PaginaDocumento.documento_id, PaginaDocumento.numero_pagina)
+    )
+    for documento_id, texto, inicio, fim, codec_texto, recorte in linhas:
+        if inicio is None:
+            paginas[documento_id].append(texto)
+        elif codec_texto is None:
+            paginas[documento_id].append(recorte)
+        else:
+            limites.setdefault(documento_id, []).append((inicio, fim))
+
+    # Compactados (recortados depois de descompactar) e documentos sem páginas
+    restantes = set(limites) | {
+        documento_id for documento_id, lidas in paginas.items() if not lidas
+    }
+    if not restantes:
+        return paginas
+
+    linhas = await db.execute(
+        select(
+            DocumentoTexto.id,
+            DocumentoTexto.texto_extraido,
+            DocumentoTexto.codec_texto,
+            DocumentoTexto.texto_compactado,
+            DocumentoTexto.chave_texto,
+        ).where(DocumentoTexto.id.in_(restantes))
+    )
+    for documento_id, texto_extraido, codec_texto, texto_compactado, chave in linhas:
+        try:
+            dados = await _dados_texto(chave, texto_compactado)
+        except HTTPException:
+            continue
+        if documento_id in limites:
+            blocos = iterar_texto_das_colunas(
+                "", codec_texto, dados, TAMANHO_BLOCO_TEXTO
+            )
+            paginas[documento_id] = await run_in_threadpool(
+                _recortar_blocos, blocos, limites[documento_id]
+            )
+        else:
+            paginas[documento_id] = [
+                await run_in_threadpool(
+                    texto_das_colunas, texto_extraido, codec_texto, dados
+                )
+            ]
+    return paginas
+
+
+# Acertos e falhas do reaproveitamento de texto de PDFs já enviados
+estatisticas_cache_extracao = EstatisticasCache()
 
 
 class ServicoDocumento:
@@ -40,13 +597,56 @@ class ServicoDocumento:
             HTTPException: Se houver erro na extração
         """
         try:
-            leitor_pdf = PyPDF2.PdfReader(io.BytesIO(conteudo_pdf))
-            texto_extraido = ""
+            return _ler_texto_pdf(conteudo_pdf)
 
-            for pagina in leitor_pdf.pages:
-                texto_extraido += pagina.extract_text() + "\n"
+        except Exception as erro:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Erro ao extrair texto do PDF: {str(erro)}",
+            )
+
+    @staticmethod
+    def juntar_paginas(paginas: List[str]) -> str:
+        """
+        Monta o texto completo do documento a partir do texto das páginas
 
-            return texto_extraido.strip()
+        Args:
+            paginas: Texto de cada página, na ordem
+
+        Returns:
+            str: Texto completo do documento
+        """
+        return "\n".join(paginas).strip()
+
+    @staticmethod
+    async def extrair_paginas_arquivo_pdf(caminho_pdf: str) -> List[str]:
+        """
+        Extrai o texto de cada página de um PDF em disco em um processo do motor
+        de extração, sem travar o event loop; as páginas sem camada de texto
+        passam pelo OCR, quando ativo
+
+        Args:
+            caminho_pdf: Caminho do PDF em disco
+
+        Returns:
+            List[str]: Texto de cada página do PDF
+
+        Raises:
+            HTTPException: Se houver erro na extração ou o motor estiver sobrecarregado
+        """
+        try:
+            with medir_etapa("extracao"):
+                paginas, tempo_analise, tempos_paginas = await motor_extracao.executar(
+                    _ler_paginas_arquivo_pdf_com_tempos, caminho_pdf, MAXIMO_PAGINAS_PDF
+                )
+
+        except HTTPException:
+            raise
+
+        except PaginasDemais as erro:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(erro)
+            )
 
         except Exception as erro:
             raise HTTPException(
@@ -54,16 +654,71 @@ class ServicoDocumento:
                 detail=f"Erro ao extrair texto do PDF: {str(erro)}",
             )
 
+        etapas_upload.observar(tempo_analise, "analise")
+        for tempo_pagina in tempos_paginas:
+            etapas_upload.observar(tempo_pagina, "pagina")
+        paginas_extraidas.incrementar(valor=len(paginas))
+        tempo_total = tempo_analise + sum(tempos_paginas)
+        if paginas and tempo_total > 0:
+            paginas_por_segundo.observar(len(paginas) / tempo_total)
+
+        return await ServicoOcr.completar_paginas(caminho_pdf, paginas)
+
+    @staticmethod
+    async def salvar_upload_em_disco(
+        arquivo: UploadFile, caminho: str
+    ) -> Tuple[int, str]:
+        """
+        Copia o upload para disco em blocos, sem carregar o arquivo inteiro na
+        memória, calculando o SHA-256 do conteúdo no caminho
+
+        Args:
+            arquivo: Arquivo enviado pelo usuário
+            caminho: Caminho de destino
+
+        Returns:
+            Tuple[int, str]: (tamanho do arquivo em bytes, hash SHA-256)
+
+        Raises:
+            HTTPException: 413 se passar de MAXIMO_TAMANHO_PDF_MB e 415 se o
+                conteúdo não for de um PDF
+        """
+        if arquivo.size is not None and arquivo.size > MAXIMO_BYTES_PDF:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"O PDF passa do limite de {MAXIMO_TAMANHO_PDF_MB} MB",
+            )
+
+        try:
+            with medir_etapa("leitura"):
+                tamanho, hash_conteudo = await run_in_threadpool(
+                    _copiar_upload, arquivo, caminho
+                )
+        except ArquivoNaoPdf as erro:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(erro)
+            )
+        except ArquivoGrandeDemais as erro:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(erro)
+            )
+        bytes_processados.incrementar(valor=tamanho)
+        return tamanho, hash_conteudo
+
     @staticmethod
-    def processar_upload_pdf(arquivo: UploadFile) -> Tuple[str, int]:
+    async def processar_upload_pdf(
+        db: AsyncSession, arquivo: UploadFile
+    ) -> Tuple[List[str], int, str]:
         """
         Processa upload de PDF e extrai informações
 
         Args:
+            db: Sessão do banco de dados
             arquivo: Arquivo PDF enviado
 
         Returns:
-            Tuple[str, int]: (texto_extraido, tamanho_arquivo)
+            Tuple[List[str], int, str]: (texto de cada página, tamanho_arquivo,
+                hash_conteudo)
 
         Raises:
             HTTPException: Se arquivo for inválido ou erro na extração
@@ -75,17 +730,1143 @@ class ServicoDocumento:
                 detail="Apenas arquivos PDF são aceitos",
             )
 
-        # Ler conteudo do arquivo
-        conteudo_arquivo = arquivo.file.read()
-        tamanho_arquivo = len(conteudo_arquivo)
+        # Guardar o upload em um arquivo temporário em vez de ler tudo para a memória
+        descritor, caminho_temporario = tempfile.mkstemp(
+            suffix=".pdf", dir=PASTA_TEMPORARIA_UPLOADS
+        )
+        os.close(descritor)
+        try:
+            tamanho_arquivo, hash_conteudo = (
+                await ServicoDocumento.salvar_upload_em_disco(
+                    arquivo, caminho_temporario
+                )
+            )
+
+            # Extrair texto, ou reaproveitar se o mesmo PDF já foi enviado
+            paginas = await ServicoDocumento.obter_paginas_pdf(
+                db, caminho_temporario, hash_conteudo
+            )
+            await ServicoDocumento.guardar_pdf(caminho_temporario, hash_conteudo)
+        finally:
+            os.remove(caminho_temporario)
+
+        return paginas, tamanho_arquivo, hash_conteudo
+
+    @staticmethod
+    async def guardar_pdf(caminho_pdf: str, hash_conteudo: str) -> None:
+        """
+        Guarda o PDF original no armazenamento, com o SHA-256 como chave
+
+        Não faz nada com o armazenamento desligado. Um PDF já guardado não é
+        gravado de novo; no disco local, no mesmo sistema de arquivos, vira
+        um hard link do arquivo temporário, sem copiar os bytes.
+
+        Args:
+            caminho_pdf: Caminho do PDF em disco (o arquivo temporário do upload)
+            hash_conteudo: SHA-256 do PDF
+        """
+        if armazenamento is None:
+            return
+        with medir_etapa("armazenamento"):
+            await run_in_threadpool(
+                armazenamento.guardar_arquivo, hash_conteudo, caminho_pdf
+            )
+
+    @staticmethod
+    async def resposta_arquivo(documento: DocumentoTexto, cabecalhos: dict) -> Response:
+        """
+        Resposta que envia o PDF original do documento
+
+        Args:
+            documento: Documento já conferido como sendo do usuario
+            cabecalhos: Headers extras (Content-Disposition, ETag...)
 
-        # Extrair texto
-        texto_extraido = ServicoDocumento.extrair_texto_pdf(conteudo_arquivo)
+        Returns:
+            Response: O arquivo (sendfile / X-Accel-Redirect) ou o
+                redirecionamento para a URL assinada do S3
 
-        if not texto_extraido:
+        Raises:
+            HTTPException: Se o PDF original não tiver sido guardado
+        """
+        if armazenamento is None or documento.chave_arquivo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="PDF original nao disponivel para este documento",
+            )
+        try:
+            return await run_in_threadpool(
+                armazenamento.resposta_arquivo,
+                documento.chave_arquivo,
+                "application/pdf",
+                cabecalhos,
+            )
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="PDF original nao disponivel para este documento",
+            )
+
+    @staticmethod
+    async def buscar_paginas_por_hash(
+        db: AsyncSession, hash_conteudo: str
+    ) -> Optional[List[str]]:
+        """
+        Procura um documento já extraído a partir do mesmo PDF
+
+        Args:
+            db: Sessão do banco de dados
+            hash_conteudo: SHA-256 do PDF
+
+        Returns:
+            Optional[List[str]]: Texto de cada página ou None se não houver
+        """
+        # Só textos da versão atual da extração; os antigos seriam refeitos
+        documento_id = await db.scalar(
+            select(DocumentoTexto.id)
+            .where(
+                DocumentoTexto.hash_conteudo == hash_conteudo,
+                DocumentoTexto.versao_extrator == VERSAO_EXTRATOR,
+            )
+            .order_by(DocumentoTexto.id.desc())
+            .limit(1)
+        )
+        if documento_id is None:
+            return None
+
+        return await ServicoDocumento.ler_paginas(db, documento_id) or None
+
+    @staticmethod
+    async def obter_paginas_pdf(
+        db: AsyncSession, caminho_pdf: str, hash_conteudo: Optional[str]
+    ) -> List[str]:
+        """
+        Devolve o texto de cada página, sem passar pelo PyPDF2 se o mesmo PDF
+        já tiver sido extraído antes
+
+        Args:
+            db: Sessão do banco de dados
+            caminho_pdf: Caminho do PDF em disco
+            hash_conteudo: SHA-256 do PDF (None desliga o cache)
+
+        Returns:
+            List[str]: Texto de cada página do PDF
+
+        Raises:
+            HTTPException: Se houver erro na extração ou o PDF não tiver texto
+        """
+        if hash_conteudo:
+            paginas = await ServicoDocumento.buscar_paginas_por_hash(db, hash_conteudo)
+            estatisticas_cache_extracao.registrar(paginas is not None)
+            if paginas is not None:
+                return paginas
+
+        return await ServicoDocumento.processar_arquivo_pdf(caminho_pdf)
+
+    @staticmethod
+    async def processar_arquivo_pdf(caminho_pdf: str) -> List[str]:
+        """
+        Extrai o texto de um PDF em disco e garante que algo foi extraído
+
+        Args:
+            caminho_pdf: Caminho do PDF em disco
+
+        Returns:
+            List[str]: Texto de cada página do PDF
+
+        Raises:
+            HTTPException: Se houver erro na extração ou o PDF não tiver texto
+        """
+        paginas = await ServicoDocumento.extrair_paginas_arquivo_pdf(caminho_pdf)
+
+        if not ServicoDocumento.juntar_paginas(paginas):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Não foi possível extrair texto do PDF",
             )
 
-        return texto_extraido, tamanho_arquivo
+        return paginas
+
+    @staticmethod
+    async def criar_documento(
+        db: AsyncSession,
+        nome_arquivo: str,
+        paginas: List[str],
+        tamanho_arquivo: int,
+        usuario_id: int,
+        hash_conteudo: Optional[str] = None,
+    ) -> DocumentoTexto:
+        """
+        Grava um novo documento e o texto de cada página no banco
+
+        Args:
+            db: Sessão do banco de dados
+            nome_arquivo: Nome original do arquivo
+            paginas: Texto de cada página extraída do PDF
+            tamanho_arquivo: Tamanho do arquivo em bytes
+            usuario_id: ID do usuario dono do documento
+            hash_conteudo: SHA-256 do PDF original
+
+        Returns:
+            DocumentoTexto: Documento criado
+        """
+        texto = ServicoDocumento.juntar_paginas(paginas)
+        documento = DocumentoTexto(
+            nome_arquivo=nome_arquivo,
+            tamanho_arquivo=tamanho_arquivo,
+            usuario_id=usuario_id,
+            hash_conteudo=hash_conteudo,
+            chave_arquivo=_chave_arquivo(hash_conteudo),
+            versao_extrator=VERSAO_EXTRATOR,
+            **await run_in_threadpool(_colunas_texto_armazenado, texto),
+        )
+
+        with medir_etapa("gravacao"):
+            async with escrita_serializada():
+                db.add(documento)
+                await db.flush()
+                await ServicoDocumento.gravar_paginas(db, documento.id, paginas, texto)
+                await ServicoBusca.indexar_documento(
+                    db, documento.id, usuario_id, nome_arquivo, texto
+                )
+                await ServicoDocumento.registrar_alteracao(db, usuario_id, 1)
+                await db.commit()
+        await db.refresh(documento)
+
+        # O texto acabou de ser gravado, não precisa ser lido de novo do banco
+        set_committed_value(documento, "texto_extraido", texto)
+
+        return documento
+
+    @staticmethod
+    async def criar_documentos_em_lote(
+        db: AsyncSession, usuario_id: int, documentos: List[dict]
+    ) -> List[int]:
+        """
+        Grava vários documentos com inserts em lote e um único commit
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            documentos: nome_arquivo, paginas, tamanho_arquivo e hash_conteudo
+                de cada documento
+
+        Returns:
+            List[int]: IDs criados, na mesma ordem de documentos
+        """
+        if not documentos:
+            return []
+
+        textos = [
+            ServicoDocumento.juntar_paginas(documento["paginas"])
+            for documento in documentos
+        ]
+        linhas = [
+            {
+                "nome_arquivo": documento["nome_arquivo"],
+                "tamanho_arquivo": documento["tamanho_arquivo"],
+                "usuario_id": usuario_id,
+                "hash_conteudo": documento["hash_conteudo"],
+                "chave_arquivo": _chave_arquivo(documento["hash_conteudo"]),
+                "versao_extrator": VERSAO_EXTRATOR,
+                **await run_in_threadpool(_colunas_texto_armazenado, texto),
+            }
+            for documento, texto in zip(documentos, textos)
+        ]
+
+        async with escrita_serializada():
+            ids = list(
+                await db.scalars(
+                    insert(DocumentoTexto).returning(
+                        DocumentoTexto.id, sort_by_parameter_order=True
+                    ),
+                    linhas,
+                )
+            )
+
+            paginas = [
+                linha
+                for documento_id, documento, texto in zip(ids, documentos, textos)
+                for linha in _linhas_paginas(documento_id, documento["paginas"], texto)
+            ]
+            if paginas:
+                await db.execute(insert(PaginaDocumento), paginas)
+
+            await ServicoBusca.indexar_documentos(
+                db,
+                [
+                    {
+                        "documento_id": documento_id,
+                        "usuario_id": usuario_id,
+                        "nome_arquivo": linha["nome_arquivo"],
+                        "texto": texto,
+                    }
+                    for documento_id, linha, texto in zip(ids, linhas, textos)
+                ],
+            )
+            await ServicoDocumento.registrar_alteracao(db, usuario_id, len(ids))
+            await db.commit()
+
+        return ids
+
+    @staticmethod
+    async def atualizar_documento(
+        db: AsyncSession, documento: DocumentoTexto, dados_atualizacao: dict
+    ) -> DocumentoTexto:
+        """
+        Aplica a atualização parcial de um documento e mantém páginas e busca em dia
+
+        Args:
+            db: Sessão do banco de dados
+            documento: Documento já conferido como sendo do usuario
+            dados_atualizacao: Campos enviados (nome_arquivo e/ou texto_extraido)
+
+        Returns:
+            DocumentoTexto: Documento atualizado, com o texto carregado
+        """
+        dados_atualizacao = dict(dados_atualizacao)
+        texto = dados_atualizacao.pop("texto_extraido", None)
+        if texto is not None:
+            dados_atualizacao.update(
+                await run_in_threadpool(_colunas_texto_armazenado, texto)
+            )
+
+        async with escrita_serializada():
+            if texto is not None:
+                await ServicoBusca.remover_documentos(db, [documento.id])
+
+            # O texto atual vai para o histórico antes de ser substituído
+            if texto is not None:
+                await ServicoDocumento.guardar_versao_texto(db, documento.id, "edicao")
+
+            for campo, valor in dados_atualizacao.items():
+                setattr(documento, campo, valor)
+            # Incremento feito pelo banco, para não perder atualizações concorrentes
+            documento.versao = func.coalesce(DocumentoTexto.versao, 1) + 1
+
+            # Texto editado manualmente passa a ser uma página única e deixa de
+            # corresponder ao PDF original, saindo do cache de extração
+            if texto is not None:
+                documento.hash_conteudo = None
+                documento.versao_extrator = None
+                await ServicoDocumento.gravar_paginas(db, documento.id, [texto], texto)
+                await ServicoBusca.indexar_documento(
+                    db,
+                    documento.id,
+                    documento.usuario_id,
+                    documento.nome_arquivo,
+                    texto,
+                )
+            elif dados_atualizacao.get("nome_arquivo") is not None:
+                await ServicoBusca.renomear_documento(
+                    db,
+                    documento.id,
+                    documento.usuario_id,
+                    documento.nome_arquivo,
+                    (
+                        await _texto_documento(db, documento.id)
+                        if ServicoBusca.renomeacao_usa_texto(db)
+                        else None
+                    ),
+                )
+
+            await ServicoDocumento.registrar_alteracao(db, documento.usuario_id)
+            await db.commit()
+        await cache_respostas.remover(
+            chave_documento(documento.usuario_id, documento.id)
+        )
+
+        # Sessão assíncrona não faz lazy load: o texto adiado é pedido junto
+        await db.refresh(documento, DOCUMENTO_COLUNAS_COM_TEXTO)
+        await _carregar_texto(documento)
+
+        return documento
+
+    @staticmethod
+    async def regravar_texto_extraido(
+        db: AsyncSession,
+        documento_id: int,
+        usuario_id: int,
+        nome_arquivo: str,
+        paginas: List[str],
+        versao: int,
+    ) -> bool:
+        """
+        Troca o texto de um documento pelo de uma nova extração (sem fazer commit)
+
+        O texto anterior vai para o histórico, a versão do documento sobe (o
+        que invalida o ETag e o cache de respostas) e páginas e busca são
+        regravadas. Nada é gravado se o documento mudou depois de lido (uma
+        edição manual no meio da extração, por exemplo).
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+            usuario_id: ID do usuario dono do documento
+            nome_arquivo: Nome do arquivo, para o índice de busca
+            paginas: Texto de cada página da nova extração
+            versao: Versão do documento quando ele foi lido para a extração
+
+        Returns:
+            bool: Se o texto foi regravado
+        """
+        texto = ServicoDocumento.juntar_paginas(paginas)
+        colunas = await run_in_threadpool(_colunas_texto_armazenado, texto)
+
+        # Confere e trava a linha antes de mexer no histórico e na busca:
+        # edições manuais tiram o hash_conteudo e toda alteração sobe a versão
+        reservado = await db.execute(
+            update(DocumentoTexto)
+            .where(
+                DocumentoTexto.id == documento_id,
+                DocumentoTexto.hash_conteudo.is_not(None),
+                func.coalesce(DocumentoTexto.versao, 1) == versao,
+            )
+            .values(versao_extrator=VERSAO_EXTRATOR),
+            execution_options={"synchronize_session": False},
+        )
+        if reservado.rowcount == 0:
+            return False
+
+        await ServicoBusca.remover_documentos(db, [documento_id])
+        await ServicoDocumento.guardar_versao_texto(db, documento_id, "reextracao")
+        await db.execute(
+            update(DocumentoTexto)
+            .where(DocumentoTexto.id == documento_id)
+            .values(versao=versao + 1, **colunas)
+        )
+        await ServicoDocumento.gravar_paginas(db, documento_id, paginas, texto)
+        await ServicoBusca.indexar_documento(
+            db, documento_id, usuario_id, nome_arquivo, texto
+        )
+        await ServicoDocumento.registrar_alteracao(db, usuario_id)
+        return True
+
+    @staticmethod
+    async def guardar_versao_texto(
+        db: AsyncSession, documento_id: int, motivo: str
+    ) -> None:
+        """
+        Guarda o texto atual do documento no histórico (sem fazer commit)
+
+        Deve ser chamado antes de o texto novo ser gravado. Só as
+        MAXIMO_VERSOES_TEXTO versões mais recentes de cada documento ficam.
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+            motivo: O que está substituindo o texto ("edicao" ou "reextracao")
+        """
+        if not MAXIMO_VERSOES_TEXTO:
+            return
+
+        # Trava a linha (no Postgres) para duas edições não guardarem a mesma versão
+        atual = (
+            await db.execute(
+                select(
+                    func.coalesce(DocumentoTexto.versao, 1).label("versao"),
+                    DocumentoTexto.texto_extraido,
+                    DocumentoTexto.texto_compactado,
+                    DocumentoTexto.codec_texto,
+                    DocumentoTexto.chave_texto,
+                    DocumentoTexto.hash_conteudo,
+                    DocumentoTexto.versao_extrator,
+                )
+                .where(DocumentoTexto.id == documento_id)
+                .with_for_update()
+            )
+        ).first()
+        if atual is None:
+            return
+
+        colunas = await run_in_threadpool(
+            _colunas_texto_versao,
+            {
+                "texto_extraido": atual.texto_extraido,
+                "texto_compactado": atual.texto_compactado,
+                "codec_texto": atual.codec_texto,
+                "chave_texto": atual.chave_texto,
+            },
+        )
+        await db.execute(
+            insert(VersaoTextoDocumento).values(
+                documento_id=documento_id,
+                versao=atual.versao,
+                motivo=motivo,
+                hash_conteudo=atual.hash_conteudo,
+                versao_extrator=atual.versao_extrator,
+                **colunas,
+            )
+        )
+
+        antigas = (
+            select(VersaoTextoDocumento.versao)
+            .where(VersaoTextoDocumento.documento_id == documento_id)
+            .order_by(VersaoTextoDocumento.versao.desc())
+            .offset(MAXIMO_VERSOES_TEXTO)
+        )
+        await db.execute(
+            delete(VersaoTextoDocumento).where(
+                VersaoTextoDocumento.documento_id == documento_id,
+                VersaoTextoDocumento.versao.in_(antigas),
+            )
+        )
+
+    @staticmethod
+    async def obter_historico_texto(
+        db: AsyncSession, id_documento: int, usuario_id: int
+    ) -> dict:
+        """
+        Lista as versões anteriores do texto de um documento, sem os textos
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario dono do documento
+
+        Returns:
+            dict: Versão atual do documento e as anteriores, da mais recente
+                para a mais antiga
+
+        Raises:
+            HTTPException: Se o documento não existir para o usuario
+        """
+        versao_atual = await db.scalar(
+            select(func.coalesce(DocumentoTexto.versao, 1)).where(
+                DocumentoTexto.id == id_documento,
+                DocumentoTexto.usuario_id == usuario_id,
+            )
+        )
+        if versao_atual is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
+            )
+
+        versoes = await db.execute(
+            select(
+                VersaoTextoDocumento.versao,
+                VersaoTextoDocumento.motivo,
+                VersaoTextoDocumento.versao_extrator,
+                VersaoTextoDocumento.data_substituicao,
+            )
+            .where(VersaoTextoDocumento.documento_id == id_documento)
+            .order_by(VersaoTextoDocumento.versao.desc())
+        )
+        return {
+            "documento_id": id_documento,
+            "versao_atual": versao_atual,
+            "versoes": [dict(versao._mapping) for versao in versoes],
+        }
+
+    @staticmethod
+    async def obter_versao_texto(
+        db: AsyncSession, id_documento: int, usuario_id: int, versao: int
+    ) -> dict:
+        """
+        Consulta o texto de uma versão anterior do documento
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario dono do documento
+            versao: Versão do documento em que o texto era o atual
+
+        Returns:
+            dict: Dados da versão com o texto
+
+        Raises:
+            HTTPException: Se o documento ou a versão não existirem
+        """
+        await ServicoDocumento.verificar_dono_documento(db, id_documento, usuario_id)
+
+        linha = (
+            await db.execute(
+                select(
+                    VersaoTextoDocumento.versao,
+                    VersaoTextoDocumento.motivo,
+                    VersaoTextoDocumento.versao_extrator,
+                    VersaoTextoDocumento.data_substituicao,
+                    VersaoTextoDocumento.texto_extraido,
+                    VersaoTextoDocumento.texto_compactado,
+                    VersaoTextoDocumento.codec_texto,
+                    VersaoTextoDocumento.chave_texto,
+                ).where(
+                    VersaoTextoDocumento.documento_id == id_documento,
+                    VersaoTextoDocumento.versao == versao,
+                )
+            )
+        ).first()
+        if linha is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Versao do texto nao encontrada",
+            )
+
+        texto = await run_in_threadpool(
+            texto_das_colunas,
+            linha.texto_extraido,
+            linha.codec_texto,
+            await _dados_texto(linha.chave_texto, linha.texto_compactado),
+        )
+        return {
+            "documento_id": id_documento,
+            "versao": linha.versao,
+            "motivo": linha.motivo,
+            "versao_extrator": linha.versao_extrator,
+            "data_substituicao": linha.data_substituicao,
+            "texto_extraido": texto,
+        }
+
+    @staticmethod
+    async def gravar_paginas(
+        db: AsyncSession, documento_id: int, paginas: List[str], texto: str
+    ) -> None:
+        """
+        Substitui as páginas de um documento (sem fazer commit)
+
+        As linhas de página guardam só a posição de cada página no texto do
+        documento, que é a única cópia gravada.
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+            paginas: Texto de cada página, na ordem
+            texto: Texto do documento, formado pelas páginas
+        """
+        await ServicoDocumento.excluir_paginas(db, documento_id)
+
+        if paginas:
+            await db.execute(
+                insert(PaginaDocumento),
+                _linhas_paginas(documento_id, paginas, texto),
+            )
+
+    @staticmethod
+    async def ler_paginas(db: AsyncSession, documento_id: int) -> List[str]:
+        """
+        Texto de cada página gravada do documento, recortado do texto dele
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+
+        Returns:
+            List[str]: Texto de cada página, na ordem (vazia se não houver páginas)
+        """
+        return [texto for _, texto in await _ler_paginas(db, documento_id, 1)]
+
+    @staticmethod
+    async def excluir_paginas(db: AsyncSession, documento_id: int) -> None:
+        """
+        Apaga o texto por página de um documento (sem fazer commit)
+
+        Args:
+            db: Sessão do banco de dados
+            documento_id: ID do documento
+        """
+        await db.execute(
+            delete(PaginaDocumento).where(PaginaDocumento.documento_id == documento_id)
+        )
+
+    @staticmethod
+    async def verificar_dono_documento(
+        db: AsyncSession, id_documento: int, usuario_id: int
+    ) -> None:
+        """
+        Garante que o documento existe e pertence ao usuario, sem carregar o texto
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario
+
+        Raises:
+            HTTPException: Se o documento não existir para o usuario
+        """
+        existe = await db.scalar(
+            select(DocumentoTexto.id).where(
+                DocumentoTexto.id == id_documento,
+                DocumentoTexto.usuario_id == usuario_id,
+            )
+        )
+
+        if not existe:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
+            )
+
+    @staticmethod
+    async def obter_documento(
+        db: AsyncSession,
+        id_documento: int,
+        usuario_id: int,
+        com_texto: bool = False,
+        descompactar: bool = True,
+    ) -> DocumentoTexto:
+        """
+        Consulta um documento do usuario
+
+        O texto completo só é carregado na mesma consulta quando com_texto for
+        verdadeiro, já descompactado; do contrário precisa ser pedido depois
+        com db.refresh.
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario dono do documento
+            com_texto: Se deve trazer o texto extraído junto
+            descompactar: Se falso, as colunas de texto vêm como estão gravadas
+
+        Returns:
+            DocumentoTexto: Documento encontrado
+
+        Raises:
+            HTTPException: Se o documento não existir para o usuario
+        """
+        consulta = select(DocumentoTexto).where(
+            DocumentoTexto.id == id_documento,
+            DocumentoTexto.usuario_id == usuario_id,
+        )
+        if com_texto:
+            consulta = consulta.options(
+                undefer(DocumentoTexto.texto_extraido),
+                undefer(DocumentoTexto.texto_compactado),
+            )
+
+        documento = await db.scalar(consulta)
+
+        if not documento:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
+            )
+
+        if com_texto and descompactar:
+            await _carregar_texto(documento)
+
+        return documento
+
+    @staticmethod
+    async def obter_texto_em_blocos(
+        db: AsyncSession, documento: DocumentoTexto
+    ) -> Iterator[str]:
+        """
+        Carrega o texto de um documento já consultado e prepara o envio em blocos
+
+        Separado de obter_documento para que a resposta condicional (304) seja
+        decidida antes de o texto ser lido do banco. O texto compactado é
+        descompactado aos poucos, enquanto os blocos são consumidos; o gerador
+        não usa a sessão, então pode ser consumido depois que ela for fechada
+        (ex.: em uma StreamingResponse).
+
+        Args:
+            db: Sessão do banco de dados
+            documento: Documento já conferido como sendo do usuario
+
+        Returns:
+            Iterator[str]: Blocos do texto
+        """
+        await db.refresh(documento, ["texto_extraido", "texto_compactado"])
+        return iterar_texto_das_colunas(
+            documento.texto_extraido,
+            documento.codec_texto,
+            await _dados_texto(documento.chave_texto, documento.texto_compactado),
+            TAMANHO_BLOCO_TEXTO,
+        )
+
+    @staticmethod
+    async def registrar_alteracao(
+        db: AsyncSession, usuario_id: int, variacao_total: int = 0
+    ) -> None:
+        """
+        Incrementa o contador de alterações dos documentos do usuario (sem fazer commit)
+
+        Chamado na mesma transação de todo upload, atualização e exclusão,
+        depois da alteração; é o que invalida o ETag e as páginas em cache da
+        listagem. Também mantém o total de documentos do usuario, contado uma
+        vez só (na primeira alteração, ou em registros de antes da coluna).
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            variacao_total: Documentos criados (positivo) ou excluídos (negativo)
+        """
+        insert_dialeto = (
+            insert_postgres if db.bind.dialect.name == "postgresql" else insert_sqlite
+        )
+        contagem = (
+            select(func.count(DocumentoTexto.id))
+            .where(DocumentoTexto.usuario_id == usuario_id)
+            .scalar_subquery()
+        )
+        consulta = insert_dialeto(VersaoDocumentos).values(
+            usuario_id=usuario_id,
+            versao=1,
+            total=contagem,
+            data_alteracao=func.now(),
+        )
+        await db.execute(
+            consulta.on_conflict_do_update(
+                index_elements=[VersaoDocumentos.usuario_id],
+                set_={
+                    "versao": VersaoDocumentos.versao + 1,
+                    "total": func.coalesce(
+                        VersaoDocumentos.total + variacao_total, contagem
+                    ),
+                    "data_alteracao": func.now(),
+                },
+            )
+        )
+
+    @staticmethod
+    async def obter_versao_documentos(
+        db: AsyncSession, usuario_id: int
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        Consulta o contador de alterações dos documentos do usuario
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario
+
+        Returns:
+            Tuple[int, Optional[datetime]]: (versão, data da última alteração);
+            (0, None) se o usuario nunca alterou documentos
+        """
+        linha = (
+            await db.execute(
+                select(VersaoDocumentos.versao, VersaoDocumentos.data_alteracao).where(
+                    VersaoDocumentos.usuario_id == usuario_id
+                )
+            )
+        ).first()
+        if linha is None:
+            return 0, None
+        return linha.versao, linha.data_alteracao
+
+    @staticmethod
+    async def excluir_documentos(
+        db: AsyncSession, usuario_id: int, ids: List[int]
+    ) -> List[int]:
+        """
+        Apaga documentos do usuario com DELETEs em lote, sem carregar as linhas
+
+        Páginas, versões anteriores do texto e entradas do índice de busca
+        saem na mesma transação.
+        IDs que não existem ou são de outro usuario são ignorados.
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            ids: IDs dos documentos
+
+        Returns:
+            List[int]: IDs efetivamente apagados
+        """
+        if not ids:
+            return []
+
+        # Só os IDs do usuario, lidos pelo índice (usuario_id, id)
+        excluidos = list(
+            await db.scalars(
+                select(DocumentoTexto.id).where(
+                    DocumentoTexto.usuario_id == usuario_id,
+                    DocumentoTexto.id.in_(set(ids)),
+                )
+            )
+        )
+
+        if excluidos:
+            async with escrita_serializada():
+                await db.execute(
+                    delete(PaginaDocumento).where(
+                        PaginaDocumento.documento_id.in_(excluidos)
+                    ),
+                    execution_options={"synchronize_session": False},
+                )
+                for inicio in range(0, len(excluidos), LOTE_REMOCAO_BUSCA):
+                    await ServicoBusca.remover_documentos(
+                        db, excluidos[inicio : inicio + LOTE_REMOCAO_BUSCA]
+                    )
+                await db.execute(
+                    delete(VersaoTextoDocumento).where(
+                        VersaoTextoDocumento.documento_id.in_(excluidos)
+                    ),
+                    execution_options={"synchronize_session": False},
+                )
+                removidos = await db.execute(
+                    delete(DocumentoTexto).where(DocumentoTexto.id.in_(excluidos)),
+                    execution_options={"synchronize_session": False},
+                )
+                await ServicoDocumento.registrar_alteracao(
+                    db, usuario_id, -removidos.rowcount
+                )
+                await db.commit()
+            await cache_respostas.remover(
+                *(
+                    chave_documento(usuario_id, id_documento)
+                    for id_documento in excluidos
+                )
+            )
+
+        return excluidos
+
+    @staticmethod
+    async def obter_paginas(
+        db: AsyncSession, id_documento: int, usuario_id: int, inicio: int, fim: int
+    ) -> dict:
+        """
+        Consulta o texto de um intervalo de páginas do documento
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario dono do documento
+            inicio: Primeira página (começando em 1)
+            fim: Última página, inclusive
+
+        Returns:
+            dict: Total de páginas e o texto das páginas do intervalo
+
+        Raises:
+            HTTPException: Se o documento não existir ou o intervalo for inválido
+        """
+        if inicio < 1 or fim < inicio:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Intervalo de paginas invalido",
+            )
+
+        await ServicoDocumento.verificar_dono_documento(db, id_documento, usuario_id)
+
+        # Limita o tamanho do intervalo para a resposta não crescer sem controle
+        fim = min(fim, inicio + MAXIMO_PAGINAS_POR_CONSULTA - 1)
+
+        total_paginas, paginas = await _textos_paginas(db, id_documento, inicio, fim)
+
+        return {
+            "documento_id": id_documento,
+            "total_paginas": total_paginas,
+            "paginas": [
+                {"numero_pagina": numero, "texto": texto} for numero, texto in paginas
+            ],
+        }
+
+    @staticmethod
+    async def buscar_documentos(
+        db: AsyncSession, usuario_id: int, consulta: str, limite: int
+    ) -> List[dict]:
+        """
+        Busca nos documentos do usuario e monta o trecho de cada resultado
+
+        O índice de busca não guarda o texto; o trecho sai das primeiras
+        MAXIMO_PAGINAS_TRECHO páginas de cada documento encontrado, lidas de
+        todos os resultados de uma vez.
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            consulta: Termos digitados pelo usuario
+            limite: Quantidade máxima de resultados
+
+        Returns:
+            List[dict]: id, nome_arquivo, trecho e relevancia de cada documento
+
+        Raises:
+            HTTPException: Se a consulta não tiver nenhum termo
+        """
+        resultados = await ServicoBusca.buscar(db, usuario_id, consulta, limite)
+        if not resultados:
+            return resultados
+
+        paginas = await _paginas_trechos(
+            db, [resultado["id"] for resultado in resultados]
+        )
+        for resultado in resultados:
+            resultado["trecho"] = await run_in_threadpool(
+                gerar_trecho, paginas[resultado["id"]], consulta
+            )
+        return resultados
+
+    @staticmethod
+    async def obter_trecho(
+        db: AsyncSession, id_documento: int, usuario_id: int, inicio: int, tamanho: int
+    ) -> dict:
+        """
+        Consulta um trecho do texto do documento, recortado no próprio banco
+
+        Args:
+            db: Sessão do banco de dados
+            id_documento: ID do documento
+            usuario_id: ID do usuario dono do documento
+            inicio: Posição do primeiro caractere (começando em 0)
+            tamanho: Quantidade de caracteres
+
+        Returns:
+            dict: Tamanho total do texto e o trecho pedido
+
+        Raises:
+            HTTPException: Se o documento não existir ou o intervalo for inválido
+        """
+        if inicio < 0 or tamanho < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Intervalo de texto invalido",
+            )
+
+        tamanho = min(tamanho, MAXIMO_CARACTERES_POR_TRECHO)
+
+        # Texto puro é recortado no banco; o compactado (texto_extraido vazio)
+        # vem inteiro e é recortado depois de descompactar
+        trecho = (
+            await db.execute(
+                select(
+                    func.length(DocumentoTexto.texto_extraido),
+                    func.substr(DocumentoTexto.texto_extraido, inicio + 1, tamanho),
+                    DocumentoTexto.codec_texto,
+                    DocumentoTexto.texto_compactado,
+                    DocumentoTexto.chave_texto,
+                ).where(
+                    DocumentoTexto.id == id_documento,
+                    DocumentoTexto.usuario_id == usuario_id,
+                )
+            )
+        ).first()
+
+        if not trecho:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Documento nao encontrado"
+            )
+
+        tamanho_total, texto, codec_texto, texto_compactado, chave_texto = trecho
+        if codec_texto is not None:
+            texto_completo = await run_in_threadpool(
+                texto_das_colunas,
+                "",
+                codec_texto,
+                await _dados_texto(chave_texto, texto_compactado),
+            )
+            tamanho_total = len(texto_completo)
+            texto = texto_completo[inicio : inicio + tamanho]
+
+        return {
+            "documento_id": id_documento,
+            "inicio": inicio,
+            "tamanho_total": tamanho_total,
+            "texto": texto or "",
+        }
+
+    @staticmethod
+    async def listar_documentos(
+        db: AsyncSession,
+        usuario_id: int,
+        limite: int,
+        ordem: str = "antigos",
+        cursor: Optional[str] = None,
+        pular: int = 0,
+    ) -> Tuple[List[DocumentoTexto], Optional[str]]:
+        """
+        Lista os documentos do usuario com paginação por cursor (keyset)
+
+        Com cursor, a consulta continua a partir do último item da página
+        anterior pelo índice, então páginas profundas custam o mesmo que a
+        primeira e uploads novos não deslocam os itens entre páginas.
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario dono dos documentos
+            limite: Número máximo de documentos na página
+            ordem: antigos, recentes ou nome
+            cursor: Cursor devolvido pela página anterior
+            pular: Paginação antiga por deslocamento, usada só sem cursor
+
+        Returns:
+            Tuple[List[DocumentoTexto], Optional[str]]: (documentos, cursor da
+                próxima página ou None se não houver mais)
+
+        Raises:
+            HTTPException: Se a ordenação, o limite ou o cursor forem inválidos
+        """
+        if ordem not in ORDENS_LISTAGEM:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ordenação inválida, use uma de: {', '.join(ORDENS_LISTAGEM)}",
+            )
+
+        if limite < 1 or pular < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Parâmetros de paginação inválidos",
+            )
+
+        limite = min(limite, MAXIMO_LIMITE_LISTAGEM)
+
+        # Só as colunas do DocumentoLista; o texto não sai do banco
+        consulta = (
+            select(DocumentoTexto)
+            .options(
+                load_only(
+                    DocumentoTexto.id,
+                    DocumentoTexto.nome_arquivo,
+                    DocumentoTexto.tamanho_arquivo,
+                    DocumentoTexto.data_criacao,
+                )
+            )
+            .where(DocumentoTexto.usuario_id == usuario_id)
+        )
+
+        if ordem == "recentes":
+            consulta = consulta.order_by(DocumentoTexto.id.desc())
+        elif ordem == "nome":
+            consulta = consulta.order_by(DocumentoTexto.nome_arquivo, DocumentoTexto.id)
+        else:
+            consulta = consulta.order_by(DocumentoTexto.id)
+
+        if cursor:
+            posicao = _decodificar_cursor(cursor, ordem)
+            if ordem == "recentes":
+                consulta = consulta.where(DocumentoTexto.id < posicao["id"])
+            elif ordem == "nome":
+                consulta = consulta.where(
+                    tuple_(DocumentoTexto.nome_arquivo, DocumentoTexto.id)
+                    > tuple_(posicao["n"], posicao["id"])
+                )
+            else:
+                consulta = consulta.where(DocumentoTexto.id > posicao["id"])
+        elif pular:
+            consulta = consulta.offset(pular)
+
+        # Um item a mais indica se existe próxima página
+        documentos = list(await db.scalars(consulta.limit(limite + 1)))
+        proximo_cursor = None
+        if len(documentos) > limite:
+            documentos = documentos[:limite]
+            proximo_cursor = _codificar_cursor(ordem, documentos[-1])
+
+        return documentos, proximo_cursor
+
+    @staticmethod
+    async def contar_documentos(db: AsyncSession, usuario_id: int) -> int:
+        """
+        Total de documentos do usuario, guardado em versoes_documentos
+
+        Só conta pelo índice de usuario_id quem ainda não tem o total
+        guardado (nenhuma alteração desde que a coluna foi criada).
+
+        Args:
+            db: Sessão do banco de dados
+            usuario_id: ID do usuario
+
+        Returns:
+            int: Quantidade de documentos
+        """
+        total = await db.scalar(
+            select(VersaoDocumentos.total).where(
+                VersaoDocumentos.usuario_id == usuario_id
+            )
+        )
+        if total is not None:
+            return total
+        return await db.scalar(
+            select(func.count(DocumentoTexto.id)).where(
+                DocumentoTexto.usuario_id == usuario_id
+            )
+        )
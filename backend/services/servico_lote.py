@@ -0,0 +1,302 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO, Dict, List, Optional
+from fastapi import HTTPException, status, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.services.metricas import bytes_processados, medir_etapa
+from backend.services.motor_extracao import motor_extracao
+from backend.services.servico_documento import (
+    MAXIMO_BYTES_PDF,
+    MAXIMO_TAMANHO_PDF_MB,
+    PASTA_TEMPORARIA_UPLOADS,
+    ArquivoGrandeDemais,
+    ArquivoNaoPdf,
+    ServicoDocumento,
+    _copiar_com_hash,
+    _copiar_upload,
+    estatisticas_cache_extracao,
+)
+
+# Limites do upload em lote
+MAXIMO_ARQUIVOS_POR_LOTE = int(os.getenv("MAXIMO_ARQUIVOS_POR_LOTE", "1000"))
+MAXIMO_BYTES_DESCOMPACTADOS_LOTE = int(
+    os.getenv("MAXIMO_BYTES_DESCOMPACTADOS_LOTE", str(1024 * 1024 * 1024))
+)
+# Tamanho máximo da requisição inteira (todos os PDFs e ZIPs enviados)
+MAXIMO_TAMANHO_LOTE_MB = int(os.getenv("MAXIMO_TAMANHO_LOTE_MB", "1024"))
+# Texto extraído de todos os PDFs do lote, que fica na memória até a gravação
+MAXIMO_CARACTERES_LOTE = int(os.getenv("MAXIMO_CARACTERES_LOTE", "100000000"))
+
+
+def _eh_zip(arquivo: UploadFile) -> bool:
+    return bool(arquivo.filename) and arquivo.filename.lower().endswith(".zip")
+
+
+def _item(nome_arquivo: str, erro: Optional[str] = None) -> dict:
+    return {
+        "nome_arquivo": nome_arquivo,
+        "caminho": None,
+        "tamanho_arquivo": 0,
+        "hash_conteudo": None,
+        "paginas": None,
+        "documento_id": None,
+        "erro": erro,
+    }
+
+
+def _extrair_zip(
+    arquivo_zip: BinaryIO, nome_zip: str, pasta: str, vagas: int
+) -> List[dict]:
+    """
+    Copia para a pasta os PDFs de um ZIP, um por vez e sem carregar na memória
+
+    Para em vagas arquivos e em MAXIMO_BYTES_DESCOMPACTADOS_LOTE bytes
+    descompactados, o que protege contra ZIPs que explodem ao descompactar.
+    """
+    itens: List[dict] = []
+    bytes_descompactados = 0
+
+    try:
+        pacote = zipfile.ZipFile(arquivo_zip)
+    except zipfile.BadZipFile:
+        return [_item(nome_zip, "Arquivo ZIP inválido")]
+
+    with pacote:
+        for info in pacote.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+
+            nome_arquivo = os.path.basename(info.filename)[:255]
+            if len(itens) >= vagas:
+                itens.append(_item(nome_arquivo, "Limite de arquivos do lote atingido"))
+                continue
+
+            if not nome_arquivo.lower().endswith(".pdf"):
+                itens.append(_item(nome_arquivo, "Apenas arquivos PDF são aceitos"))
+                continue
+
+            if info.file_size > MAXIMO_BYTES_PDF:
+                itens.append(
+                    _item(
+                        nome_arquivo,
+                        f"O PDF passa do limite de {MAXIMO_TAMANHO_PDF_MB} MB",
+                    )
+                )
+                continue
+
+            bytes_descompactados += info.file_size
+            if bytes_descompactados > MAXIMO_BYTES_DESCOMPACTADOS_LOTE:
+                itens.append(
+                    _item(
+                        nome_arquivo, "Limite de tamanho descompactado do lote atingido"
+                    )
+                )
+                continue
+
+            item = _item(nome_arquivo)
+            descritor, item["caminho"] = tempfile.mkstemp(suffix=".pdf", dir=pasta)
+            os.close(descritor)
+            try:
+                with pacote.open(info) as origem:
+                    item["tamanho_arquivo"], item["hash_conteudo"] = _copiar_com_hash(
+                        origem, item["caminho"]
+                    )
+            except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as erro:
+                # Entrada corrompida, protegida por senha ou com compressão
+                # não suportada
+                item["erro"] = f"Não foi possível descompactar: {erro}"
+            except (ArquivoNaoPdf, ArquivoGrandeDemais) as erro:
+                item["erro"] = str(erro)
+            itens.append(item)
+
+    return itens
+
+
+class ServicoLote:
+    """Classe para o upload de vários PDFs em uma única requisição"""
+
+    @staticmethod
+    async def receber_arquivos(arquivos: List[UploadFile], pasta: str) -> List[dict]:
+        """
+        Guarda em disco cada PDF enviado e os PDFs de dentro de cada ZIP
+
+        Args:
+            arquivos: Arquivos enviados (PDFs e/ou ZIPs)
+            pasta: Pasta temporária do lote
+
+        Returns:
+            List[dict]: Um item por PDF, já com o erro preenchido se o arquivo
+                não puder entrar no lote
+        """
+        itens: List[dict] = []
+
+        for arquivo in arquivos:
+            vagas = MAXIMO_ARQUIVOS_POR_LOTE - len(itens)
+
+            if _eh_zip(arquivo):
+                arquivo.file.seek(0)
+                itens.extend(
+                    await run_in_threadpool(
+                        _extrair_zip, arquivo.file, arquivo.filename, pasta, vagas
+                    )
+                )
+            elif vagas <= 0:
+                itens.append(
+                    _item(arquivo.filename or "", "Limite de arquivos do lote atingido")
+                )
+            elif not ServicoDocumento.validar_arquivo_pdf(arquivo):
+                itens.append(
+                    _item(arquivo.filename or "", "Apenas arquivos PDF são aceitos")
+                )
+            else:
+                item = _item(arquivo.filename or "")
+                descritor, item["caminho"] = tempfile.mkstemp(suffix=".pdf", dir=pasta)
+                os.close(descritor)
+                try:
+                    with medir_etapa("leitura"):
+                        item["tamanho_arquivo"], item["hash_conteudo"] = (
+                            await run_in_threadpool(
+                                _copiar_upload, arquivo, item["caminho"]
+                            )
+                        )
+                except (ArquivoNaoPdf, ArquivoGrandeDemais) as erro:
+                    item["erro"] = str(erro)
+                itens.append(item)
+
+        bytes_processados.incrementar(
+            valor=sum(item["tamanho_arquivo"] for item in itens)
+        )
+        return itens
+
+    @staticmethod
+    async def extrair_paginas(db: AsyncSession, itens: List[dict]) -> None:
+        """
+        Preenche as páginas de cada item, extraindo em paralelo os PDFs novos
+
+        PDFs repetidos (no lote ou já enviados antes) são extraídos no máximo
+        uma vez. Falhas ficam no campo erro do item, sem interromper os demais.
+        O texto de todos os itens fica na memória até a gravação, então os
+        que passariam de MAXIMO_CARACTERES_LOTE ficam com erro (e os PDFs
+        restantes nem são extraídos depois que o limite é atingido).
+
+        Args:
+            db: Sessão do banco de dados
+            itens: Itens devolvidos por receber_arquivos
+        """
+        por_hash: Dict[str, List[dict]] = {}
+        for item in itens:
+            if item["erro"] is None:
+                por_hash.setdefault(item["hash_conteudo"], []).append(item)
+
+        caracteres = 0
+
+        def aceitar(iguais: List[dict], paginas: List[str]) -> None:
+            nonlocal caracteres
+            # Cada item do lote vira um documento com a própria cópia do texto
+            tamanho = sum(len(pagina) for pagina in paginas) * len(iguais)
+            if caracteres + tamanho > MAXIMO_CARACTERES_LOTE:
+                for item in iguais:
+                    item["erro"] = "Limite de texto extraído do lote atingido"
+                return
+            caracteres += tamanho
+            for item in iguais:
+                item["paginas"] = paginas
+
+        # Consultas ao banco são sequenciais: a sessão não aceita uso concorrente
+        a_extrair = []
+        for hash_conteudo, iguais in por_hash.items():
+            paginas = await ServicoDocumento.buscar_paginas_por_hash(db, hash_conteudo)
+            estatisticas_cache_extracao.registrar(paginas is not None)
+            if paginas is None:
+                a_extrair.append(iguais)
+            else:
+                aceitar(iguais, paginas)
+
+        # Não passa do número de processos para não tomar o 429 do próprio motor
+        limite = asyncio.Semaphore(motor_extracao.processos)
+
+        async def extrair(iguais: List[dict]) -> None:
+            async with limite:
+                if caracteres >= MAXIMO_CARACTERES_LOTE:
+                    for item in iguais:
+                        item["erro"] = "Limite de texto extraído do lote atingido"
+                    return
+                try:
+                    paginas = await ServicoDocumento.processar_arquivo_pdf(
+                        iguais[0]["caminho"]
+                    )
+                except HTTPException as erro:
+                    for item in iguais:
+                        item["erro"] = str(erro.detail)
+                    return
+
+            aceitar(iguais, paginas)
+
+        await asyncio.gather(*(extrair(iguais) for iguais in a_extrair))
+
+    @staticmethod
+    async def processar_lote(
+        db: AsyncSession, arquivos: List[UploadFile], usuario_id: int
+    ) -> dict:
+        """
+        Extrai o texto de vários PDFs e grava todos em uma única transação
+
+        Args:
+            db: Sessão do banco de dados
+            arquivos: PDFs e/ou ZIPs com PDFs
+            usuario_id: ID do usuario dono dos documentos
+
+        Returns:
+            dict: Totais e o resultado de cada arquivo, na ordem de envio
+
+        Raises:
+            HTTPException: Se o lote tiver arquivos demais
+        """
+        if len(arquivos) > MAXIMO_ARQUIVOS_POR_LOTE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"No máximo {MAXIMO_ARQUIVOS_POR_LOTE} arquivos por lote",
+            )
+
+        pasta = tempfile.mkdtemp(dir=PASTA_TEMPORARIA_UPLOADS)
+        try:
+            itens = await ServicoLote.receber_arquivos(arquivos, pasta)
+            await ServicoLote.extrair_paginas(db, itens)
+            # Um PDF repetido no lote é guardado uma vez só
+            guardar = {
+                item["hash_conteudo"]: item["caminho"]
+                for item in itens
+                if item["erro"] is None
+            }
+            for hash_conteudo, caminho in guardar.items():
+                await ServicoDocumento.guardar_pdf(caminho, hash_conteudo)
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+        extraidos = [item for item in itens if item["erro"] is None]
+        with medir_etapa("gravacao"):
+            ids = await ServicoDocumento.criar_documentos_em_lote(
+                db, usuario_id, extraidos
+            )
+        for item, documento_id in zip(extraidos, ids):
+            item["documento_id"] = documento_id
+
+        return {
+            "total": len(itens),
+            "sucesso": len(extraidos),
+            "falhas": len(itens) - len(extraidos),
+            "arquivos": [
+                {
+                    "nome_arquivo": item["nome_arquivo"],
+                    "sucesso": item["erro"] is None,
+                    "documento_id": item["documento_id"],
+                    "tamanho_arquivo": item["tamanho_arquivo"],
+                    "erro": item["erro"],
+                }
+                for item in itens
+            ],
+        }
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+from typing import List, Tuple
+from fastapi import HTTPException, status
+from backend.services.metricas import medir_etapa, paginas_ocr
+from backend.services.motor_extracao import MotorExtracao
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+    from pdf2image.exceptions import PDFPopplerTimeoutError
+except ImportError:  # OCR é opcional: pip install pytesseract pdf2image
+    pytesseract = None
+    convert_from_path = None
+    PDFPopplerTimeoutError = TimeoutError
+
+# OCR das páginas sem camada de texto (PDFs escaneados); requer os binários
+# tesseract (com o idioma instalado) e pdftoppm (poppler) no servidor
+OCR_ATIVO = os.getenv("OCR_ATIVO", "false").lower() == "true"
+IDIOMA_OCR = os.getenv("IDIOMA_OCR", "por")
+DPI_OCR = int(os.getenv("DPI_OCR", "300"))
+MAXIMO_PAGINAS_OCR = int(os.getenv("MAXIMO_PAGINAS_OCR", "200"))
+
+# Pool próprio, separado do PyPDF2: páginas de texto não esperam atrás do OCR
+PROCESSOS_OCR = int(os.getenv("PROCESSOS_OCR", str(max(1, (os.cpu_count() or 1) // 2))))
+TIMEOUT_OCR_PAGINA_SEGUNDOS = float(os.getenv("TIMEOUT_OCR_PAGINA_SEGUNDOS", "60"))
+MAXIMO_OCR_PENDENTES = int(os.getenv("MAXIMO_OCR_PENDENTES", "64"))
+if OCR_ATIVO and pytesseract is None:
+    raise ValueError("OCR_ATIVO=true requer os pacotes pytesseract e pdf2image")
+
+# Resultado (na métrica) das páginas que o motor de OCR recusou
+RESULTADOS_OCR_RECUSADO = {
+    status.HTTP_429_TOO_MANY_REQUESTS: "ocupado",
+    status.HTTP_504_GATEWAY_TIMEOUT: "tempo_esgotado",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _ocr_pagina(
+    caminho_pdf: str,
+    numero_pagina: int,
+    idioma: str,
+    dpi: int,
+    timeout_segundos: float,
+) -> Tuple[str, bool]:
+    """
+    Rasteriza uma página do PDF e reconhece o texto com o Tesseract
+
+    Fica no nível do módulo para rodar nos processos do motor de OCR. A
+    renderização e o Tesseract recebem o tempo limite e são encerrados ao
+    estourar, liberando o processo para a próxima página.
+
+    Returns:
+        Tuple[str, bool]: (texto reconhecido, se o tempo limite estourou)
+    """
+    try:
+        imagens = convert_from_path(
+            caminho_pdf,
+            dpi=dpi,
+            first_page=numero_pagina,
+            last_page=numero_pagina,
+            timeout=timeout_segundos,
+        )
+    except PDFPopplerTimeoutError:
+        return "", True
+
+    try:
+        texto = pytesseract.image_to_string(
+            imagens[0], lang=idioma, timeout=timeout_segundos
+        )
+    except RuntimeError as erro:
+        # O pytesseract sinaliza o tempo esgotado com RuntimeError
+        if "timeout" in str(erro).lower():
+            return "", True
+        raise
+    finally:
+        for imagem in imagens:
+            imagem.close()
+
+    return texto.strip(), False
+
+
+motor_ocr = MotorExtracao(
+    PROCESSOS_OCR, 2 * TIMEOUT_OCR_PAGINA_SEGUNDOS, MAXIMO_OCR_PENDENTES
+)
+
+
+class ServicoOcr:
+    """Classe para o OCR das páginas de PDF que não têm camada de texto"""
+
+    @staticmethod
+    async def completar_paginas(caminho_pdf: str, paginas: List[str]) -> List[str]:
+        """
+        Preenche com OCR as páginas que vieram sem texto do PyPDF2
+
+        As páginas com texto não passam pelo OCR. Cada página escaneada é
+        rasterizada e reconhecida em um processo do motor de OCR, no máximo
+        PROCESSOS_OCR páginas por documento ao mesmo tempo; a que estourar o
+        tempo limite, falhar ou não achar vaga no motor fica sem texto.
+
+        Args:
+            caminho_pdf: Caminho do PDF em disco
+            paginas: Texto de cada página extraído pelo PyPDF2
+
+        Returns:
+            List[str]: Texto de cada página, com as escaneadas preenchidas
+        """
+        sem_texto = [
+            indice for indice, texto in enumerate(paginas) if not texto.strip()
+        ]
+        if not OCR_ATIVO or not sem_texto:
+            return paginas
+
+        if len(sem_texto) > MAXIMO_PAGINAS_OCR:
+            logger.warning(
+                "%s tem %d páginas sem texto; só as primeiras %d passam pelo OCR",
+                caminho_pdf,
+                len(sem_texto),
+                MAXIMO_PAGINAS_OCR,
+            )
+            sem_texto = sem_texto[:MAXIMO_PAGINAS_OCR]
+
+        # Não passa do número de processos para não tomar o 429 do próprio motor
+        limite = asyncio.Semaphore(motor_ocr.processos)
+        paginas = list(paginas)
+
+        async def reconhecer(indice: int) -> None:
+            async with limite:
+                try:
+                    texto, tempo_esgotado = await motor_ocr.executar(
+                        _ocr_pagina,
+                        caminho_pdf,
+                        indice + 1,
+                        IDIOMA_OCR,
+                        DPI_OCR,
+                        TIMEOUT_OCR_PAGINA_SEGUNDOS,
+                    )
+                except HTTPException as erro:
+                    # Motor ocupado com outros uploads (429), tempo limite
+                    # (504) ou pool quebrado (503): a página fica sem texto,
+                    # como nas demais falhas, e o resto do documento segue
+                    logger.warning(
+                        "OCR da página %d de %s não rodou: %s",
+                        indice + 1,
+                        caminho_pdf,
+                        erro.detail,
+                    )
+                    paginas_ocr.incrementar(
+                        RESULTADOS_OCR_RECUSADO.get(erro.status_code, "erro")
+                    )
+                    return
+                except Exception:
+                    logger.exception(
+                        "Erro no OCR da página %d de %s", indice + 1, caminho_pdf
+                    )
+                    paginas_ocr.incrementar("erro")
+                    return
+
+            if tempo_esgotado:
+                paginas_ocr.incrementar("tempo_esgotado")
+            else:
+                paginas_ocr.incrementar("reconhecida" if texto else "vazia")
+            paginas[indice] = texto
+
+        with medir_etapa("ocr"):
+            await asyncio.gather(*(reconhecer(indice) for indice in sem_texto))
+
+        return paginas
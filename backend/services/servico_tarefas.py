@@ -0,0 +1,404 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import HTTPException, status, UploadFile
+from sqlalchemy import or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import escrita_serializada, sessaolocal_assincrona
+from backend.models import TarefaExtracao
+from backend.services.motor_extracao import PROCESSOS_EXTRACAO
+from backend.services.servico_documento import ServicoDocumento
+
+# Configurações da fila de extração assíncrona
+PASTA_UPLOADS_PENDENTES = os.getenv("PASTA_UPLOADS_PENDENTES", "./uploads_pendentes")
+TRABALHADORES_FILA = int(os.getenv("TRABALHADORES_FILA", str(PROCESSOS_EXTRACAO)))
+MAXIMO_TAREFAS_NA_FILA = int(os.getenv("MAXIMO_TAREFAS_NA_FILA", "1000"))
+SEGUNDOS_ESPERA_MOTOR_OCUPADO = 1.0
+# O worker renova a reserva da tarefa que está processando; se ele morrer
+# (timeout do gunicorn, falta de memória), a reserva vence e a tarefa volta
+# para a fila na próxima verificação de algum worker
+DURACAO_RESERVA_TAREFA_SEGUNDOS = float(
+    os.getenv("DURACAO_RESERVA_TAREFA_SEGUNDOS", "300")
+)
+INTERVALO_VERIFICACAO_RESERVAS_SEGUNDOS = float(
+    os.getenv("INTERVALO_VERIFICACAO_RESERVAS_SEGUNDOS", "60")
+)
+
+# Estados possíveis de uma tarefa
+ESTADO_PENDENTE = "pendente"
+ESTADO_PROCESSANDO = "processando"
+ESTADO_CONCLUIDA = "concluida"
+ESTADO_FALHOU = "falhou"
+
+logger = logging.getLogger(__name__)
+
+
+def recuperar_tarefas_interrompidas(engine: Engine) -> int:
+    """
+    Devolve à fila as tarefas que estavam em processamento quando a API caiu
+
+    Roda uma vez por subida da API, antes de qualquer processo atender
+    (backend.inicializacao.preparar_banco), sem esperar as reservas vencerem.
+    Um worker que morre com a API no ar é coberto por
+    recuperar_reservas_vencidas.
+
+    Returns:
+        int: Quantidade de tarefas recuperadas
+    """
+    with engine.begin() as conexao:
+        resultado = conexao.execute(
+            update(TarefaExtracao)
+            .where(TarefaExtracao.estado == ESTADO_PROCESSANDO)
+            .values(estado=ESTADO_PENDENTE, reservada_em=None)
+        )
+    return resultado.rowcount
+
+
+async def recuperar_reservas_vencidas(db: AsyncSession) -> List[str]:
+    """
+    Devolve à fila as tarefas em processamento cuja reserva não foi renovada
+
+    Returns:
+        List[str]: IDs das tarefas que voltaram a ficar pendentes
+    """
+    limite = _agora() - timedelta(seconds=DURACAO_RESERVA_TAREFA_SEGUNDOS)
+    async with escrita_serializada():
+        recuperadas = (
+            (
+                await db.execute(
+                    update(TarefaExtracao)
+                    .where(
+                        TarefaExtracao.estado == ESTADO_PROCESSANDO,
+                        or_(
+                            TarefaExtracao.reservada_em.is_(None),
+                            TarefaExtracao.reservada_em < limite,
+                        ),
+                    )
+                    .values(estado=ESTADO_PENDENTE, reservada_em=None)
+                    .returning(TarefaExtracao.id),
+                    execution_options={"synchronize_session": False},
+                )
+            )
+            .scalars()
+            .all()
+        )
+        await db.commit()
+    return list(recuperadas)
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class FilaExtracao:
+    """Fila em processo, persistida na tabela de tarefas, com trabalhadores asyncio"""
+
+    def __init__(self, trabalhadores: int, tamanho_maximo: int):
+        self.trabalhadores = max(1, trabalhadores)
+        self.tamanho_maximo = tamanho_maximo
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefas_asyncio: List[asyncio.Task] = []
+
+    @property
+    def tamanho(self) -> int:
+        return self._fila.qsize() if self._fila is not None else 0
+
+    async def iniciar(self) -> None:
+        """
+        Sobe os trabalhadores e coloca na fila as tarefas pendentes no banco
+
+        Com vários workers, todos enfileiram as mesmas pendentes; só um deles
+        consegue reservar cada tarefa (pendente -> processando) em _processar.
+        """
+        self._fila = asyncio.Queue()
+
+        async with sessaolocal_assincrona() as db:
+            pendentes = list(
+                await db.scalars(
+                    select(TarefaExtracao.id)
+                    .where(TarefaExtracao.estado == ESTADO_PENDENTE)
+                    .order_by(TarefaExtracao.data_criacao)
+                )
+            )
+
+        for id_tarefa in pendentes:
+            self._fila.put_nowait(id_tarefa)
+
+        self._tarefas_asyncio = [
+            asyncio.create_task(self._trabalhador()) for _ in range(self.trabalhadores)
+        ]
+        self._tarefas_asyncio.append(asyncio.create_task(self._verificar_reservas()))
+
+    async def encerrar(self) -> None:
+        """Cancela os trabalhadores; tarefas interrompidas são retomadas no próximo início"""
+        for tarefa in self._tarefas_asyncio:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas_asyncio, return_exceptions=True)
+        self._tarefas_asyncio = []
+
+    @property
+    def cheia(self) -> bool:
+        return self.tamanho >= self.tamanho_maximo
+
+    def enfileirar(self, id_tarefa: str) -> None:
+        """
+        Coloca uma tarefa na fila
+
+        Se a fila ainda não foi iniciada, a tarefa fica pendente no banco e
+        é recolocada na fila quando os trabalhadores subirem.
+        """
+        if self._fila is not None:
+            self._fila.put_nowait(id_tarefa)
+
+    async def _trabalhador(self) -> None:
+        while True:
+            id_tarefa = await self._fila.get()
+            try:
+                await self._processar(id_tarefa)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro inesperado ao processar a tarefa %s", id_tarefa)
+            finally:
+                self._fila.task_done()
+
+    async def _verificar_reservas(self) -> None:
+        while True:
+            await asyncio.sleep(INTERVALO_VERIFICACAO_RESERVAS_SEGUNDOS)
+            try:
+                async with sessaolocal_assincrona() as db:
+                    recuperadas = await recuperar_reservas_vencidas(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao verificar as reservas das tarefas")
+                continue
+
+            if recuperadas:
+                logger.warning(
+                    "%d tarefas com a reserva vencida voltaram para a fila",
+                    len(recuperadas),
+                )
+            for id_tarefa in recuperadas:
+                self.enfileirar(id_tarefa)
+
+    async def _renovar_reserva(self, id_tarefa: str) -> None:
+        while True:
+            await asyncio.sleep(DURACAO_RESERVA_TAREFA_SEGUNDOS / 3)
+            try:
+                async with sessaolocal_assincrona() as db:
+                    async with escrita_serializada():
+                        await db.execute(
+                            update(TarefaExtracao)
+                            .where(
+                                TarefaExtracao.id == id_tarefa,
+                                TarefaExtracao.estado == ESTADO_PROCESSANDO,
+                            )
+                            .values(reservada_em=_agora())
+                        )
+                        await db.commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Erro ao renovar a reserva da tarefa %s", id_tarefa)
+
+    async def _processar(self, id_tarefa: str) -> None:
+        async with sessaolocal_assincrona() as db:
+            # Marca a tarefa como em processamento apenas se ainda estiver pendente
+            async with escrita_serializada():
+                reservada = await db.execute(
+                    update(TarefaExtracao)
+                    .where(
+                        TarefaExtracao.id == id_tarefa,
+                        TarefaExtracao.estado == ESTADO_PENDENTE,
+                    )
+                    .values(estado=ESTADO_PROCESSANDO, reservada_em=_agora())
+                )
+                await db.commit()
+            if not reservada.rowcount:
+                return
+
+            renovacao = asyncio.create_task(self._renovar_reserva(id_tarefa))
+            try:
+                await self._extrair(db, id_tarefa)
+            except Exception as erro:
+                # Falha depois da reserva (ao guardar o PDF ou gravar o
+                # documento): sem isso a tarefa ficaria em processamento
+                logger.exception("Erro ao processar a tarefa %s", id_tarefa)
+                await self._marcar_falha(db, id_tarefa, erro)
+            finally:
+                renovacao.cancel()
+
+    @staticmethod
+    async def _marcar_falha(db: AsyncSession, id_tarefa: str, erro: Exception) -> None:
+        await db.rollback()
+        if isinstance(erro, HTTPException):
+            mensagem = str(erro.detail)
+        else:
+            mensagem = f"Erro interno ao processar o PDF ({type(erro).__name__})"
+
+        async with escrita_serializada():
+            caminho = await db.scalar(
+                update(TarefaExtracao)
+                .where(TarefaExtracao.id == id_tarefa)
+                .values(estado=ESTADO_FALHOU, erro=mensagem, reservada_em=None)
+                .returning(TarefaExtracao.caminho_arquivo),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+        if caminho is not None:
+            _remover_arquivo(caminho)
+
+    async def _extrair(self, db: AsyncSession, id_tarefa: str) -> None:
+        tarefa = await db.get(TarefaExtracao, id_tarefa)
+
+        try:
+            paginas = await ServicoDocumento.obter_paginas_pdf(
+                db, tarefa.caminho_arquivo, tarefa.hash_conteudo
+            )
+        except HTTPException as erro:
+            if erro.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                # Motor ocupado com uploads síncronos, tenta de novo depois
+                tarefa.estado = ESTADO_PENDENTE
+                async with escrita_serializada():
+                    await db.commit()
+                await asyncio.sleep(SEGUNDOS_ESPERA_MOTOR_OCUPADO)
+                self._fila.put_nowait(id_tarefa)
+                return
+
+            tarefa.estado = ESTADO_FALHOU
+            tarefa.erro = str(erro.detail)
+            async with escrita_serializada():
+                await db.commit()
+            _remover_arquivo(tarefa.caminho_arquivo)
+            return
+
+        await ServicoDocumento.guardar_pdf(tarefa.caminho_arquivo, tarefa.hash_conteudo)
+        documento = await ServicoDocumento.criar_documento(
+            db,
+            tarefa.nome_arquivo,
+            paginas,
+            tarefa.tamanho_arquivo,
+            tarefa.usuario_id,
+            tarefa.hash_conteudo,
+        )
+
+        tarefa.estado = ESTADO_CONCLUIDA
+        tarefa.documento_id = documento.id
+        async with escrita_serializada():
+            await db.commit()
+        _remover_arquivo(tarefa.caminho_arquivo)
+
+
+def _remover_arquivo(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+
+fila_extracao = FilaExtracao(TRABALHADORES_FILA, MAXIMO_TAREFAS_NA_FILA)
+
+
+class ServicoTarefas:
+    """Classe para operações relacionadas a tarefas de extração assíncrona"""
+
+    @staticmethod
+    async def criar_tarefa_upload(
+        db: AsyncSession, arquivo: UploadFile, usuario_id: int
+    ) -> TarefaExtracao:
+        """
+        Guarda o PDF em disco e cria uma tarefa de extração na fila
+
+        Args:
+            db: Sessão do banco de dados
+            arquivo: Arquivo PDF enviado
+            usuario_id: ID do usuario dono do documento
+
+        Returns:
+            TarefaExtracao: Tarefa criada no estado pendente
+
+        Raises:
+            HTTPException: Se o arquivo não for PDF, passar dos limites ou a
+                fila estiver cheia
+        """
+        if not ServicoDocumento.validar_arquivo_pdf(arquivo):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Apenas arquivos PDF são aceitos",
+            )
+
+        if fila_extracao.cheia:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Fila de extração cheia, tente novamente em instantes",
+                headers={"Retry-After": "30"},
+            )
+
+        os.makedirs(PASTA_UPLOADS_PENDENTES, exist_ok=True)
+        id_tarefa = str(uuid.uuid4())
+        caminho = os.path.join(PASTA_UPLOADS_PENDENTES, f"{id_tarefa}.pdf")
+        try:
+            tamanho_arquivo, hash_conteudo = (
+                await ServicoDocumento.salvar_upload_em_disco(arquivo, caminho)
+            )
+        except HTTPException:
+            # Upload recusado no meio da cópia (grande demais ou não é PDF)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            raise
+
+        tarefa = TarefaExtracao(
+            id=id_tarefa,
+            nome_arquivo=arquivo.filename,
+            caminho_arquivo=caminho,
+            tamanho_arquivo=tamanho_arquivo,
+            hash_conteudo=hash_conteudo,
+            usuario_id=usuario_id,
+            estado=ESTADO_PENDENTE,
+        )
+
+        db.add(tarefa)
+        async with escrita_serializada():
+            await db.commit()
+        await db.refresh(tarefa)
+
+        fila_extracao.enfileirar(tarefa.id)
+
+        return tarefa
+
+    @staticmethod
+    async def obter_tarefa(
+        db: AsyncSession, id_tarefa: str, usuario_id: int
+    ) -> TarefaExtracao:
+        """
+        Consulta uma tarefa do usuario
+
+        Args:
+            db: Sessão do banco de dados
+            id_tarefa: ID da tarefa
+            usuario_id: ID do usuario dono da tarefa
+
+        Returns:
+            TarefaExtracao: Tarefa encontrada
+
+        Raises:
+            HTTPException: Se a tarefa não existir para o usuario
+        """
+        tarefa = await db.scalar(
+            select(TarefaExtracao).where(
+                TarefaExtracao.id == id_tarefa,
+                TarefaExtracao.usuario_id == usuario_id,
+            )
+        )
+
+        if not tarefa:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Tarefa nao encontrada"
+            )
+
+        return tarefa
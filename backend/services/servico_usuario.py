@@ -1,5 +1,7 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
+from backend.database import escrita_serializada
 from backend.models import Usuario
 from backend.schemas.usuario import UsuarioCriar, UsuarioAtualizar
 from backend.services.servico_autenticacao import ServicoAutenticacao
@@ -9,8 +11,8 @@ class ServicoUsuario:
     """Classe  para operacoes relacionadas a usuarios"""
 
     @staticmethod
-    def verificar_usuario_existente(
-        db: Session, nome_usuario: str, email: str
+    async def verificar_usuario_existente(
+        db: AsyncSession, nome_usuario: str, email: str
     ) -> Usuario:
         """
         Verifica se já existe usuario com nome ou email
@@ -23,14 +25,14 @@ class ServicoUsuario:
         Returns:
             Usuario: usuario existente ou None
         """
-        return (
-            db.query(Usuario)
-            .filter((Usuario.nome_usuario == nome_usuario) | (Usuario.email == email))
-            .first()
+        return await db.scalar(
+            select(Usuario).where(
+                (Usuario.nome_usuario == nome_usuario) | (Usuario.email == email)
+            )
         )
 
     @staticmethod
-    def criar_usuario(db: Session, usuario_dados: UsuarioCriar) -> Usuario:
+    async def criar_usuario(db: AsyncSession, usuario_dados: UsuarioCriar) -> Usuario:
         """
         Cria um novo usuario no sistema
 
@@ -45,7 +47,7 @@ class ServicoUsuario:
             HTTPException: Se usuario já existir
         """
         # Verificar se usuario já existe
-        usuario_existente = ServicoUsuario.verificar_usuario_existente(
+        usuario_existente = await ServicoUsuario.verificar_usuario_existente(
             db, usuario_dados.nome_usuario, usuario_dados.email
         )
 
@@ -56,7 +58,9 @@ class ServicoUsuario:
             )
 
         # Criar novo usuario
-        senha_hash = ServicoAutenticacao.gerar_hash_senha(usuario_dados.senha)
+        senha_hash = await ServicoAutenticacao.gerar_hash_senha_async(
+            usuario_dados.senha
+        )
         db_usuario = Usuario(
             nome_usuario=usuario_dados.nome_usuario,
             email=usuario_dados.email,
@@ -64,13 +68,14 @@ class ServicoUsuario:
         )
 
         db.add(db_usuario)
-        db.commit()
-        db.refresh(db_usuario)
+        async with escrita_serializada():
+            await db.commit()
+        await db.refresh(db_usuario)
 
         return db_usuario
 
     @staticmethod
-    def buscar_usuario_por_nome(db: Session, nome_usuario: str) -> Usuario:
+    async def buscar_usuario_por_nome(db: AsyncSession, nome_usuario: str) -> Usuario:
         """
         Busca usuario pelo nome de usuario
 
@@ -81,10 +86,14 @@ class ServicoUsuario:
         Returns:
             Usuario: Usuario encontrado ou None
         """
-        return db.query(Usuario).filter(Usuario.nome_usuario == nome_usuario).first()
+        return await db.scalar(
+            select(Usuario).where(Usuario.nome_usuario == nome_usuario)
+        )
 
     @staticmethod
-    def validar_credenciais(db: Session, nome_usuario: str, senha: str) -> Usuario:
+    async def validar_credenciais(
+        db: AsyncSession, nome_usuario: str, senha: str
+    ) -> Usuario:
         """
         Valida credenciais de login
 
@@ -100,9 +109,9 @@ class ServicoUsuario:
             HTTPException: Se credenciais inválidas ou usuario inativo
         """
         # Buscar usuario
-        usuario = ServicoUsuario.buscar_usuario_por_nome(db, nome_usuario)
+        usuario = await ServicoUsuario.buscar_usuario_por_nome(db, nome_usuario)
 
-        if not usuario or not ServicoAutenticacao.verificar_senha(
+        if not usuario or not await ServicoAutenticacao.verificar_senha_async(
             senha, usuario.senha_hash
         ):
             raise HTTPException(
@@ -119,8 +128,8 @@ class ServicoUsuario:
         return usuario
 
     @staticmethod
-    def atualizar_usuario(
-        db: Session, usuario_id: int, dados_atualizacao: UsuarioAtualizar
+    async def atualizar_usuario(
+        db: AsyncSession, usuario_id: int, dados_atualizacao: UsuarioAtualizar
     ) -> Usuario:
         """
         Atualiza dados de um usuario
@@ -136,26 +145,33 @@ class ServicoUsuario:
         Raises:
             HTTPException: Se usuario não encontrado
         """
-        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+        usuario = await db.get(Usuario, usuario_id)
 
         if not usuario:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="usuario não encontrado"
             )
 
+        nome_usuario_anterior = usuario.nome_usuario
+
         # Atualizar apenas campos fornecidos
         dados_dict = dados_atualizacao.dict(exclude_unset=True)
 
         # Se senha for fornecida, gerar hash
         if "senha" in dados_dict:
-            dados_dict["senha_hash"] = ServicoAutenticacao.gerar_hash_senha(
+            dados_dict["senha_hash"] = await ServicoAutenticacao.gerar_hash_senha_async(
                 dados_dict.pop("senha")
             )
 
         for campo, valor in dados_dict.items():
             setattr(usuario, campo, valor)
 
-        db.commit()
-        db.refresh(usuario)
+        async with escrita_serializada():
+            await db.commit()
+        await db.refresh(usuario)
+
+        # Dados antigos não podem continuar servindo a autenticação
+        ServicoAutenticacao.invalidar_usuario_em_cache(nome_usuario_anterior)
+        ServicoAutenticacao.invalidar_usuario_em_cache(usuario.nome_usuario)
 
         return usuario
@@ -0,0 +1 @@
+# Benchmarks da API
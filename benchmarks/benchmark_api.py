@@ -0,0 +1,362 @@
+"""
+Suíte de benchmarks dos caminhos quentes da API, com resultado em JSON
+
+Cenários (todos rodam por padrão; escolha com --cenarios):
+
+- upload: vazão e memória do POST /documentos/upload por tamanho de PDF
+- listagem: latência do GET /documentos/ por quantidade de documentos e
+  profundidade da página, com deslocamento (pular) e com cursor
+- documento: latência do GET /documentos/{id} por tamanho do texto
+- login: vazão do login com bcrypt sob concorrência
+- autenticacao: custo do obter_usuario_atual, comparando /funcionando com
+  /auth/eu com os caches de token e usuario quentes e frios
+
+Roda sem rede, contra um SQLite temporário; para usar um Postgres local,
+informe URL_BANCO_BENCHMARK (veja benchmarks/comum.py). Requer httpx.
+
+Uso:
+    python -m benchmarks.benchmark_api --saida resultado.json
+    python -m benchmarks.benchmark_api --cenarios listagem --contagens 1000,10000
+    python -m benchmarks.comparar anterior.json resultado.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+# Define o banco do benchmark, por isso vem antes de main
+from benchmarks.comum import (
+    cronometrar,
+    metadados,
+    novo_usuario,
+    registrar_e_logar,
+    remover_banco_temporario,
+    resumo_ms,
+)
+import httpx
+import main
+from backend.database import sessaolocal_assincrona
+from backend.services.servico_autenticacao import cache_tokens, cache_usuarios
+from backend.services.servico_documento import (
+    ServicoDocumento,
+    _codificar_cursor,
+    _ler_paginas_arquivo_pdf,
+)
+from benchmarks.benchmark_login import medir_enxurrada
+from benchmarks.pdf_sintetico import gerar_pdf
+
+CENARIOS = ("upload", "listagem", "documento", "login", "autenticacao")
+DOCUMENTOS_POR_INSERCAO = 1000
+CARACTERES_POR_PAGINA = 4000
+TRECHO_TEXTO = "texto sintetico para medir a leitura "
+
+
+def _lista_inteiros(valor: str) -> list:
+    return [int(item) for item in valor.split(",") if item.strip()]
+
+
+def _mb(quantidade_bytes: int) -> float:
+    return round(quantidade_bytes / 1024 / 1024, 2)
+
+
+async def _popular(usuario_id: int, documentos: list) -> list:
+    """Grava documentos direto pelo serviço, em blocos, e devolve os IDs em ordem"""
+    ids = []
+    async with sessaolocal_assincrona() as db:
+        for inicio in range(0, len(documentos), DOCUMENTOS_POR_INSERCAO):
+            ids += await ServicoDocumento.criar_documentos_em_lote(
+                db, usuario_id, documentos[inicio : inicio + DOCUMENTOS_POR_INSERCAO]
+            )
+    return ids
+
+
+def _documento(nome_arquivo: str, paginas: list) -> dict:
+    return {
+        "nome_arquivo": nome_arquivo,
+        "paginas": paginas,
+        "tamanho_arquivo": sum(len(pagina) for pagina in paginas),
+        "hash_conteudo": None,
+    }
+
+
+async def medir_upload(cliente, cabecalhos: dict, paginas: list, repeticoes: int):
+    # Aquece o pool de extração, que sobe os processos no primeiro uso
+    resposta = await cliente.post(
+        "/documentos/upload",
+        files={"arquivo": ("aquecimento.pdf", gerar_pdf(1), "application/pdf")},
+        headers=cabecalhos,
+    )
+    resposta.raise_for_status()
+
+    resultado = {}
+    for quantidade_paginas in paginas:
+        # Cada PDF tem hash próprio, senão o texto já extraído seria reaproveitado
+        pdfs = [
+            gerar_pdf(quantidade_paginas, marcador=f"{quantidade_paginas}-{indice}")
+            for indice in range(repeticoes + 1)
+        ]
+
+        duracoes = []
+        for indice, pdf in enumerate(pdfs[:repeticoes]):
+            inicio = time.perf_counter()
+            resposta = await cliente.post(
+                "/documentos/upload",
+                files={"arquivo": (f"bench_{indice}.pdf", pdf, "application/pdf")},
+                headers=cabecalhos,
+            )
+            duracoes.append(time.perf_counter() - inicio)
+            resposta.raise_for_status()
+
+        # A extração roda em outro processo, então o pico é medido em duas
+        # partes: a requisição no processo da API e a extração isolada
+        tracemalloc.start()
+        resposta = await cliente.post(
+            "/documentos/upload",
+            files={"arquivo": ("bench_memoria.pdf", pdfs[-1], "application/pdf")},
+            headers=cabecalhos,
+        )
+        _, pico_api = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resposta.raise_for_status()
+
+        descritor, caminho = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(descritor, "wb") as arquivo:
+            arquivo.write(pdfs[-1])
+        try:
+            tracemalloc.start()
+            _ler_paginas_arquivo_pdf(caminho)
+            _, pico_extracao = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.remove(caminho)
+
+        total = sum(duracoes)
+        tamanho_pdf = len(pdfs[0])
+        resultado[f"{quantidade_paginas}_paginas"] = {
+            "bytes_pdf": tamanho_pdf,
+            "repeticoes": repeticoes,
+            "latencia": resumo_ms(duracoes),
+            "pdfs_por_segundo": round(repeticoes / total, 2),
+            "mb_por_segundo": round(tamanho_pdf * repeticoes / total / 1024 / 1024, 2),
+            "paginas_por_segundo": round(quantidade_paginas * repeticoes / total, 2),
+            "pico_memoria_api_mb": _mb(pico_api),
+            "pico_memoria_extracao_mb": _mb(pico_extracao),
+        }
+    return resultado
+
+
+async def medir_listagem(cliente, contagens: list, limite: int, repeticoes: int):
+    resultado = {}
+    for contagem in contagens:
+        usuario_id, cabecalhos = await registrar_e_logar(cliente, novo_usuario())
+        ids = await _popular(
+            usuario_id,
+            [
+                _documento(f"documento_{indice:07d}.pdf", [f"texto {indice}"])
+                for indice in range(contagem)
+            ],
+        )
+
+        por_profundidade = {}
+        for profundidade in sorted({0, contagem // 2, max(0, contagem - limite)}):
+            parametros_cursor = {"limite": limite}
+            if profundidade:
+                parametros_cursor["cursor"] = _codificar_cursor(
+                    "antigos", SimpleNamespace(id=ids[profundidade - 1])
+                )
+
+            async def por_deslocamento():
+                return await cliente.get(
+                    "/documentos/",
+                    params={"limite": limite, "pular": profundidade},
+                    headers=cabecalhos,
+                )
+
+            async def por_cursor():
+                return await cliente.get(
+                    "/documentos/", params=parametros_cursor, headers=cabecalhos
+                )
+
+            por_profundidade[f"pular_{profundidade}"] = {
+                "deslocamento": resumo_ms(
+                    await cronometrar(por_deslocamento, repeticoes)
+                ),
+                "cursor": resumo_ms(await cronometrar(por_cursor, repeticoes)),
+            }
+
+        async def com_total():
+            return await cliente.get(
+                "/documentos/",
+                params={"limite": limite, "incluir_total": True},
+                headers=cabecalhos,
+            )
+
+        resultado[f"{contagem}_documentos"] = {
+            "limite": limite,
+            "profundidades": por_profundidade,
+            "primeira_pagina_com_total": resumo_ms(
+                await cronometrar(com_total, repeticoes)
+            ),
+        }
+    return resultado
+
+
+async def medir_documento(cliente, tamanhos_kib: list, repeticoes: int):
+    usuario_id, cabecalhos = await registrar_e_logar(cliente, novo_usuario())
+    resultado = {}
+    for tamanho_kib in tamanhos_kib:
+        tamanho = tamanho_kib * 1024
+        texto = (TRECHO_TEXTO * (tamanho // len(TRECHO_TEXTO) + 1))[:tamanho]
+        paginas = [
+            texto[inicio : inicio + CARACTERES_POR_PAGINA]
+            for inicio in range(0, len(texto), CARACTERES_POR_PAGINA)
+        ]
+        (documento_id,) = await _popular(
+            usuario_id,
+            [_documento(f"texto_{tamanho_kib}kib.pdf", paginas)],
+        )
+
+        async def obter():
+            return await cliente.get(f"/documentos/{documento_id}", headers=cabecalhos)
+
+        duracoes = await cronometrar(obter, repeticoes)
+        resposta = await obter()
+        resultado[f"{tamanho_kib}_kib"] = {
+            "bytes_resposta": len(resposta.content),
+            "latencia": resumo_ms(duracoes),
+            "mb_por_segundo": round(
+                len(resposta.content) * repeticoes / sum(duracoes) / 1024 / 1024, 2
+            ),
+        }
+    return resultado
+
+
+async def medir_login(cliente, logins: int, concorrencia: int):
+    usuario = novo_usuario()
+    await registrar_e_logar(cliente, usuario)
+    return {
+        "logins": logins,
+        "concorrencia": concorrencia,
+        **await medir_enxurrada(cliente, usuario, logins, concorrencia),
+    }
+
+
+async def medir_autenticacao(cliente, repeticoes: int):
+    _, cabecalhos = await registrar_e_logar(cliente, novo_usuario())
+
+    async def funcionando():
+        return await cliente.get("/funcionando")
+
+    async def eu():
+        return await cliente.get("/auth/eu", headers=cabecalhos)
+
+    async def eu_sem_cache():
+        # Sem cache: decodifica o JWT e busca o usuario no banco
+        cache_tokens.limpar()
+        cache_usuarios.limpar()
+        return await eu()
+
+    await eu()
+    sem_autenticacao = resumo_ms(await cronometrar(funcionando, repeticoes))
+    cache_quente = resumo_ms(await cronometrar(eu, repeticoes))
+    cache_frio = resumo_ms(await cronometrar(eu_sem_cache, repeticoes))
+    return {
+        "funcionando": sem_autenticacao,
+        "auth_eu_cache_quente": cache_quente,
+        "auth_eu_cache_frio": cache_frio,
+        "custo_p50_cache_quente_ms": round(
+            cache_quente["p50_ms"] - sem_autenticacao["p50_ms"], 2
+        ),
+        "custo_p50_cache_frio_ms": round(
+            cache_frio["p50_ms"] - sem_autenticacao["p50_ms"], 2
+        ),
+    }
+
+
+async def medir(argumentos) -> dict:
+    resultado = {"metadados": metadados()}
+    transporte = httpx.ASGITransport(app=main.app)
+
+    # Sobe e encerra o pool de extração, a fila e as engines como a API faz
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(
+            transport=transporte, base_url="http://bench", timeout=None
+        ) as cliente:
+            if "upload" in argumentos.cenarios:
+                _, cabecalhos = await registrar_e_logar(cliente, novo_usuario())
+                resultado["upload"] = await medir_upload(
+                    cliente,
+                    cabecalhos,
+                    argumentos.paginas,
+                    argumentos.repeticoes_upload,
+                )
+            if "listagem" in argumentos.cenarios:
+                resultado["listagem"] = await medir_listagem(
+                    cliente,
+                    argumentos.contagens,
+                    argumentos.limite,
+                    argumentos.repeticoes,
+                )
+            if "documento" in argumentos.cenarios:
+                resultado["documento"] = await medir_documento(
+                    cliente, argumentos.tamanhos_kib, argumentos.repeticoes
+                )
+            if "login" in argumentos.cenarios:
+                resultado["login"] = await medir_login(
+                    cliente, argumentos.logins, argumentos.concorrencia
+                )
+            if "autenticacao" in argumentos.cenarios:
+                resultado["autenticacao"] = await medir_autenticacao(
+                    cliente, argumentos.repeticoes
+                )
+
+    return resultado
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--cenarios",
+        type=lambda valor: [item for item in valor.split(",") if item],
+        default=list(CENARIOS),
+        help=f"Separados por vírgula, entre: {', '.join(CENARIOS)}",
+    )
+    parser.add_argument("--paginas", type=_lista_inteiros, default=[1, 10, 100, 500])
+    parser.add_argument("--repeticoes-upload", type=int, default=5)
+    parser.add_argument("--contagens", type=_lista_inteiros, default=[100, 1000, 10000])
+    parser.add_argument("--limite", type=int, default=100)
+    parser.add_argument(
+        "--tamanhos-kib", type=_lista_inteiros, default=[1, 100, 1000, 10000]
+    )
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    argumentos = parser.parse_args()
+
+    desconhecidos = set(argumentos.cenarios) - set(CENARIOS)
+    if desconhecidos:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    try:
+        resultado = asyncio.run(medir(argumentos))
+    finally:
+        remover_banco_temporario()
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida + "\n")
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main_benchmark()
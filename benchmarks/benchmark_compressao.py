@@ -0,0 +1,216 @@
+"""
+Compara o texto dos documentos gravado puro, com zlib e com zstd
+
+Para cada codec mede a taxa de compressão, o tempo de compactar e
+descompactar e, gravando documentos de verdade no banco do benchmark, os
+bytes ocupados pela coluna de texto e a latência do obter_documento (que
+descompacta na leitura). zstd só entra se o pacote zstandard estiver
+instalado.
+
+O texto padrão é gerado a partir de um vocabulário, com distribuição mais
+próxima de um texto real do que o PDF sintético (que comprime demais); use
+--arquivo para medir com o texto de um PDF ou .txt de verdade.
+
+Uso:
+    python -m benchmarks.benchmark_compressao --tamanhos-kib 10,100,1000
+    python -m benchmarks.benchmark_compressao --arquivo contrato.pdf
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+# Define o banco do benchmark, por isso vem antes do backend
+from benchmarks.comum import metadados, remover_banco_temporario, resumo_ms
+from sqlalchemy import select
+from backend.database import (
+    atualizar_esquema,
+    base,
+    engine,
+    engine_assincrona,
+    sessaolocal_assincrona,
+)
+from backend.models import DocumentoTexto
+from backend.services import compressao_texto
+from backend.services.servico_busca import ServicoBusca
+from backend.services.servico_documento import (
+    ServicoDocumento,
+    _ler_paginas_arquivo_pdf,
+)
+
+USUARIO_ID = 1
+VOCABULARIO = (
+    "contrato cláusula parte contratante contratada prazo pagamento valor "
+    "multa rescisão vigência objeto serviço entrega prestação obrigação "
+    "responsabilidade documento anexo termo aditivo data assinatura nome "
+    "endereço cidade estado empresa cnpj cpf representante legal art lei "
+    "de da do das dos em no na nos nas por para com sem sobre entre após "
+    "o a os as um uma e ou que se não mais conforme previsto presente "
+    "mediante acordo partes fica fixado mensal anual total reais r$ nº"
+).split()
+
+
+def gerar_texto(tamanho: int, semente: int = 42) -> str:
+    """Texto pseudoaleatório com palavras do vocabulário, números e quebras"""
+    aleatorio = random.Random(semente)
+    partes, total = [], 0
+    while total < tamanho:
+        if aleatorio.random() < 0.08:
+            palavra = str(aleatorio.randint(1, 99999))
+        else:
+            palavra = aleatorio.choice(VOCABULARIO)
+        separador = "\n" if aleatorio.random() < 0.07 else " "
+        partes.append(palavra + separador)
+        total += len(palavra) + 1
+    return "".join(partes)[:tamanho]
+
+
+def ler_arquivo(caminho: str) -> str:
+    if caminho.lower().endswith(".pdf"):
+        return ServicoDocumento.juntar_paginas(_ler_paginas_arquivo_pdf(caminho))
+    with open(caminho, encoding="utf-8") as arquivo:
+        return arquivo.read()
+
+
+def codecs_disponiveis() -> list:
+    codecs = [compressao_texto.SEM_COMPRESSAO, compressao_texto.CODEC_ZLIB]
+    if compressao_texto.zstandard is not None:
+        codecs.append(compressao_texto.CODEC_ZSTD)
+    return codecs
+
+
+def medir_codec(texto: str, codec: str, repeticoes: int) -> dict:
+    bytes_texto = len(texto.encode("utf-8"))
+    if codec == compressao_texto.SEM_COMPRESSAO:
+        return {"bytes": bytes_texto, "taxa": 1.0}
+
+    tempos_compactar, tempos_descompactar = [], []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        dados = compressao_texto.compactar(texto, codec)
+        tempos_compactar.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        compressao_texto.descompactar(codec, dados)
+        tempos_descompactar.append(time.perf_counter() - inicio)
+
+    return {
+        "bytes": len(dados),
+        "taxa": round(bytes_texto / len(dados), 2),
+        "compactar": resumo_ms(tempos_compactar),
+        "descompactar": resumo_ms(tempos_descompactar),
+    }
+
+
+async def medir_banco(texto: str, codec: str, repeticoes: int):
+    # Grava pelo serviço com o codec escolhido, como a API gravaria
+    compressao_texto.COMPRESSAO_TEXTO = codec
+    async with sessaolocal_assincrona() as db:
+        (documento_id,) = await ServicoDocumento.criar_documentos_em_lote(
+            db,
+            USUARIO_ID,
+            [
+                {
+                    "nome_arquivo": f"{codec}.pdf",
+                    "paginas": [texto],
+                    "tamanho_arquivo": len(texto),
+                    "hash_conteudo": None,
+                }
+            ],
+        )
+
+        texto_extraido, texto_compactado = (
+            await db.execute(
+                select(
+                    DocumentoTexto.texto_extraido, DocumentoTexto.texto_compactado
+                ).where(DocumentoTexto.id == documento_id)
+            )
+        ).one()
+        bytes_gravados = len(texto_extraido.encode("utf-8")) + len(
+            texto_compactado or b""
+        )
+
+    async def obter():
+        async with sessaolocal_assincrona() as db:
+            return await ServicoDocumento.obter_documento(
+                db, documento_id, USUARIO_ID, com_texto=True
+            )
+
+    documento = await obter()
+    assert documento.texto_extraido == texto
+
+    duracoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        await obter()
+        duracoes.append(time.perf_counter() - inicio)
+
+    return {
+        "bytes_gravados": bytes_gravados,
+        "obter_documento": resumo_ms(duracoes),
+    }
+
+
+async def medir(textos: dict, repeticoes: int) -> dict:
+    resultado = {"metadados": metadados(), "textos": {}}
+    codec_original = compressao_texto.COMPRESSAO_TEXTO
+    try:
+        for nome, texto in textos.items():
+            por_codec = {}
+            for codec in codecs_disponiveis():
+                por_codec[codec] = {
+                    **medir_codec(texto, codec, repeticoes),
+                    **await medir_banco(texto, codec, repeticoes),
+                }
+            resultado["textos"][nome] = {
+                "caracteres": len(texto),
+                "codecs": por_codec,
+            }
+    finally:
+        compressao_texto.COMPRESSAO_TEXTO = codec_original
+        await engine_assincrona.dispose()
+    return resultado
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--tamanhos-kib",
+        type=lambda valor: [int(item) for item in valor.split(",") if item],
+        default=[10, 100, 1000],
+    )
+    parser.add_argument("--arquivo", help="PDF ou .txt com um texto real")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    argumentos = parser.parse_args()
+
+    if argumentos.arquivo:
+        textos = {argumentos.arquivo: ler_arquivo(argumentos.arquivo)}
+    else:
+        textos = {
+            f"{tamanho}_kib": gerar_texto(tamanho * 1024)
+            for tamanho in argumentos.tamanhos_kib
+        }
+
+    base.metadata.create_all(bind=engine)
+    atualizar_esquema(engine)
+    ServicoBusca.criar_indice(engine)
+
+    try:
+        resultado = asyncio.run(medir(textos, argumentos.repeticoes))
+    finally:
+        remover_banco_temporario()
+
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida + "\n")
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    main_benchmark()
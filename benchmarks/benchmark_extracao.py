@@ -0,0 +1,80 @@
+"""
+Compara o pico de memória e o tempo da extração de texto
+
+- buffer: lê o arquivo inteiro para bytes + BytesIO e concatena o texto página a página
+- streaming: mapeia o arquivo em disco, gera o texto por página e junta uma vez
+
+Uso:
+    python -m benchmarks.benchmark_extracao --paginas 1000
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import PyPDF2
+from benchmarks.pdf_sintetico import gerar_pdf
+from backend.services.servico_documento import (
+    ServicoDocumento,
+    _ler_paginas_arquivo_pdf,
+)
+
+
+def extrair_com_buffer(caminho_pdf: str) -> str:
+    """Estratégia antiga, mantida aqui só para comparação"""
+    with open(caminho_pdf, "rb") as arquivo:
+        conteudo_pdf = arquivo.read()
+
+    leitor_pdf = PyPDF2.PdfReader(io.BytesIO(conteudo_pdf))
+    texto_extraido = ""
+    for pagina in leitor_pdf.pages:
+        texto_extraido += pagina.extract_text() + "\n"
+    return texto_extraido.strip()
+
+
+def extrair_com_streaming(caminho_pdf: str) -> str:
+    return ServicoDocumento.juntar_paginas(_ler_paginas_arquivo_pdf(caminho_pdf))
+
+
+def medir(funcao, caminho_pdf: str) -> dict:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    texto = funcao(caminho_pdf)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "segundos": round(duracao, 3),
+        "pico_memoria_mb": round(pico / 1024 / 1024, 2),
+        "caracteres_extraidos": len(texto),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--paginas", type=int, default=1000)
+    parser.add_argument("--linhas", type=int, default=40)
+    argumentos = parser.parse_args()
+
+    descritor, caminho_pdf = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(descritor, "wb") as arquivo:
+        arquivo.write(gerar_pdf(argumentos.paginas, argumentos.linhas))
+
+    try:
+        resultado = {
+            "paginas": argumentos.paginas,
+            "tamanho_pdf_mb": round(os.path.getsize(caminho_pdf) / 1024 / 1024, 2),
+            "buffer": medir(extrair_com_buffer, caminho_pdf),
+            "streaming": medir(extrair_com_streaming, caminho_pdf),
+        }
+    finally:
+        os.remove(caminho_pdf)
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Mede o login sob uma enxurrada de requisições e o impacto nas demais rotas
+
+Dispara vários logins concorrentes (bcrypt) e, ao mesmo tempo, mede a latência
+de /funcionando. Com --comparar, repete a medição rodando o bcrypt direto no
+event loop, como era antes do executor de senhas.
+
+Requer httpx (pip install httpx). O banco é definido em benchmarks/comum.py.
+
+Uso:
+    python -m benchmarks.benchmark_login --logins 200 --concorrencia 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+# Define o banco do benchmark, por isso vem antes de main
+from benchmarks.comum import novo_usuario, remover_banco_temporario, resumo_ms
+import httpx
+import main
+from backend.services.executor_senhas import executor_senhas
+
+INTERVALO_SONDA_SEGUNDOS = 0.005
+
+
+async def medir_enxurrada(
+    cliente, usuario: dict, logins: int, concorrencia: int
+) -> dict:
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias_login, latencias_sonda, codigos = [], [], {}
+    terminou = asyncio.Event()
+
+    async def login():
+        async with semaforo:
+            inicio = time.perf_counter()
+            resposta = await cliente.post(
+                "/auth/login",
+                json={
+                    "nome_usuario": usuario["nome_usuario"],
+                    "senha": usuario["senha"],
+                },
+            )
+            latencias_login.append(time.perf_counter() - inicio)
+            codigos[resposta.status_code] = codigos.get(resposta.status_code, 0) + 1
+
+    async def sonda():
+        # A latência conta a partir do momento em que o cliente "chegaria",
+        # então inclui o tempo em que o event loop ficou travado
+        while not terminou.is_set():
+            chegada = time.perf_counter() + INTERVALO_SONDA_SEGUNDOS
+            await asyncio.sleep(INTERVALO_SONDA_SEGUNDOS)
+            await cliente.get("/funcionando")
+            latencias_sonda.append(time.perf_counter() - chegada)
+
+    tarefa_sonda = asyncio.create_task(sonda())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    duracao = time.perf_counter() - inicio
+    terminou.set()
+    await tarefa_sonda
+
+    return {
+        "logins_por_segundo": round(logins / duracao, 2),
+        "codigos_http": codigos,
+        "login": resumo_ms(latencias_login),
+        "funcionando_durante_enxurrada": resumo_ms(latencias_sonda),
+    }
+
+
+async def medir(logins: int, concorrencia: int, comparar: bool) -> dict:
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://bench"
+    ) as cliente:
+        usuario = novo_usuario()
+        await cliente.post("/auth/registrar", json=usuario)
+
+        latencias_base = []
+        for _ in range(200):
+            inicio = time.perf_counter()
+            await cliente.get("/funcionando")
+            latencias_base.append(time.perf_counter() - inicio)
+
+        resultado = {
+            "logins": logins,
+            "concorrencia": concorrencia,
+            "threads_senhas": executor_senhas.threads,
+            "funcionando_em_repouso": resumo_ms(latencias_base),
+            "executor": await medir_enxurrada(cliente, usuario, logins, concorrencia),
+        }
+
+        if comparar:
+            # Simula o comportamento antigo: bcrypt rodando no próprio event loop
+            executar_original = executor_senhas.executar
+
+            async def executar_no_loop(funcao, *argumentos):
+                return funcao(*argumentos)
+
+            executor_senhas.executar = executar_no_loop
+            try:
+                resultado["event_loop"] = await medir_enxurrada(
+                    cliente, usuario, logins, concorrencia
+                )
+            finally:
+                executor_senhas.executar = executar_original
+
+    return resultado
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--comparar", action="store_true")
+    argumentos = parser.parse_args()
+
+    try:
+        resultado = asyncio.run(
+            medir(argumentos.logins, argumentos.concorrencia, argumentos.comparar)
+        )
+    finally:
+        executor_senhas.encerrar()
+        remover_banco_temporario()
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,95 @@
+"""
+Compara dois resultados JSON dos benchmarks (ex.: de dois commits)
+
+Mostra cada métrica numérica presente nos dois arquivos com a variação em
+porcentagem. Latências (_ms) pioram quando sobem; vazões (_por_segundo)
+pioram quando descem; as demais métricas são só informativas. Sai com
+código 1 se alguma piorar mais que a tolerância, para uso em CI.
+
+Uso:
+    python -m benchmarks.comparar anterior.json atual.json --tolerancia 10
+"""
+
+import argparse
+import json
+import sys
+
+
+def achatar(dados, prefixo: str = "") -> dict:
+    """Transforma o JSON aninhado em {"caminho.da.metrica": valor} só com números"""
+    if isinstance(dados, dict):
+        itens = {}
+        for chave, valor in dados.items():
+            itens.update(achatar(valor, f"{prefixo}{chave}."))
+        return itens
+    if isinstance(dados, (int, float)) and not isinstance(dados, bool):
+        return {prefixo[:-1]: dados}
+    return {}
+
+
+def sentido(metrica: str) -> int:
+    """1 se maior é melhor, -1 se menor é melhor e 0 se a métrica é informativa"""
+    if metrica.endswith("_por_segundo"):
+        return 1
+    if metrica.endswith("_ms") or metrica.endswith("_mb"):
+        return -1
+    return 0
+
+
+def comparar(anterior: dict, atual: dict, tolerancia: float) -> list:
+    metricas_anteriores = achatar(anterior)
+    metricas_atuais = achatar(atual)
+    linhas = []
+    for metrica, valor_anterior in metricas_anteriores.items():
+        if metrica.startswith("metadados.") or metrica not in metricas_atuais:
+            continue
+        valor_atual = metricas_atuais[metrica]
+        variacao = (
+            (valor_atual - valor_anterior) / valor_anterior * 100
+            if valor_anterior
+            else 0.0
+        )
+        piorou = sentido(metrica) * variacao < -tolerancia
+        linhas.append((metrica, valor_anterior, valor_atual, variacao, piorou))
+    return linhas
+
+
+def main_comparar():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("anterior")
+    parser.add_argument("atual")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=10.0,
+        help="Piora máxima aceita, em porcentagem (padrão: 10)",
+    )
+    argumentos = parser.parse_args()
+
+    with open(argumentos.anterior, encoding="utf-8") as arquivo:
+        anterior = json.load(arquivo)
+    with open(argumentos.atual, encoding="utf-8") as arquivo:
+        atual = json.load(arquivo)
+
+    for rotulo, dados in (("anterior", anterior), ("atual", atual)):
+        info = dados.get("metadados", {})
+        print(f"{rotulo}: commit {info.get('commit')} em {info.get('banco')}")
+
+    linhas = comparar(anterior, atual, argumentos.tolerancia)
+    largura = max((len(linha[0]) for linha in linhas), default=0)
+    for metrica, valor_anterior, valor_atual, variacao, piorou in linhas:
+        marca = "  PIOROU" if piorou else ""
+        print(
+            f"{metrica:<{largura}}  {valor_anterior:>12}  {valor_atual:>12}  "
+            f"{variacao:>+8.1f}%{marca}"
+        )
+
+    pioras = sum(1 for linha in linhas if linha[4])
+    print(f"\n{pioras} métrica(s) piorou(aram) mais que {argumentos.tolerancia}%")
+    sys.exit(1 if pioras else 0)
+
+
+if __name__ == "__main__":
+    main_comparar()
@@ -0,0 +1,67 @@
+"""
+Gera PDFs sintéticos com texto, sem dependências externas, para os benchmarks
+"""
+
+
+def gerar_pdf(paginas: int, linhas_por_pagina: int = 40, marcador: str = "") -> bytes:
+    """
+    Gera um PDF válido com uma fonte padrão e texto em todas as páginas
+
+    Args:
+        paginas: Quantidade de páginas
+        linhas_por_pagina: Quantidade de linhas de texto em cada página
+        marcador: Texto extra na primeira linha, para gerar PDFs com o mesmo
+            tamanho e hashes diferentes
+
+    Returns:
+        bytes: Conteudo binário do PDF
+    """
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # preenchido depois com a lista de páginas
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    referencias_paginas = []
+
+    for numero_pagina in range(1, paginas + 1):
+        linhas = ["BT /F1 10 Tf 40 760 Td 12 TL"]
+        if marcador and numero_pagina == 1:
+            linhas.append(f"({marcador}) Tj T*")
+        for numero_linha in range(1, linhas_por_pagina + 1):
+            linhas.append(
+                f"(Pagina {numero_pagina} linha {numero_linha} texto sintetico "
+                f"para medir a extracao) Tj T*"
+            )
+        linhas.append("ET")
+        conteudo = "\n".join(linhas).encode("latin-1")
+
+        id_pagina = len(objetos) + 1
+        referencias_paginas.append(f"{id_pagina} 0 R")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {id_pagina + 1} 0 R >>".encode()
+        )
+        objetos.append(
+            b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream"
+        )
+
+    objetos[1] = (
+        f"<< /Type /Pages /Kids [{' '.join(referencias_paginas)}] "
+        f"/Count {paginas} >>".encode()
+    )
+
+    saida = bytearray(b"%PDF-1.4\n")
+    deslocamentos = []
+    for numero, objeto in enumerate(objetos, 1):
+        deslocamentos.append(len(saida))
+        saida += b"%d 0 obj\n" % numero + objeto + b"\nendobj\n"
+
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for deslocamento in deslocamentos:
+        saida += b"%010d 00000 n \n" % deslocamento
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1,
+        inicio_xref,
+    )
+    return bytes(saida)
@@ -0,0 +1,77 @@
+"""
+Perfil de produção com vários processos: gunicorn -c gunicorn.conf.py main:app
+
+O processo mestre prepara o banco uma vez (tabelas, colunas novas, índice
+de busca e tarefas interrompidas) e só então sobe os workers, que já vêm com
+PREPARAR_BANCO=false. Os pools de cada worker (extração, OCR e hash de
+senhas) são divididos pelos núcleos, para os workers juntos não passarem do
+total da máquina.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import os
+import time
+
+NUCLEOS = os.cpu_count() or 1
+
+# Um worker (event loop) por núcleo; cada um atende as rotas de forma assíncrona
+workers = int(os.getenv("WORKERS_API", str(NUCLEOS)))
+worker_class = "uvicorn_worker.UvicornWorker"
+bind = os.getenv("BIND_API", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# Uploads grandes e extrações lentas cabem no timeout; o worker que travar
+# além dele é reiniciado
+timeout = int(os.getenv("TIMEOUT_WORKER_SEGUNDOS", "180"))
+graceful_timeout = int(os.getenv("TIMEOUT_DESLIGAMENTO_SEGUNDOS", "30"))
+keepalive = 5
+# IPs dos proxies (nginx, balanceador) cujos X-Forwarded-For e
+# X-Forwarded-Proto valem; sem isso o IP de todos os clientes é o do proxy,
+# e os limites por IP do login passam a ser um só para todos
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1,::1")
+accesslog = "-"
+
+# Defaults por worker, aplicados antes de os workers importarem a aplicação;
+# o que estiver definido no ambiente continua valendo
+_por_worker = str(max(1, NUCLEOS // workers))
+os.environ.setdefault("PROCESSOS_EXTRACAO", _por_worker)
+os.environ.setdefault("PROCESSOS_OCR", str(max(1, NUCLEOS // (2 * workers))))
+os.environ.setdefault("THREADS_SENHAS", _por_worker)
+
+_inicio_mestre = time.perf_counter()
+
+
+def on_starting(server):
+    # Importado aqui para o .env e os defaults acima já valerem no import
+    from backend.database import engine
+    from backend.inicializacao import preparar_banco
+
+    if os.getenv("PREPARAR_BANCO", "true").lower() == "true":
+        segundos = preparar_banco(engine)
+        # As conexões abertas aqui não podem ser herdadas pelos workers
+        engine.dispose()
+        server.log.info("Banco preparado em %.2fs", segundos)
+    os.environ["PREPARAR_BANCO"] = "false"
+
+
+def when_ready(server):
+    server.log.info(
+        "Mestre pronto em %.2fs, subindo %d workers",
+        time.perf_counter() - _inicio_mestre,
+        workers,
+    )
+
+
+def post_fork(server, worker):
+    worker.inicio_subida = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # Importação da aplicação no worker; o ciclo de vida (pools e fila) vem
+    # depois e aparece em api_inicializacao_segundos{etapa="ciclo_de_vida"}
+    worker.log.info(
+        "Worker %s carregou a aplicação em %.2fs",
+        worker.pid,
+        time.perf_counter() - worker.inicio_subida,
+    )
@@ -1,14 +1,95 @@
+import time
+
+# Início da importação, para medir o tempo de subida de cada processo
+inicio_importacao = time.perf_counter()
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI
+import os
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import engine, base
+from fastapi.middleware.gzip import GZipMiddleware
+from backend.database import engine, engine_assincrona
+from backend.inicializacao import preparar_banco
 from backend.routers import auth, documentos
+from backend.services.compressao_respostas import MiddlewareCompressao
+from backend.services.executor_senhas import executor_senhas
+from backend.services.limite_taxa import MiddlewareLimiteTaxa, limitador
+from backend.services.limite_upload import FOLGA_MULTIPART, MiddlewareLimiteUpload
+from backend.services.metricas import (
+    TIPO_CONTEUDO_METRICAS,
+    MiddlewareMetricas,
+    instrumentar_engine,
+    observar_caches,
+    registro_metricas,
+    tempo_inicializacao,
+)
+from backend.services.motor_extracao import motor_extracao
+from backend.services.cache_respostas import cache_respostas
+from backend.services.servico_autenticacao import cache_tokens, cache_usuarios
+from backend.services.servico_documento import (
+    MAXIMO_BYTES_PDF,
+    estatisticas_cache_extracao,
+)
+from backend.services.servico_lote import MAXIMO_TAMANHO_LOTE_MB
+from backend.services.servico_ocr import OCR_ATIVO, motor_ocr
+from backend.services.servico_tarefas import fila_extracao
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # brotli é opcional: pip install brotli-asgi
+    BrotliMiddleware = None
+
+# Compressão das respostas (gzip, ou brotli quando brotli-asgi estiver instalado)
+TAMANHO_MINIMO_COMPRESSAO = int(os.getenv("TAMANHO_MINIMO_COMPRESSAO", "1024"))
+NIVEL_GZIP_RESPOSTAS = int(os.getenv("NIVEL_GZIP_RESPOSTAS", "5"))
+
+# Com um token definido, /metrics exige Authorization: Bearer <token>; sem
+# ele a rota é aberta e o acesso deve ser restrito na rede
+TOKEN_METRICAS = os.getenv("TOKEN_METRICAS", "")
+
+# Tabelas, colunas novas, índice de busca e tarefas interrompidas. Com vários
+# processos (gunicorn.conf.py) isso roda uma vez só, no processo mestre, e os
+# workers sobem com PREPARAR_BANCO=false
+PREPARAR_BANCO = os.getenv("PREPARAR_BANCO", "true").lower() == "true"
+if PREPARAR_BANCO:
+    tempo_inicializacao.somar("banco", valor=preparar_banco(engine))
+
+# Métricas de consultas ao banco e dos caches em memória
+instrumentar_engine(engine_assincrona.sync_engine)
+observar_caches(
+    {
+        "extracao": estatisticas_cache_extracao,
+        "tokens": cache_tokens.estatisticas,
+        "usuarios": cache_usuarios.estatisticas,
+        "respostas": cache_respostas.estatisticas,
+    }
+)
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Sobe o pool de extração e a fila junto com a API e encerra no desligamento
+    inicio = time.perf_counter()
+    motor_extracao.iniciar()
+    if OCR_ATIVO:
+        motor_ocr.iniciar()
+    await fila_extracao.iniciar()
+    tempo_inicializacao.somar("ciclo_de_vida", valor=time.perf_counter() - inicio)
+    yield
+    await fila_extracao.encerrar()
+    motor_extracao.encerrar()
+    motor_ocr.encerrar()
+    executor_senhas.encerrar()
+    await cache_respostas.fechar()
+    if limitador is not None:
+        await limitador.fechar()
+    await engine_assincrona.dispose()
 
-# Criar tabelas no banco de dados
-base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="API de Extração de Texto de PDF",
@@ -16,15 +97,69 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url=None,
+    lifespan=ciclo_de_vida,
 )
 
-# Configuração de CORS
+# Respostas maiores que o mínimo são compactadas conforme o Accept-Encoding;
+# respostas enviadas em partes são compactadas parte a parte. O PDF original
+# (/documentos/{id}/arquivo) sai sem compressão, para manter sendfile e Range
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        MiddlewareCompressao,
+        middleware=BrotliMiddleware,
+        sufixos_ignorados=("/arquivo",),
+        minimum_size=TAMANHO_MINIMO_COMPRESSAO,
+        gzip_fallback=True,
+    )
+else:
+    app.add_middleware(
+        MiddlewareCompressao,
+        middleware=GZipMiddleware,
+        sufixos_ignorados=("/arquivo",),
+        minimum_size=TAMANHO_MINIMO_COMPRESSAO,
+        compresslevel=NIVEL_GZIP_RESPOSTAS,
+    )
+
+# Uploads por minuto, MB por minuto e uploads simultâneos de cada usuario;
+# quem passar do limite recebe 429 com Retry-After antes de enviar o corpo
+app.add_middleware(
+    MiddlewareLimiteTaxa,
+    rotas=(
+        "/documentos/upload",
+        "/documentos/upload/assincrono",
+        "/documentos/upload/lote",
+    ),
+)
+
+# Uploads grandes demais são recusados antes de o corpo ser recebido
+app.add_middleware(
+    MiddlewareLimiteUpload,
+    limites={
+        "/documentos/upload": MAXIMO_BYTES_PDF + FOLGA_MULTIPART,
+        "/documentos/upload/assincrono": MAXIMO_BYTES_PDF + FOLGA_MULTIPART,
+        "/documentos/upload/lote": MAXIMO_TAMANHO_LOTE_MB * 1024 * 1024,
+    },
+)
+
+# Latência, status e consultas ao banco por rota, expostos em /metrics
+app.add_middleware(MiddlewareMetricas)
+
+# Configuração de CORS. Adicionado por último para ser a camada mais externa:
+# os 429 e 413 dos middlewares acima também saem com os headers de CORS, e o
+# navegador consegue ler o Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Proximo-Cursor",
+        "X-Total-Count",
+        "ETag",
+        "Last-Modified",
+        "Retry-After",
+    ],
 )
 
 # Incluindo as rotas
@@ -43,3 +178,22 @@ async def testa_se_api_esta_funcionando():
         "versao": "Desafio Central IT",
         "documentacao": "/docs",
     }
+
+
+@app.get("/metrics", tags=["Verifica se a API esta funcionando"])
+async def exportar_metricas(request: Request):
+    """Métricas da API no formato texto do Prometheus (por processo)"""
+    if TOKEN_METRICAS and not secrets.compare_digest(
+        request.headers.get("authorization", "").encode(),
+        f"Bearer {TOKEN_METRICAS}".encode(),
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token das métricas inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(registro_metricas.exportar(), media_type=TIPO_CONTEUDO_METRICAS)
+
+
+# Importação deste módulo, incluindo a preparação do banco quando ela roda aqui
+tempo_inicializacao.somar("importacao", valor=time.perf_counter() - inicio_importacao)
@@ -0,0 +1,100 @@
+import os
+import tempfile
+
+# Banco e armazenamento descartáveis, definidos antes de importar a aplicação
+_pasta = tempfile.mkdtemp(prefix="desafio_api_testes_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_pasta, 'testes.db')}"
+os.environ.pop("DATABASE_URL_ASSINCRONA", None)
+os.environ["PASTA_ARMAZENAMENTO"] = os.path.join(_pasta, "armazenamento")
+os.environ["PASTA_UPLOADS_PENDENTES"] = os.path.join(_pasta, "uploads_pendentes")
+os.environ.setdefault("CHAVE_SECRETA", "chave-dos-testes")
+os.environ["CACHE_RESPOSTAS"] = "memoria"
+os.environ["LIMITE_TAXA"] = "nenhum"
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def gerar_pdf(*paginas: str) -> bytes:
+    """PDF mínimo com uma linha de texto em cada página"""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        (
+            "<< /Type /Pages /Kids [%s] /Count %d >>"
+            % (" ".join(f"{4 + 2 * i} 0 R" for i in range(len(paginas))), len(paginas))
+        ).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, texto in enumerate(paginas):
+        conteudo = f"BT /F1 12 Tf 50 750 Td ({texto}) Tj ET".encode()
+        objetos.append(
+            (
+                "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                % (5 + 2 * i)
+            ).encode()
+        )
+        objetos.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(conteudo), conteudo)
+        )
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (numero, objeto)
+    inicio_xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicao in posicoes:
+        pdf += b"%010d 00000 n \n" % posicao
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1,
+        inicio_xref,
+    )
+    return bytes(pdf)
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from main import app
+
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def autenticar(cliente):
+    """Registra um usuario e devolve o header de autenticação dele"""
+
+    def autenticar(nome_usuario: str) -> dict:
+        cliente.post(
+            "/auth/registrar",
+            json={
+                "nome_usuario": nome_usuario,
+                "email": f"{nome_usuario}@exemplo.com",
+                "senha": "senha-de-teste",
+            },
+        )
+        resposta = cliente.post(
+            "/auth/login",
+            json={"nome_usuario": nome_usuario, "senha": "senha-de-teste"},
+        )
+        return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+    return autenticar
+
+
+@pytest.fixture
+def enviar_pdf(cliente):
+    """Faz o upload de um PDF com as páginas informadas e devolve o id"""
+
+    def enviar_pdf(cabecalhos: dict, *paginas: str) -> int:
+        resposta = cliente.post(
+            "/documentos/upload",
+            headers=cabecalhos,
+            files={"arquivo": ("teste.pdf", gerar_pdf(*paginas), "application/pdf")},
+        )
+        assert resposta.status_code == 201, resposta.text
+        return resposta.json()["id"]
+
+    return enviar_pdf
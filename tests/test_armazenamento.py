@@ -0,0 +1,107 @@
+import os
+import time
+from datetime import datetime, timezone
+from sqlalchemy import select
+from backend.comandos import limpar_armazenamento
+from backend.database import engine, sessaolocal
+from backend.models import DocumentoTexto, PaginaDocumento
+from backend.services import servico_documento
+from backend.services.armazenamento import armazenamento
+
+PAGINAS = ["texto guardado fora do banco", "segunda pagina do blob"]
+
+
+def _colunas_gravadas(id_documento: int):
+    with engine.connect() as conexao:
+        documento = conexao.execute(
+            select(
+                DocumentoTexto.texto_extraido,
+                DocumentoTexto.chave_texto,
+                DocumentoTexto.chave_arquivo,
+            ).where(DocumentoTexto.id == id_documento)
+        ).one()
+        paginas = conexao.scalars(
+            select(PaginaDocumento.texto).where(
+                PaginaDocumento.documento_id == id_documento
+            )
+        ).all()
+    return documento, paginas
+
+
+def test_texto_no_armazenamento_nao_fica_no_banco(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    monkeypatch.setattr(servico_documento, "LIMITE_TEXTO_NO_BANCO", 1)
+    ana = autenticar("ana_blob")
+    id_documento = enviar_pdf(ana, *PAGINAS)
+
+    documento, paginas = _colunas_gravadas(id_documento)
+    assert documento.chave_texto is not None
+    assert documento.texto_extraido == ""
+    assert paginas == ["", ""]
+
+    resposta = cliente.get(
+        f"/documentos/{id_documento}/paginas",
+        params={"inicio": 1, "fim": 2},
+        headers=ana,
+    )
+    assert [pagina["texto"] for pagina in resposta.json()["paginas"]] == PAGINAS
+    busca = cliente.get("/documentos/busca", params={"q": "blob"}, headers=ana)
+    assert [resultado["id"] for resultado in busca.json()] == [id_documento]
+
+
+def test_limpeza_confere_a_data_do_blob_antes_de_apagar(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    ana = autenticar("ana_limpeza")
+    id_documento = enviar_pdf(ana, "pdf enviado de novo durante a limpeza")
+    chave = _colunas_gravadas(id_documento)[0].chave_arquivo
+
+    # Listagem e referências lidas antes de o upload do mesmo PDF renovar a
+    # data do blob e gravar o documento
+    antigo = datetime.fromtimestamp(time.time() - 7200, timezone.utc)
+    monkeypatch.setattr(limpar_armazenamento, "chaves_referenciadas", lambda db: set())
+    monkeypatch.setattr(armazenamento, "listar", lambda: iter([(chave, antigo)]))
+
+    with sessaolocal() as db:
+        assert limpar_armazenamento.limpar(db, 3600, False)["apagados"] == 0
+    assert armazenamento.existe(chave)
+
+    # Mesmo com a data antiga, a referência gravada depois da listagem segura o blob
+    os.utime(armazenamento.caminho(chave), (antigo.timestamp(), antigo.timestamp()))
+    with sessaolocal() as db:
+        assert limpar_armazenamento.limpar(db, 3600, False)["apagados"] == 0
+    assert armazenamento.existe(chave)
+
+
+def test_texto_perdido_no_armazenamento_responde_503(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    monkeypatch.setattr(servico_documento, "LIMITE_TEXTO_NO_BANCO", 1)
+    ana = autenticar("ana_blob_perdido")
+    id_documento = enviar_pdf(ana, "texto de um blob que some no redeploy")
+    chave = _colunas_gravadas(id_documento)[0].chave_texto
+    os.remove(armazenamento.caminho(chave))
+
+    resposta = cliente.get(f"/documentos/{id_documento}", headers=ana)
+    assert resposta.status_code == 503
+    assert "armazenamento" in resposta.json()["detail"]
+
+
+def test_busca_e_exclusao_nao_dependem_do_texto_no_armazenamento(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    monkeypatch.setattr(servico_documento, "LIMITE_TEXTO_NO_BANCO", 1)
+    ana = autenticar("ana_blob_busca")
+    id_documento = enviar_pdf(ana, "relatorio de auditoria externa")
+    os.remove(armazenamento.caminho(_colunas_gravadas(id_documento)[0].chave_texto))
+
+    # O resultado vem sem trecho e a exclusão tira o documento do índice
+    resposta = cliente.get("/documentos/busca", params={"q": "auditoria"}, headers=ana)
+    assert resposta.status_code == 200
+    assert [r["id"] for r in resposta.json()] == [id_documento]
+
+    resposta = cliente.delete(f"/documentos/{id_documento}", headers=ana)
+    assert resposta.status_code == 204
+    resposta = cliente.get("/documentos/busca", params={"q": "auditoria"}, headers=ana)
+    assert resposta.json() == []
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from sqlalchemy import create_engine, insert, text
+from backend.database import base, engine
+from backend.models import DocumentoTexto
+from backend.services.compressao_texto import CODEC_ZLIB, colunas_texto
+from backend.services.servico_busca import ServicoBusca, gerar_trecho
+
+
+def _buscar(cliente, cabecalhos: dict, consulta: str) -> list:
+    resposta = cliente.get(
+        "/documentos/busca", params={"q": consulta}, headers=cabecalhos
+    )
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+def test_busca_so_devolve_documentos_do_usuario(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_busca")
+    bia = autenticar("bia_busca")
+    id_ana = enviar_pdf(ana, "capa", "clausula de vigencia do contrato")
+    enviar_pdf(bia, "outra clausula de vigencia")
+
+    resultados = _buscar(cliente, ana, "vigencia")
+    assert [resultado["id"] for resultado in resultados] == [id_ana]
+    assert "[vigencia]" in resultados[0]["trecho"]
+
+
+def test_cada_resultado_traz_o_trecho_do_proprio_documento(
+    cliente, autenticar, enviar_pdf
+):
+    ana = autenticar("ana_trechos")
+    ids = {
+        enviar_pdf(ana, "capa", f"multa contratual de {valor} reais"): valor
+        for valor in ("cem", "duzentos", "trezentos")
+    }
+
+    resultados = _buscar(cliente, ana, "multa")
+    assert {resultado["id"] for resultado in resultados} == set(ids)
+    for resultado in resultados:
+        assert f"[multa] contratual de {ids[resultado['id']]}" in resultado["trecho"]
+
+
+def test_indice_acompanha_edicao_renomeacao_e_exclusao(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_indice")
+    id_documento = enviar_pdf(ana, "relatorio trimestral")
+
+    cliente.put(
+        f"/documentos/{id_documento}",
+        json={"nome_arquivo": "balanco.pdf"},
+        headers=ana,
+    )
+    assert [r["id"] for r in _buscar(cliente, ana, "balanco trimestral")] == [
+        id_documento
+    ]
+
+    cliente.put(
+        f"/documentos/{id_documento}",
+        json={"texto_extraido": "parecer anual"},
+        headers=ana,
+    )
+    assert _buscar(cliente, ana, "trimestral") == []
+    assert [r["id"] for r in _buscar(cliente, ana, "parecer")] == [id_documento]
+
+    cliente.delete(f"/documentos/{id_documento}", headers=ana)
+    assert _buscar(cliente, ana, "parecer") == []
+
+
+def test_indice_nao_guarda_copia_do_texto():
+    with engine.connect() as conexao:
+        tabelas = {
+            nome
+            for (nome,) in conexao.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'")
+            )
+        }
+    assert "documentos_busca" in tabelas
+    assert "documentos_busca_content" not in tabelas
+
+
+def test_indice_no_formato_antigo_e_recriado_com_o_texto_descompactado():
+    pasta = tempfile.mkdtemp(prefix="desafio_api_busca_")
+    engine_antiga = create_engine(f"sqlite:///{os.path.join(pasta, 'antigo.db')}")
+    base.metadata.create_all(bind=engine_antiga)
+    with engine_antiga.begin() as conexao:
+        conexao.execute(
+            insert(DocumentoTexto).values(
+                nome_arquivo="antigo.pdf",
+                tamanho_arquivo=1,
+                usuario_id=7,
+                **colunas_texto("texto compactado " * 50, CODEC_ZLIB),
+            )
+        )
+        conexao.execute(
+            text(
+                "CREATE VIRTUAL TABLE documentos_busca USING fts5("
+                "nome_arquivo, texto, usuario_id UNINDEXED)"
+            )
+        )
+
+    ServicoBusca.criar_indice(engine_antiga)
+
+    with engine_antiga.connect() as conexao:
+        encontrados = conexao.execute(
+            text(
+                "SELECT rowid FROM documentos_busca "
+                "WHERE documentos_busca MATCH 'usuario : u7 AND compactado'"
+            )
+        ).all()
+    engine_antiga.dispose()
+    assert len(encontrados) == 1
+
+
+def test_trecho_marca_o_termo_sem_diferenciar_acentos():
+    paginas = [
+        "capa do documento",
+        "inicio " * 20 + "Vigência do contrato " + "fim " * 20,
+    ]
+    trecho = gerar_trecho(paginas, "vigencia")
+    assert "[Vigência]" in trecho
+    assert trecho.startswith("...") and trecho.endswith("...")
+    assert gerar_trecho(["sem o termo"], "vigencia") == "sem o termo"
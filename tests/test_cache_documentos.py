@@ -0,0 +1,88 @@
+from sqlalchemy import delete, select, text, update
+from backend.database import engine
+from backend.models import DocumentoTexto, VersaoDocumentos
+
+
+def _apagar_em_outro_processo(id_documento: int, reaproveitar_id: bool) -> None:
+    # Exclusão feita por outro worker: a linha some sem passar pelo cache
+    # de respostas deste processo
+    with engine.begin() as conexao:
+        conexao.execute(delete(DocumentoTexto).where(DocumentoTexto.id == id_documento))
+        if reaproveitar_id:
+            # Como num banco SQLite criado antes do AUTOINCREMENT
+            conexao.execute(
+                text(
+                    "UPDATE sqlite_sequence SET seq = seq - 1 "
+                    "WHERE name = 'documentos_texto'"
+                )
+            )
+
+
+def test_id_de_documento_apagado_nao_e_reaproveitado(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_id")
+    id_apagado = enviar_pdf(ana, "primeiro documento")
+    cliente.delete(f"/documentos/{id_apagado}", headers=ana)
+
+    assert enviar_pdf(ana, "segundo documento") > id_apagado
+
+
+def test_documento_com_id_reaproveitado_nao_usa_cache_do_apagado(
+    cliente, autenticar, enviar_pdf
+):
+    ana = autenticar("ana_cache")
+    bia = autenticar("bia_cache")
+    id_ana = enviar_pdf(ana, "segredo da ana")
+    resposta_ana = cliente.get(f"/documentos/{id_ana}", headers=ana)
+    assert "segredo da ana" in resposta_ana.json()["texto_extraido"]
+
+    _apagar_em_outro_processo(id_ana, reaproveitar_id=True)
+    id_bia = enviar_pdf(bia, "texto da bia")
+    assert id_bia == id_ana
+
+    resposta_bia = cliente.get(f"/documentos/{id_bia}", headers=bia)
+    assert resposta_bia.status_code == 200
+    assert resposta_bia.json()["texto_extraido"] == "texto da bia"
+    assert resposta_bia.headers["etag"] != resposta_ana.headers["etag"]
+
+    # O ETag do documento apagado também não vale para o novo
+    condicional = cliente.get(
+        f"/documentos/{id_bia}",
+        headers={**bia, "If-None-Match": resposta_ana.headers["etag"]},
+    )
+    assert condicional.status_code == 200
+
+
+def test_total_de_documentos_vem_do_contador(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_total")
+
+    def total() -> int:
+        resposta = cliente.get(
+            "/documentos/", params={"incluir_total": True}, headers=ana
+        )
+        return int(resposta.headers["X-Total-Count"])
+
+    def guardado():
+        with engine.connect() as conexao:
+            return conexao.scalar(
+                select(VersaoDocumentos.total)
+                .join(
+                    DocumentoTexto,
+                    DocumentoTexto.usuario_id == VersaoDocumentos.usuario_id,
+                )
+                .where(DocumentoTexto.id == id_documento)
+                .limit(1)
+            )
+
+    id_documento = enviar_pdf(ana, "primeiro")
+    enviar_pdf(ana, "segundo")
+    assert guardado() == 2 and total() == 2
+
+    cliente.delete(f"/documentos/{id_documento}", headers=ana)
+    id_documento = enviar_pdf(ana, "terceiro")
+    assert guardado() == 2 and total() == 2
+
+    # Registro de antes da coluna: o total é contado na próxima alteração
+    with engine.begin() as conexao:
+        conexao.execute(update(VersaoDocumentos).values(total=None))
+    enviar_pdf(ana, "quarto")
+    assert guardado() == 3 and total() == 3
@@ -0,0 +1,43 @@
+from sqlalchemy import select
+from backend.comandos import compactar_textos
+from backend.database import engine, sessaolocal
+from backend.models import DocumentoTexto
+from backend.services.compressao_texto import CODEC_ZLIB, SEM_COMPRESSAO
+
+
+def test_compactacao_nao_sobrescreve_edicao_feita_durante_a_execucao(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    ana = autenticar("ana_compactacao")
+    id_documento = enviar_pdf(ana, "texto antes da compactacao")
+    colunas_texto = compactar_textos.colunas_texto
+
+    def colunas_com_edicao(texto, codec):
+        # Edição pela API entre a leitura e a gravação do documento
+        if texto == "texto antes da compactacao":
+            resposta = cliente.put(
+                f"/documentos/{id_documento}",
+                json={"texto_extraido": "texto editado a mao"},
+                headers=ana,
+            )
+            assert resposta.status_code == 200, resposta.text
+        return colunas_texto(texto, codec)
+
+    monkeypatch.setattr(compactar_textos, "colunas_texto", colunas_com_edicao)
+    # Um documento por transação: no SQLite a edição esperaria o commit do lote
+    try:
+        with sessaolocal() as db:
+            totais = compactar_textos.regravar_textos(db, CODEC_ZLIB, 1)
+    finally:
+        monkeypatch.undo()
+        with sessaolocal() as db:
+            compactar_textos.regravar_textos(db, SEM_COMPRESSAO, 500)
+
+    assert totais["alterados"] == 1
+    with engine.connect() as conexao:
+        texto = conexao.scalar(
+            select(DocumentoTexto.texto_extraido).where(
+                DocumentoTexto.id == id_documento
+            )
+        )
+    assert texto == "texto editado a mao"
@@ -0,0 +1,26 @@
+import asyncio
+import time
+from backend.services.executor_senhas import ExecutorSenhas
+
+
+def test_hash_abandonado_segura_a_vaga_ate_terminar():
+    executor = ExecutorSenhas(1, 4)
+
+    async def rodar():
+        pedido = asyncio.ensure_future(executor.executar(time.sleep, 0.5))
+        await asyncio.sleep(0.1)
+        pedido.cancel()
+        await asyncio.sleep(0.1)
+        # O cliente desistiu, mas a thread segue calculando
+        assert executor.pendentes == 1
+
+        for _ in range(100):
+            if executor.pendentes == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert executor.pendentes == 0
+
+    try:
+        asyncio.run(rodar())
+    finally:
+        executor.encerrar()
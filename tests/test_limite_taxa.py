@@ -0,0 +1,51 @@
+import asyncio
+from backend.services import limite_taxa
+from backend.services.limite_taxa import LimitadorMemoria
+
+
+def test_baldes_so_sao_debitados_se_todos_tiverem_saldo():
+    limitador = LimitadorMemoria(100)
+
+    async def rodar():
+        baldes = [("a", 1, 10, 1), ("b", 5, 4, 1)]
+        sem_saldo, espera = await limitador.consumir_todos(baldes)
+        assert sem_saldo == 1 and espera > 0
+        # O balde "a" não foi debitado pela requisição recusada
+        return await limitador.consumir_todos([("a", 10, 10, 1)])
+
+    assert asyncio.run(rodar()) == (None, 0.0)
+
+
+def test_login_so_desconta_as_tentativas_erradas_do_usuario_no_ip(
+    cliente, autenticar, monkeypatch
+):
+    monkeypatch.setattr(limite_taxa, "limitador", LimitadorMemoria(100))
+    monkeypatch.setattr(limite_taxa, "TENTATIVAS_LOGIN_POR_MINUTO", 2)
+    autenticar("ana_login")
+
+    def entrar(senha: str) -> int:
+        return cliente.post(
+            "/auth/login", json={"nome_usuario": "ana_login", "senha": senha}
+        ).status_code
+
+    assert [entrar("senha-de-teste") for _ in range(5)] == [200] * 5
+    assert [entrar("errada") for _ in range(3)] == [401] * 3
+    assert entrar("senha-de-teste") == 429
+
+
+def test_recusa_dos_middlewares_sai_com_cors(cliente, autenticar):
+    ana = autenticar("ana_cors")
+    resposta = cliente.post(
+        "/documentos/upload",
+        headers={
+            **ana,
+            "Origin": "https://exemplo.com",
+            "Content-Length": str(1024**4),
+        },
+        content=b"",
+    )
+    assert resposta.status_code == 413
+    assert resposta.headers["access-control-allow-origin"] in (
+        "*",
+        "https://exemplo.com",
+    )
@@ -0,0 +1,26 @@
+from backend.services import servico_lote
+from conftest import gerar_pdf
+
+
+def test_lote_para_no_limite_de_texto_extraido(cliente, autenticar, monkeypatch):
+    monkeypatch.setattr(servico_lote, "MAXIMO_CARACTERES_LOTE", 30)
+    ana = autenticar("ana_lote")
+    resposta = cliente.post(
+        "/documentos/upload/lote",
+        headers=ana,
+        files=[
+            (
+                "arquivos",
+                ("a.pdf", gerar_pdf("texto do primeiro pdf"), "application/pdf"),
+            ),
+            (
+                "arquivos",
+                ("b.pdf", gerar_pdf("texto do segundo pdf"), "application/pdf"),
+            ),
+        ],
+    )
+    assert resposta.status_code == 200, resposta.text
+    resultado = resposta.json()
+    assert (resultado["sucesso"], resultado["falhas"]) == (1, 1)
+    falha = next(item for item in resultado["arquivos"] if not item["sucesso"])
+    assert falha["erro"] == "Limite de texto extraído do lote atingido"
@@ -0,0 +1,31 @@
+import main
+
+
+def test_recusa_antes_do_roteamento_leva_a_rota_declarada(cliente, autenticar):
+    ana = autenticar("ana_metricas")
+    resposta = cliente.post(
+        "/documentos/upload",
+        headers={**ana, "Content-Length": str(1024**4)},
+        content=b"",
+    )
+    assert resposta.status_code == 413
+
+    metricas = cliente.get("/metrics").text
+    assert (
+        'http_requisicoes_total{metodo="POST",rota="/documentos/upload",status="413"}'
+        in metricas
+    )
+
+
+def test_metricas_exigem_o_token_quando_configurado(cliente, monkeypatch):
+    monkeypatch.setattr(main, "TOKEN_METRICAS", "segredo")
+    assert cliente.get("/metrics").status_code == 401
+    resposta = cliente.get("/metrics", headers={"Authorization": "Bearer segredo"})
+    assert resposta.status_code == 200
+
+
+def test_acertos_dos_caches_so_saem_nas_metricas(cliente, autenticar):
+    ana = autenticar("ana_cache_metricas")
+    resposta = cliente.get("/documentos/cache/estatisticas", headers=ana)
+    assert resposta.status_code in (404, 422)
+    assert 'cache_acertos_total{cache="extracao"}' in cliente.get("/metrics").text
@@ -0,0 +1,83 @@
+import asyncio
+import signal
+import time
+import pytest
+from fastapi import HTTPException
+from backend.services.motor_extracao import MotorExtracao
+
+
+def dormir_sem_alarme(segundos):
+    # Simula código C que não devolve o controle ao Python
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(segundos)
+
+
+def test_tempo_limite_conta_do_inicio_do_trabalho_e_nao_da_fila():
+    motor = MotorExtracao(1, 3, 8)
+
+    async def rodar():
+        return await asyncio.gather(
+            *(motor.executar(time.sleep, 1) for _ in range(6)),
+            return_exceptions=True,
+        )
+
+    try:
+        assert asyncio.run(rodar()) == [None] * 6
+    finally:
+        motor.encerrar()
+
+
+def test_tempo_limite_de_um_trabalho_nao_derruba_os_outros():
+    motor = MotorExtracao(2, 2, 8)
+
+    async def rodar():
+        lento = asyncio.ensure_future(motor.executar(time.sleep, 30))
+        await asyncio.sleep(0.5)
+        rapidos = await asyncio.gather(
+            *(motor.executar(time.sleep, 1) for _ in range(3))
+        )
+        with pytest.raises(HTTPException) as erro:
+            await lento
+        assert erro.value.status_code == 504
+        assert motor.pendentes == 0
+
+        # O processo que estourou o tempo segue atendendo
+        return rapidos, await motor.executar(abs, -3)
+
+    try:
+        inicio = time.perf_counter()
+        assert asyncio.run(rodar()) == ([None] * 3, 3)
+        assert time.perf_counter() - inicio < 20
+    finally:
+        motor.encerrar()
+
+
+@pytest.mark.skipif(
+    not hasattr(signal, "pthread_sigmask"), reason="precisa de sinais POSIX"
+)
+def test_processo_que_ignora_o_limite_e_aposentado_sem_derrubar_os_outros():
+    motor = MotorExtracao(2, 1, 8)
+
+    async def rodar():
+        travado = asyncio.ensure_future(motor.executar(dormir_sem_alarme, 30))
+        await asyncio.sleep(0.5)
+        vizinho = asyncio.ensure_future(motor.executar(time.sleep, 0.5))
+        with pytest.raises(HTTPException) as erro:
+            await travado
+        assert erro.value.status_code == 504
+        assert await vizinho is None
+
+        # O pool aposentado é morto, e a vaga volta quando o processo termina
+        for _ in range(100):
+            if motor.pendentes == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert motor.pendentes == 0
+        return await motor.executar(abs, -3)
+
+    try:
+        inicio = time.perf_counter()
+        assert asyncio.run(rodar()) == 3
+        assert time.perf_counter() - inicio < 20
+    finally:
+        motor.encerrar()
@@ -0,0 +1,21 @@
+import asyncio
+from fastapi import HTTPException
+from backend.services import servico_ocr
+from backend.services.servico_ocr import ServicoOcr, motor_ocr
+
+
+def test_pagina_recusada_pelo_motor_fica_sem_texto(monkeypatch):
+    async def executar(funcao, caminho_pdf, numero, *argumentos):
+        if numero == 2:
+            raise HTTPException(status_code=429, detail="Motor ocupado")
+        if numero == 3:
+            raise HTTPException(status_code=504, detail="Tempo limite")
+        return f"texto da pagina {numero}", False
+
+    monkeypatch.setattr(servico_ocr, "OCR_ATIVO", True)
+    monkeypatch.setattr(motor_ocr, "executar", executar)
+
+    paginas = asyncio.run(
+        ServicoOcr.completar_paginas("escaneado.pdf", ["", "", "", "com texto"])
+    )
+    assert paginas == ["texto da pagina 1", "", "", "com texto"]
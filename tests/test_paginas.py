@@ -0,0 +1,70 @@
+from sqlalchemy import select, text, update
+from backend.database import engine, sessaolocal
+from backend.comandos.compactar_textos import posicionar_paginas
+from backend.models import DocumentoTexto, PaginaDocumento
+from backend.services.compressao_texto import CODEC_ZLIB, colunas_texto
+
+PAGINAS = ["primeira pagina", "segunda pagina", "terceira pagina"]
+
+
+def _paginas(cliente, cabecalhos: dict, id_documento: int) -> list:
+    resposta = cliente.get(
+        f"/documentos/{id_documento}/paginas",
+        params={"inicio": 1, "fim": 10},
+        headers=cabecalhos,
+    )
+    assert resposta.status_code == 200, resposta.text
+    return [pagina["texto"] for pagina in resposta.json()["paginas"]]
+
+
+def test_paginas_guardam_so_a_posicao_no_texto(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_paginas")
+    id_documento = enviar_pdf(ana, *PAGINAS)
+
+    with engine.connect() as conexao:
+        textos = conexao.scalars(
+            select(PaginaDocumento.texto).where(
+                PaginaDocumento.documento_id == id_documento
+            )
+        ).all()
+    assert textos == ["", "", ""]
+    assert _paginas(cliente, ana, id_documento) == PAGINAS
+
+
+def test_paginas_de_documento_compactado(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_paginas_zlib")
+    id_documento = enviar_pdf(ana, *PAGINAS)
+    with engine.begin() as conexao:
+        conexao.execute(
+            update(DocumentoTexto)
+            .where(DocumentoTexto.id == id_documento)
+            .values(**colunas_texto("\n".join(PAGINAS) + " " * 500, CODEC_ZLIB))
+        )
+
+    assert _paginas(cliente, ana, id_documento) == PAGINAS
+
+
+def test_paginas_no_formato_antigo_sao_convertidas(cliente, autenticar, enviar_pdf):
+    ana = autenticar("ana_paginas_antigas")
+    id_documento = enviar_pdf(ana, *PAGINAS)
+    with engine.begin() as conexao:
+        for numero, pagina in enumerate(PAGINAS, 1):
+            conexao.execute(
+                update(PaginaDocumento)
+                .where(
+                    PaginaDocumento.documento_id == id_documento,
+                    PaginaDocumento.numero_pagina == numero,
+                )
+                .values(texto=pagina, inicio=None, fim=None)
+            )
+    assert _paginas(cliente, ana, id_documento) == PAGINAS
+
+    with sessaolocal() as db:
+        assert posicionar_paginas(db, 100) >= 1
+
+    with engine.connect() as conexao:
+        antigas = conexao.scalar(
+            text("SELECT count(*) FROM paginas_documento WHERE inicio IS NULL")
+        )
+    assert antigas == 0
+    assert _paginas(cliente, ana, id_documento) == PAGINAS
@@ -0,0 +1,90 @@
+import asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from backend.comandos import reextrair_textos
+from backend.database import engine
+from backend.models import DocumentoTexto
+
+
+def _documento(id_documento: int):
+    with engine.connect() as conexao:
+        return conexao.execute(
+            select(
+                DocumentoTexto.versao,
+                DocumentoTexto.versao_extrator,
+                DocumentoTexto.texto_extraido,
+            ).where(DocumentoTexto.id == id_documento)
+        ).one()
+
+
+def _reextrair() -> dict:
+    async def rodar():
+        engine_assincrona = create_async_engine(
+            str(engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+        )
+        try:
+            async with async_sessionmaker(engine_assincrona)() as db:
+                return await reextrair_textos.reextrair_textos(db, 10, 1, 0, False)
+        finally:
+            await engine_assincrona.dispose()
+
+    return asyncio.run(rodar())
+
+
+def test_reextracao_nao_sobrescreve_edicao_feita_durante_a_extracao(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    ana = autenticar("ana_reextracao")
+    id_documento = enviar_pdf(ana, "texto da extracao antiga")
+    with engine.begin() as conexao:
+        conexao.execute(
+            update(DocumentoTexto)
+            .where(DocumentoTexto.id == id_documento)
+            .values(versao_extrator=0)
+        )
+
+    async def extrair_com_edicao(chave_arquivo, pasta, limite):
+        # Edição manual enquanto o PDF é extraído de novo
+        resposta = await asyncio.to_thread(
+            cliente.put,
+            f"/documentos/{id_documento}",
+            json={"texto_extraido": "texto editado a mao"},
+            headers=ana,
+        )
+        assert resposta.status_code == 200, resposta.text
+        return ["texto da extracao nova"], None
+
+    monkeypatch.setattr(reextrair_textos, "extrair_pdf_guardado", extrair_com_edicao)
+    antes = _documento(id_documento)
+    totais = _reextrair()
+
+    depois = _documento(id_documento)
+    assert totais["regravados"] == 0
+    assert depois.texto_extraido == "texto editado a mao"
+    assert depois.versao == antes.versao + 1
+    assert depois.versao_extrator != reextrair_textos.VERSAO_EXTRATOR
+
+
+def test_reextracao_regrava_documento_nao_editado(
+    cliente, autenticar, enviar_pdf, monkeypatch
+):
+    ana = autenticar("ana_reextracao_nova")
+    id_documento = enviar_pdf(ana, "texto da extracao antiga")
+    with engine.begin() as conexao:
+        conexao.execute(
+            update(DocumentoTexto)
+            .where(DocumentoTexto.id == id_documento)
+            .values(versao_extrator=0)
+        )
+
+    async def extrair(chave_arquivo, pasta, limite):
+        return ["texto da extracao nova"], None
+
+    monkeypatch.setattr(reextrair_textos, "extrair_pdf_guardado", extrair)
+    antes = _documento(id_documento)
+    assert _reextrair()["regravados"] == 1
+
+    depois = _documento(id_documento)
+    assert depois.texto_extraido == "texto da extracao nova"
+    assert depois.versao == antes.versao + 1
+    assert depois.versao_extrator == reextrair_textos.VERSAO_EXTRATOR
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from conftest import gerar_pdf
+from backend.database import engine
+from backend.models import TarefaExtracao
+from backend.services.servico_documento import ServicoDocumento
+from backend.services.servico_tarefas import (
+    ESTADO_FALHOU,
+    ESTADO_PENDENTE,
+    ESTADO_PROCESSANDO,
+    recuperar_reservas_vencidas,
+)
+
+
+def _criar_tarefa(reservada_em: datetime) -> str:
+    id_tarefa = str(uuid.uuid4())
+    with engine.begin() as conexao:
+        conexao.execute(
+            insert(TarefaExtracao).values(
+                id=id_tarefa,
+                nome_arquivo="teste.pdf",
+                caminho_arquivo=f"/nao/existe/{id_tarefa}.pdf",
+                tamanho_arquivo=1,
+                usuario_id=1,
+                estado=ESTADO_PROCESSANDO,
+                reservada_em=reservada_em,
+            )
+        )
+    return id_tarefa
+
+
+def test_tarefa_com_reserva_vencida_volta_para_a_fila(cliente):
+    agora = datetime.now(timezone.utc)
+    vencida = _criar_tarefa(agora - timedelta(hours=1))
+    renovada = _criar_tarefa(agora)
+
+    async def recuperar():
+        engine_assincrona = create_async_engine(
+            str(engine.url).replace("sqlite://", "sqlite+aiosqlite://", 1)
+        )
+        try:
+            async with async_sessionmaker(engine_assincrona)() as db:
+                return await recuperar_reservas_vencidas(db)
+        finally:
+            await engine_assincrona.dispose()
+
+    assert asyncio.run(recuperar()) == [vencida]
+    with engine.connect() as conexao:
+        estados = dict(
+            conexao.execute(
+                select(TarefaExtracao.id, TarefaExtracao.estado).where(
+                    TarefaExtracao.id.in_([vencida, renovada])
+                )
+            ).all()
+        )
+    assert estados == {vencida: ESTADO_PENDENTE, renovada: ESTADO_PROCESSANDO}
+
+
+def test_erro_ao_gravar_o_documento_marca_a_tarefa_como_falha(
+    cliente, autenticar, monkeypatch
+):
+    async def falhar(*argumentos, **opcoes):
+        raise RuntimeError("banco indisponível")
+
+    monkeypatch.setattr(ServicoDocumento, "criar_documento", falhar)
+    ana = autenticar("ana_tarefa_falha")
+    resposta = cliente.post(
+        "/documentos/upload/assincrono",
+        headers=ana,
+        files={
+            "arquivo": ("falha.pdf", gerar_pdf("tarefa que falha"), "application/pdf")
+        },
+    )
+    assert resposta.status_code == 202, resposta.text
+    id_tarefa = resposta.json()["id"]
+
+    for _ in range(100):
+        tarefa = cliente.get(f"/documentos/jobs/{id_tarefa}", headers=ana).json()
+        if tarefa["estado"] not in (ESTADO_PENDENTE, ESTADO_PROCESSANDO):
+            break
+        time.sleep(0.1)
+    assert tarefa["estado"] == ESTADO_FALHOU
+    assert "RuntimeError" in tarefa["erro"]
+    with engine.connect() as conexao:
+        caminho = conexao.scalar(
+            select(TarefaExtracao.caminho_arquivo).where(TarefaExtracao.id == id_tarefa)
+        )
+    assert not os.path.exists(caminho)